@@ -2,6 +2,8 @@
 # Configuration file for BDWPT simulation platform
 
 import os  # 确保导入os模块
+import json
+import hashlib
 import numpy as np
 from datetime import datetime, timedelta
 
@@ -10,6 +12,12 @@ from datetime import datetime, timedelta
 _BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 # --- END OF FINAL FIX ---
 
+# Parameter groups that change how a run is executed, stored or reported but not its results
+OPERATIONAL_PARAMS = (
+    'catalog_params', 'visualization_params', 'data_cache_params', 'output_params',
+    'checkpoint_params', 'parallel_params', 'instrumentation_params',
+)
+
 class SimulationConfig:
     """Configuration parameters for the BDWPT simulation."""
     
@@ -23,6 +31,7 @@ class SimulationConfig:
         self.figures_dir = os.path.join(self.output_dir, "figures")
         self.results_dir = os.path.join(self.output_dir, "results")
         self.logs_dir = os.path.join(self.output_dir, "logs")
+        self.cache_dir = os.path.join(self.output_dir, "cache")
         # --- END OF FINAL FIX ---
         
         # Simulation parameters
@@ -30,7 +39,18 @@ class SimulationConfig:
             'start_time': datetime(2024, 1, 1, 0, 0),  # Start at midnight
             'end_time': datetime(2024, 1, 1, 23, 59),  # End at 23:59
             'time_step_minutes': 15,  # 15-minute time steps
-            'day_types': ['weekday', 'weekend']
+            'day_types': ['weekday', 'weekend'],
+            'kernel': 'time_step',  # 'time_step' (fixed-step loop) or 'event' (discrete-event kernel)
+            'event_resolution_minutes': None  # Event kernel: agents react to SoC and voltage changes at this resolution (None: time_step_minutes)
+        }
+        
+        # Multi-rate scheduling: traffic and agents advance every time step, the grid is
+        # solved every `grid_solve_interval_steps` steps or sooner when the BDWPT node
+        # injections have moved by more than `injection_threshold_kw` (summed over nodes)
+        # since the last solve. Agents use the latest solved voltages in between.
+        self.multirate_params = {
+            'grid_solve_interval_steps': 1,  # 1 = solve every step (lockstep)
+            'injection_threshold_kw': None  # None = clock-driven solves only
         }
         
         # Traffic model parameters
@@ -90,7 +110,24 @@ class SimulationConfig:
             'voltage_tolerance': 0.05,  # ±5% voltage tolerance
             'max_loading_percent': 80,  # 80% maximum loading
             'bdwpt_nodes': [632, 633, 634, 645, 646, 671, 675, 680],  # IEEE 13-bus node numbers
-            'bdwpt_connection_type': 'three_phase'
+            'bdwpt_connection_type': 'three_phase',
+            'use_circuit_cache': True  # Restore the compiled circuit from output/cache when unchanged
+        }
+        
+        # N-1 contingency screening parameters
+        self.contingency_params = {
+            'max_workers': None,  # Worker processes (None uses all CPU cores)
+            'deenergized_voltage_pu': 0.1  # Nodes below this voltage count as de-energized
+        }
+        
+        # Base-load profile parameters
+        self.load_profile_params = {
+            'base_load_kw': 100,  # Nominal base load per bus (kW)
+            'node_factors': {
+                632: 1.2, 633: 0.8, 634: 1.0, 645: 0.9, 646: 1.1,
+                671: 0.7, 675: 1.3, 680: 0.6
+            },
+            'mmap_mode': 'r'  # Memory-map measured .npy profiles (None loads them into RAM)
         }
         
         # Scenario configuration (RESTORED)
@@ -155,6 +192,141 @@ class SimulationConfig:
             'logs': self.logs_dir
         }
         
+        # Result output parameters
+        self.output_params = {
+            'streaming': False,  # Flush step results to disk in chunks instead of holding them in memory
+            'chunk_size_steps': 10080,  # Steps per chunk (one week at 1-minute resolution)
+            'format': 'parquet',  # 'parquet' (needs pyarrow, falls back to 'npz') or 'npz'
+            'compression': 'zstd',  # Parquet compression codec
+            'timeseries_csv': True  # Also save in-memory timeseries as timeseries_data.csv
+        }
+
+        # Sampled agent trajectories: full SoC and power traces for a reservoir sample of
+        # agents plus fleet-wide percentile bands per step (results['agent_trajectories'])
+        self.trajectory_params = {
+            'enabled': True,
+            'sample_size': 20,  # Agents with full traces
+            'seed': 2025,  # Seed of the agent sample (None draws a different sample every run)
+            'percentiles': (5, 25, 50, 75, 95),
+            'soc_bins': 50  # SoC bins of the per-step fleet SoC histogram (density plot)
+        }
+        
+        # Figure rendering parameters
+        self.visualization_params = {
+            'parallel': False,  # Render figures in worker processes (Agg backend); pays off with many figures
+            'max_workers': None,  # Worker processes (None uses all CPU cores)
+            'dpi': 300,
+            'max_points': 2000,  # Points per plotted series, about the figure's pixel width
+            'downsample_method': 'minmax',  # 'minmax' (keeps every peak) or 'lttb' (keeps the shape)
+            'skip_unchanged': True  # Skip figures whose input hash matches figures/render_manifest.json
+        }
+
+        # Run catalog: SQLite index of every saved run (metadata, config hash, seed, runtime,
+        # summary KPIs and the location of its columnar timeseries)
+        self.catalog_params = {
+            'enabled': True,
+            'path': os.path.join(self.output_dir, 'run_catalog.sqlite')
+        }
+        
+        # Trace-driven traffic: replay recorded trips (CSV or Parquet, sorted by departure)
+        # instead of synthetic trip chains; read in chunks as the simulation clock advances
+        self.trace_params = {
+            'enabled': False,
+            'path': os.path.join(self.data_dir, 'trip_trace.csv'),
+            'format': 'auto',  # 'csv', 'parquet' (needs pyarrow) or 'auto' (by file extension)
+            'chunk_rows': 200000,  # Rows read per chunk
+            'columns': {  # Trace column holding each trip field
+                'vehicle_id': 'vehicle_id',
+                'departure_time': 'departure_time',
+                'arrival_time': 'arrival_time',
+                'origin': 'origin',
+                'destination': 'destination'
+            },
+            'time_unit': 'minutes',  # Numeric times since start_time: 'minutes' or 'seconds'; datetimes are parsed
+            'node_map_path': None  # CSV (node, grid_node) mapping trace locations to grid nodes
+        }
+        
+        # Traffic input cache: parsed data files stored in binary form, keyed by source checksum
+        self.data_cache_params = {
+            'enabled': True,
+            'path': os.path.join(self.cache_dir, 'traffic_data')
+        }
+        
+        # Checkpoint parameters
+        self.checkpoint_params = {
+            'enabled': False,  # Periodically checkpoint runs so they can be resumed after a crash
+            'interval_steps': 1440,  # Steps between checkpoints (one day at 1-minute resolution)
+            'resume': False  # Resume scenarios from their latest checkpoint when one exists
+        }
+        
+        # BDWPT-off baselines: simulate 0% penetration on a grid-only fast path and reuse
+        # stored results (output/cache/baselines) across runs, sweeps and ensembles
+        self.baseline_params = {
+            'fast_path': True,
+            'reuse': True
+        }
+        
+        # Parallel scenario execution: one worker process per scenario, sharing the
+        # fleet and trip tables read-only through shared memory
+        self.parallel_params = {
+            'enabled': False,
+            'max_workers': None,  # Defaults to the CPU count
+            'memory_per_worker_mb': 512  # Fewer workers are started if available memory is short
+        }
+        
+        # Common random numbers: nested BDWPT-equipped sets (15% within 40%) and the same
+        # fleet, trips and initial SoC for every penetration level of a base scenario
+        self.crn_params = {
+            'enabled': False,
+            'seed': None  # None draws one from the global RNG when the traffic model is built
+        }
+        
+        # Monte-Carlo ensemble: seeded replicas of every scenario with KPI confidence intervals
+        self.ensemble_params = {
+            'enabled': False,
+            'min_replicas': 5,  # Replicas run before convergence is checked (at least 2)
+            'max_replicas': 50,
+            'confidence_level': 0.95,
+            'target_relative_half_width': 0.05,  # Stop once every KPI CI half-width is below 5% of its mean...
+            'target_absolute_half_width': 0.5,  # ...or below this value in the KPI's own units
+            'base_seed': 2025
+        }
+        
+        # Global sensitivity sweep over control/BDWPT parameters ('section.key': (low, high))
+        self.sensitivity_params = {
+            'enabled': False,
+            'parameters': {
+                'control_params.soc_min_v2g': (0.2, 0.5),
+                'control_params.voltage_low_threshold': (0.96, 0.99),
+                'control_params.voltage_high_threshold': (1.01, 1.04),
+                'control_params.tariff_high_threshold': (18.0, 25.0),
+                'bdwpt_params.charging_power_kw': (20.0, 50.0),
+                'bdwpt_params.discharging_power_kw': (10.0, 30.0),
+                'bdwpt_params.efficiency': (0.8, 0.95)
+            },
+            'scenarios': [('Weekday Peak', 40)],  # (base scenario, penetration) pairs to evaluate
+            'method': 'sobol',  # 'sobol' (Saltelli design, S1/ST indices) or 'morris' (elementary effects)
+            'sampler': 'sobol',  # Base sample for the Sobol method: 'sobol' or 'lhs'
+            'num_samples': 64,  # Base samples (sobol, a power of 2) or trajectories (morris)
+            'morris_levels': 4,
+            'seed': 2025
+        }
+        
+        # Hosting-capacity search: bisection over BDWPT penetration, each run stopping at its first violation
+        self.hosting_capacity_params = {
+            'enabled': False,
+            'constraints': ['voltage_low', 'voltage_high', 'thermal'],  # Limits from grid_params
+            'max_penetration_pct': 100.0,
+            'tolerance_pct': 1.0,  # Bracket width at which the search stops
+            'seed': 2025  # Reseeded before every run so equipped sets are nested across penetrations
+        }
+        
+        # Run instrumentation: per-stage timing histograms, counters and peak RSS,
+        # written to <results>/<scenario>/performance_report.json
+        self.instrumentation_params = {
+            'enabled': False
+        }
+        
         # Logging configuration (RESTORED)
         self.logging_config = {
             'level': 'DEBUG',
@@ -186,7 +358,21 @@ class SimulationConfig:
 
     def get_load_profile(self, node_id, time_minutes, day_type):
         """Get load profile for a specific node and time."""
-        hour = time_minutes // 60
+        return float(self.get_load_profile_matrix([node_id], [time_minutes], day_type)[0, 0])
+
+    def get_load_profile_matrix(self, node_ids, time_minutes, day_type):
+        """
+        Get synthetic base loads for many nodes and times in one call.
+
+        Args:
+            node_ids (list): Bus ids, one per column.
+            time_minutes (array-like): Minutes from start of day, one per row.
+            day_type (str): 'weekday' or 'weekend'.
+
+        Returns:
+            np.ndarray: Loads in kW with shape (len(time_minutes), len(node_ids)).
+        """
+        hour = np.asarray(time_minutes) // 60
         
         if day_type == 'weekend':
             base_factor = 0.6 + 0.3 * np.sin(2 * np.pi * (hour - 8) / 24)
@@ -195,14 +381,41 @@ class SimulationConfig:
             evening_peak = 1.0 * np.exp(-((hour - 18) ** 2) / 12)
             base_factor = 0.4 + morning_peak + evening_peak
         
-        node_factors = {
-            632: 1.2, 633: 0.8, 634: 1.0, 645: 0.9, 646: 1.1,
-            671: 0.7, 675: 1.3, 680: 0.6
-        }
-        node_factor = node_factors.get(node_id, 1.0)
-        base_load_kw = 100
+        node_factors = self.load_profile_params['node_factors']
+        node_factor = np.array([node_factors.get(node_id, 1.0) for node_id in node_ids])
+        base_load_kw = self.load_profile_params['base_load_kw']
         
-        return base_load_kw * base_factor * node_factor
+        return base_load_kw * np.outer(base_factor, node_factor)
+
+    def get_scenario_results_dir(self, scenario_name):
+        """Directory holding the saved results of one scenario."""
+        clean_name = scenario_name.replace("%", "pct").replace(" ", "_")
+        return os.path.join(os.path.abspath(self.results_dir), clean_name)
+
+    def new_run_key(self):
+        """Key naming one run's output directory: its start time plus the config fingerprint."""
+        return f"{datetime.now():%Y%m%d-%H%M%S-%f}-{self.get_fingerprint()}"
+
+    def get_run_timeseries_dir(self, scenario_name, run_key):
+        """Directory of the columnar timeseries of one run, so later runs do not overwrite it."""
+        return os.path.join(self.get_scenario_results_dir(scenario_name), 'timeseries', run_key)
+
+    def get_data_cache_dir(self):
+        """Directory of the binary traffic input cache, or None when it is disabled."""
+        return self.data_cache_params['path'] if self.data_cache_params['enabled'] else None
+
+    def get_fingerprint(self):
+        """
+        Short hash of the parameters that affect results, identifying a
+        configuration in the run catalog; OPERATIONAL_PARAMS are left out.
+        """
+        settings = {
+            name: value for name, value in vars(self).items()
+            if (name.endswith('_params') and name not in OPERATIONAL_PARAMS)
+            or name in ('scenarios', 'penetration_scenarios')
+        }
+        payload = json.dumps(settings, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()[:16]
 
     def get_time_series(self):
         """Generate time series for simulation based on configuration."""
@@ -236,6 +449,9 @@ class SimulationConfig:
         if not 0 <= self.ev_params['initial_soc_mean'] <= 1:
             raise ValueError("Initial SOC mean must be between 0 and 1")
         
+        if self.ensemble_params['min_replicas'] < 2:
+            raise ValueError("Ensemble min_replicas must be at least 2 for a confidence interval")
+        
         return True
 
 # Create global config instance
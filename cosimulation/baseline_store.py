@@ -0,0 +1,54 @@
+# cosimulation/baseline_store.py - On-disk store of BDWPT-off (0% penetration) baseline results
+
+import os
+import json
+import pickle
+import hashlib
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Part of every key; bump when the layout of the results dictionary changes
+FORMAT_VERSION = 4
+
+class BaselineStore:
+    """
+    Results of baseline runs, keyed by a hash of everything a baseline depends
+    on: the base scenario, the grid definition, the base-load profile, the time
+    horizon and (optionally) the seed. Runs, sweeps, ensembles and searches
+    that share these inputs reuse one stored result instead of re-simulating it.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+
+    @staticmethod
+    def make_key(**components):
+        """Hash of the key components; values must be JSON-serializable."""
+        payload = json.dumps({'format': FORMAT_VERSION, **components}, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()[:24]
+
+    def load(self, key):
+        """Return the stored results for ``key``, or None."""
+        path = self._path(key)
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, 'rb') as f:
+                return pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError) as e:
+            logger.warning(f"Ignoring unreadable baseline {path}: {e}")
+            return None
+
+    def save(self, key, results):
+        # Concurrent workers may store the same baseline; the atomic rename keeps either copy whole
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._path(key)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(results, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+        logger.info(f"Stored baseline {key}")
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"baseline-{key}.pkl")
@@ -0,0 +1,70 @@
+# cosimulation/checkpoint.py - Incremental on-disk checkpoints for co-simulation runs
+
+import os
+import glob
+import pickle
+import shutil
+import logging
+
+logger = logging.getLogger(__name__)
+
+STATIC_FILE = 'static.pkl'
+
+class CheckpointStore:
+    """
+    Directory of incremental checkpoints for one scenario run.
+
+    State that never changes after it is first created (the scenario and the
+    cached trip tables) is written once to ``static.pkl``. Each checkpoint
+    ``ckpt-<step>.pkl`` then holds the current small state (fleet, RNG, counters)
+    plus only what was appended since the previous checkpoint (agent history,
+    recorded rows). A run is restored by replaying every checkpoint in order.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+
+    def clear(self):
+        """Remove all checkpoints, e.g. before a fresh run."""
+        if os.path.isdir(self.directory):
+            shutil.rmtree(self.directory)
+
+    def exists(self):
+        return bool(self._checkpoint_files())
+
+    def save_static(self, static):
+        self._dump(static, os.path.join(self.directory, STATIC_FILE))
+
+    def save(self, step_index, state):
+        """Write the checkpoint taken after ``step_index`` was recorded."""
+        path = os.path.join(self.directory, f"ckpt-{step_index:09d}.pkl")
+        self._dump(state, path)
+        logger.info(f"Saved checkpoint after step {step_index} to {path}")
+
+    def load(self):
+        """
+        Returns:
+            tuple: (static state, list of checkpoint states in step order), or
+                   (None, []) when no checkpoint has been written.
+        """
+        files = self._checkpoint_files()
+        if not files:
+            return None, []
+        with open(os.path.join(self.directory, STATIC_FILE), 'rb') as f:
+            static = pickle.load(f)
+        states = []
+        for path in files:
+            with open(path, 'rb') as f:
+                states.append(pickle.load(f))
+        return static, states
+
+    def _checkpoint_files(self):
+        return sorted(glob.glob(os.path.join(self.directory, 'ckpt-*.pkl')))
+
+    def _dump(self, obj, path):
+        # Write to a temporary file first so a crash mid-write leaves the previous checkpoint intact
+        os.makedirs(self.directory, exist_ok=True)
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(obj, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
@@ -0,0 +1,203 @@
+# cosimulation/ensemble_runner.py - Monte-Carlo replicas of every scenario with KPI confidence intervals
+
+import os
+import copy
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+import numpy as np
+import pandas as pd
+from scipy import stats
+
+from .results_analyzer import ResultsAnalyzer
+from .parallel_runner import ParallelScenarioRunner
+from .run_catalog import open_catalog
+
+logger = logging.getLogger(__name__)
+
+class EnsembleRunner:
+    """
+    Runs seeded replicas of each base scenario group and aggregates the KPIs of
+    ``ResultsAnalyzer.calculate_kpis`` into means, standard deviations and
+    Student-t confidence intervals.
+
+    A replica runs every penetration level of one base scenario (baseline
+    included) with a single seed, so each KPI is computed against the baseline
+    of the same replica. Replicas run in a process pool. After
+    ``min_replicas``, a group only gets more replicas while one of its KPIs
+    still has a confidence-interval half-width above the target, up to
+    ``max_replicas``.
+    """
+
+    def __init__(self, config):
+        self.config = config
+        self.params = config.ensemble_params
+        self.analyzer = ResultsAnalyzer(config)
+
+    def get_replica_seed(self, replica):
+        """Seed of replica ``replica``; the same for every base scenario group."""
+        return int(np.random.SeedSequence([self.params['base_seed'], replica]).generate_state(1)[0])
+
+    def run(self, scenarios):
+        """
+        Run the ensemble.
+
+        Args:
+            scenarios (list): Scenario dicts from ScenarioManager.
+
+        Returns:
+            dict: Per scenario name, the number of replicas and the statistics
+                of each numeric KPI (see ``aggregate``).
+        """
+        groups = {}
+        for scenario in scenarios:
+            groups.setdefault(scenario['base_name'], []).append(scenario)
+
+        min_replicas = self._min_replicas()
+        max_replicas = max(self.params['max_replicas'], min_replicas)
+        samples = {base_name: [] for base_name in groups}
+        submitted = {base_name: 0 for base_name in groups}
+
+        catalog = open_catalog(self.config)
+        config_hash = self.config.get_fingerprint()
+        max_workers = ParallelScenarioRunner(self.config).get_max_workers(len(groups) * min_replicas)
+        logger.info(f"Running ensemble of {len(groups)} scenario groups on {max_workers} worker processes")
+        context = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(max_workers=max_workers, mp_context=context) as executor:
+            pending = {}
+
+            def submit(base_name):
+                seed = self.get_replica_seed(submitted[base_name])
+                future = executor.submit(run_replica_worker, self.config, groups[base_name], seed)
+                pending[future] = (base_name, seed)
+                submitted[base_name] += 1
+
+            for base_name in groups:
+                for _ in range(min_replicas):
+                    submit(base_name)
+
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    base_name, seed = pending.pop(future)
+                    summaries = future.result()
+                    if catalog is not None:
+                        for scenario in groups[base_name]:
+                            catalog.record(scenario, summaries[scenario['name']], run_type='ensemble',
+                                           config_hash=config_hash, seed=seed,
+                                           kernel=self.config.simulation_params['kernel'])
+                    samples[base_name].append(
+                        self.analyzer.calculate_kpis({name: {'summary': s} for name, s in summaries.items()}))
+                    completed = len(samples[base_name])
+                    if completed < min_replicas or submitted[base_name] >= max_replicas:
+                        continue
+                    if self._converged(self.aggregate(samples[base_name])):
+                        logger.info(f"Ensemble for {base_name} converged after {completed} replicas")
+                    else:
+                        submit(base_name)
+
+        ensemble = {}
+        for base_name, replicas in samples.items():
+            if len(replicas) >= max_replicas and not self._converged(self.aggregate(replicas)):
+                logger.warning(f"Ensemble for {base_name} reached {max_replicas} replicas without converging")
+            ensemble.update(self.aggregate(replicas))
+        return ensemble
+
+    def aggregate(self, replicas):
+        """
+        Statistics of each numeric KPI over replicas.
+
+        Args:
+            replicas (list): One ``calculate_kpis`` result per replica.
+
+        Returns:
+            dict: ``{scenario: {'replicas': n, 'kpis': {kpi: {'mean', 'std',
+                'half_width', 'ci_low', 'ci_high'}}}}``.
+        """
+        confidence = self.params['confidence_level']
+        aggregated = {}
+        scenario_names = sorted({name for kpis in replicas for name in kpis})
+        for name in scenario_names:
+            values = pd.DataFrame([kpis[name] for kpis in replicas if name in kpis])
+            values = values.select_dtypes(include='number')
+            n = len(values)
+            kpi_stats = {}
+            for kpi in values.columns:
+                column = values[kpi].to_numpy(dtype=float)
+                mean = column.mean()
+                std = column.std(ddof=1) if n > 1 else np.nan
+                half_width = stats.t.ppf(0.5 + confidence / 2, n - 1) * std / np.sqrt(n) if n > 1 else np.inf
+                kpi_stats[kpi] = {
+                    'mean': mean,
+                    'std': std,
+                    'half_width': half_width,
+                    'ci_low': mean - half_width,
+                    'ci_high': mean + half_width,
+                }
+            aggregated[name] = {'replicas': n, 'kpis': kpi_stats}
+        return aggregated
+
+    def _min_replicas(self):
+        """Replicas needed before convergence is checked; a half-width needs at least two."""
+        return max(self.params['min_replicas'], 2)
+
+    def _converged(self, aggregated):
+        """
+        True when every scenario has the minimum replica count and every KPI
+        half-width is within the relative or absolute target. An undefined
+        (NaN) half-width never counts as converged.
+        """
+        relative = self.params['target_relative_half_width']
+        absolute = self.params['target_absolute_half_width']
+        for result in aggregated.values():
+            if result['replicas'] < self._min_replicas():
+                return False
+            for kpi in result['kpis'].values():
+                if not kpi['half_width'] <= max(relative * abs(kpi['mean']), absolute):
+                    return False
+        return True
+
+    def save(self, ensemble, path=None):
+        """Write the aggregated KPIs as one row per scenario and KPI."""
+        path = path or os.path.join(self.config.results_dir, 'ensemble_kpis.csv')
+        rows = [
+            {'scenario': name, 'replicas': result['replicas'], 'kpi': kpi, **kpi_stats}
+            for name, result in ensemble.items()
+            for kpi, kpi_stats in result['kpis'].items()
+        ]
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        pd.DataFrame(rows).to_csv(path, index=False)
+        logger.info(f"Saved ensemble KPIs to {path}")
+        return path
+
+def run_replica_worker(config, scenarios, seed):
+    """
+    Worker: run every scenario of one base group with one seed and return
+    their summaries. All scenarios start from the same fleet and trips.
+    """
+    from traffic_model.data_loader import TrafficDataLoader
+    from traffic_model.main_traffic import TrafficModel
+    from power_grid_model.ieee_13_bus_model import IEEE13BusSystem
+    from cosimulation.simulation_engine import CoSimulationEngine
+
+    # Replicas of the same scenario run concurrently; keep them from sharing output directories
+    config.output_params['streaming'] = False
+    config.checkpoint_params['enabled'] = False
+    config.instrumentation_params['enabled'] = False
+
+    np.random.seed(seed)
+    data_loader = TrafficDataLoader(config.data_dir, config.get_data_cache_dir())
+    traffic_model = TrafficModel(config, data_loader)
+    initial_vehicles = copy.deepcopy(traffic_model.vehicles)
+    for day_type in sorted({scenario['day_type'] for scenario in scenarios}):
+        traffic_model.get_daily_trip_pattern(day_type)
+
+    summaries = {}
+    for scenario in scenarios:
+        traffic_model.vehicles = copy.deepcopy(initial_vehicles)
+        power_grid = IEEE13BusSystem(config)
+        power_grid.build_network()
+        engine = CoSimulationEngine(config, traffic_model, power_grid)
+        summaries[scenario['name']] = engine.run_simulation(scenario)['summary']
+    return summaries
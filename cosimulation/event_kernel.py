@@ -0,0 +1,290 @@
+# cosimulation/event_kernel.py - Discrete-event alternative to the fixed time-step loop
+
+import heapq
+import logging
+
+import numpy as np
+from tqdm import tqdm
+
+logger = logging.getLogger(__name__)
+
+# Event kinds; events sharing a timestamp are applied in this order
+EVENT_LOAD_BREAKPOINT = 0
+EVENT_TARIFF_CHANGE = 1
+EVENT_POSITION = 2
+EVENT_SOC_THRESHOLD = 3
+EVENT_VOLTAGE_CHANGE = 4
+
+MINUTES_PER_DAY = 1440
+SOC_EPSILON = 1e-9
+
+class EventDrivenKernel:
+    """
+    Runs a scenario by jumping between events instead of visiting every time step.
+
+    Events are changes of a BDWPT-equipped vehicle's status or location, tariff
+    changes, base-load profile breakpoints, agent SoC threshold crossings and
+    voltage changes after a grid solve. At each event time every agent at a
+    BDWPT node re-decides and the grid is re-solved if its inputs changed.
+    Between events setpoints are constant, so SoC is integrated analytically.
+    The state is sampled onto the reporting grid (``time_step_minutes``)
+    through the engine's recorder, so the outputs have the same format as the
+    time-stepped loop.
+
+    The kernel follows the time-stepped loop's semantics, so with the default
+    resolution (one reporting step) and lockstep grid solves both loops give the
+    same results:
+    - Vehicle positions are those ``VehicleMovement.update_positions`` sets at
+      each reporting step, and a driving vehicle uses one step's energy at
+      every step it is driving.
+    - Agents react to SoC crossings, to SoC-dependent setpoints and to the
+      voltages of a grid solve at the next ``event_resolution_minutes``
+      boundary, as the stepped loop does at its next step.
+
+    Vehicles without BDWPT equipment do not affect the grid and are not moved.
+    """
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.config = engine.config
+        self.queue = []
+        self._sequence = 0
+        self.events_processed = 0
+
+    def run(self, scenario):
+        """Simulate ``scenario`` on an engine that has already been initialized for it."""
+        engine = self.engine
+        config = self.config
+        self.day_type = scenario['day_type']
+        time_steps = config.get_time_series()['time_steps']
+        self.step_minutes = config.simulation_params['time_step_minutes']
+        self.resolution = config.simulation_params['event_resolution_minutes'] or self.step_minutes
+        self.end_time = (len(time_steps) - 1) * self.step_minutes
+
+        self.vehicles = engine.traffic_model.vehicles
+        self.agents = engine.bdwpt_agents
+        self.bdwpt_nodes = list(config.grid_params['bdwpt_nodes'])
+        self.node_set = set(self.bdwpt_nodes)
+        # Same energy use per driving step as CoSimulationEngine._update_traffic
+        self.driving_km_per_step = config.traffic_params['average_trip_distance_km'] / 30
+
+        self.now = 0.0
+        self.tariff = None
+        self.load_row = 0
+        self.node_powers = {node: 0 for node in self.bdwpt_nodes}
+        self.pf_results = None
+        self._solved_inputs = None
+        self._voltages = None
+        self.last_update = {vehicle_id: 0.0 for vehicle_id in self.agents}
+        self.versions = {vehicle_id: 0 for vehicle_id in self.agents}
+
+        start_minute = config.get_time_step_minutes(time_steps[0])
+        self._schedule_load_breakpoints()
+        self._schedule_tariff_changes(time_steps[0].hour, start_minute)
+        self._schedule_trips(start_minute)
+
+        profiler = engine.profiler
+        for r, timestamp in enumerate(tqdm(time_steps, desc="Event Simulation Progress")):
+            report_time = r * self.step_minutes
+            while self.queue and self.queue[0][0] <= report_time:
+                self._process_events(self.queue[0][0])
+            with profiler.stage('result_collection'):
+                # The stepped loop records each agent after it has acted over the step
+                socs = self._projected_socs(report_time + self.step_minutes) if engine.trajectories is not None else None
+                engine._collect_step_results(r, timestamp, self.pf_results, self.node_powers, socs)
+            if engine.stop_on_violation and engine._detect_violation(r, self.pf_results):
+                self.end_time = report_time
+                break
+
+        self.now = self.end_time + self.step_minutes
+        for vehicle_id in self.agents:
+            self._advance_agent(vehicle_id)
+        logger.info(f"Event kernel processed {self.events_processed} events and "
+                    f"{engine.grid_solves} grid solves for {len(time_steps)} reporting steps")
+
+    def _schedule(self, time, kind, payload=None):
+        if 0 <= time <= self.end_time:
+            heapq.heappush(self.queue, (time, kind, self._sequence, payload))
+            self._sequence += 1
+
+    def _schedule_load_breakpoints(self):
+        matrix = self.engine._get_load_profiles().get_matrix(self.day_type)
+        changes = np.flatnonzero(np.any(matrix[1:] != matrix[:-1], axis=1)) + 1
+        for row in [0, *changes]:
+            self._schedule(row * self.step_minutes, EVENT_LOAD_BREAKPOINT, int(row))
+
+    def _schedule_tariff_changes(self, start_hour, start_minute):
+        self._schedule(0.0, EVENT_TARIFF_CHANGE, self.config.get_tariff_at_hour(start_hour))
+        hour = start_hour
+        boundary = 60 - start_minute % 60
+        while boundary <= self.end_time:
+            previous = self.config.get_tariff_at_hour(hour)
+            hour = (hour + 1) % 24
+            tariff = self.config.get_tariff_at_hour(hour)
+            if tariff != previous:
+                self._schedule(boundary, EVENT_TARIFF_CHANGE, tariff)
+            boundary += 60
+
+    def _schedule_trips(self, start_minute):
+        """
+        Schedule the status and location each agent's vehicle gets from
+        ``VehicleMovement.update_positions`` at the reporting steps where it may
+        change: the steps within a trip and the first step after it.
+        """
+        trips = self.engine.traffic_model.get_daily_trip_pattern(self.day_type)
+        if trips.empty:
+            return
+        trips = trips[trips['vehicle_id'].isin(list(self.agents))]
+        num_days = int((start_minute + self.end_time) // MINUTES_PER_DAY) + 1
+        step = self.step_minutes
+        for vehicle_id, vehicle_trips in trips.groupby('vehicle_id', sort=False):
+            vehicle_trips = list(vehicle_trips[['departure_time', 'arrival_time', 'destination']].itertuples(index=False))
+            steps = set()
+            for day in range(num_days):
+                offset = day * MINUTES_PER_DAY - start_minute
+                for departure, arrival, _ in vehicle_trips:
+                    first = max(int(np.ceil((offset + departure) / step)), 0)
+                    last = min(int((offset + arrival) // step) + 1, int(self.end_time // step))
+                    steps.update(range(first, last + 1))
+            vehicle = self.vehicles[vehicle_id]
+            status, location = vehicle['status'], vehicle['location']
+            for k in sorted(steps):
+                minute = (start_minute + k * step) % MINUTES_PER_DAY
+                new_status, new_location = _position_at(vehicle_trips, minute, status, location)
+                if (new_status, new_location) != (status, location) or new_status == 'driving':
+                    self._schedule(k * step, EVENT_POSITION, (vehicle_id, new_status, new_location))
+                status, location = new_status, new_location
+
+    def _process_events(self, time):
+        """Apply every event at ``time``, then let agents react and re-solve the grid."""
+        self.now = time
+        profiler = self.engine.profiler
+        with profiler.stage('traffic_update'):
+            self._apply_events(time)
+        with profiler.stage('bdwpt_power'):
+            self._decide()
+        self._solve_grid()
+
+    def _apply_events(self, time):
+        while self.queue and self.queue[0][0] == time:
+            _, kind, _, payload = heapq.heappop(self.queue)
+            if kind == EVENT_LOAD_BREAKPOINT:
+                self.load_row = payload
+            elif kind == EVENT_TARIFF_CHANGE:
+                self.tariff = payload
+            elif kind == EVENT_POSITION:
+                vehicle_id, status, location = payload
+                self._advance_agent(vehicle_id)
+                vehicle = self.vehicles[vehicle_id]
+                vehicle['status'] = status
+                vehicle['location'] = location
+                if status == 'driving':
+                    self.agents[vehicle_id].update_soc_from_driving(self.driving_km_per_step)
+                    self.engine.profiler.count('vehicles_moved')
+            elif kind == EVENT_SOC_THRESHOLD:
+                vehicle_id, version = payload
+                if version != self.versions[vehicle_id]:
+                    continue  # Superseded by a later decision
+            self.events_processed += 1
+
+    def _decide(self):
+        """Every agent at a BDWPT node re-decides, as it would at every time step."""
+        engine = self.engine
+        node_powers = {node: 0 for node in self.bdwpt_nodes}
+        for vehicle_id, agent in self.agents.items():
+            self._advance_agent(vehicle_id)
+            location = self.vehicles[vehicle_id]['location']
+            voltage = 1.0
+            if location in self.node_set:
+                voltage = engine.power_grid.get_voltage(location)
+                previous_mode = agent.mode if agent.operation_history else None
+                # SoC is integrated by _advance_agent, so the decision itself covers no time
+                agent.decide_action(voltage, self.tariff, 0)
+                engine._update_mode_counts(agent, previous_mode)
+                engine.profiler.count('agents_evaluated')
+                node_powers[location] += agent.power_setpoint
+            self._schedule_soc_crossing(vehicle_id, voltage)
+        self.node_powers = node_powers
+
+    def _solve_grid(self):
+        inputs = (self.load_row, tuple(self.node_powers.values()))
+        if inputs == self._solved_inputs:
+            return
+        engine = self.engine
+        with engine.profiler.stage('grid_load_update'):
+            engine._update_grid_loads(self.load_row, self.day_type, self.node_powers)
+        with engine.profiler.stage('power_flow'):
+            self.pf_results = engine.power_grid.solve_power_flow()
+        engine._count_solve(self.pf_results)
+        engine._last_pf_results = self.pf_results
+        engine.grid_solves += 1
+        self._solved_inputs = inputs
+
+        # Agents see the new voltages when they next act, as at the stepped loop's next step
+        voltages = tuple(engine.power_grid.get_voltage(node) for node in self.bdwpt_nodes)
+        if voltages != self._voltages:
+            self._schedule(self.now + self.resolution, EVENT_VOLTAGE_CHANGE)
+        self._voltages = voltages
+
+    def _advance_agent(self, vehicle_id):
+        """Integrate one agent's SoC from its last update to now."""
+        minutes = self.now - self.last_update[vehicle_id]
+        if minutes <= 0:
+            return
+        if self.vehicles[vehicle_id]['location'] in self.node_set:
+            self.agents[vehicle_id].advance(minutes)
+        self.last_update[vehicle_id] = self.now
+
+    def _soc_rate(self, vehicle_id):
+        """SoC change per minute; driving energy is taken per step at position events."""
+        if self.vehicles[vehicle_id]['location'] in self.node_set:
+            return self.agents[vehicle_id].get_soc_rate()
+        return 0.0
+
+    def _projected_socs(self, time):
+        """SoC of every agent at ``time``; agents are integrated lazily, so this does not advance them."""
+        return np.fromiter(
+            (min(max(agent.soc + self._soc_rate(vehicle_id) * (time - self.last_update[vehicle_id]), 0.0), 1.0)
+             for vehicle_id, agent in self.agents.items()),
+            dtype=np.float64, count=len(self.agents))
+
+    def _schedule_soc_crossing(self, vehicle_id, voltage):
+        """Schedule the next SoC breakpoint the agent reaches at its current rate."""
+        self.versions[vehicle_id] += 1
+        rate = self._soc_rate(vehicle_id)
+        if rate == 0:
+            return
+        agent = self.agents[vehicle_id]
+        if agent.soc_modulated:
+            # The setpoint follows SoC continuously; act again at the next boundary
+            self._schedule(self.now + self.resolution, EVENT_SOC_THRESHOLD, (vehicle_id, self.versions[vehicle_id]))
+            return
+        breakpoints = agent.get_soc_breakpoints(voltage, self.tariff)
+        if rate > 0:
+            ahead = [b for b in breakpoints if b > agent.soc + SOC_EPSILON]
+            target = min(ahead) if ahead else None
+        else:
+            ahead = [b for b in breakpoints if b < agent.soc - SOC_EPSILON]
+            target = max(ahead) if ahead else None
+        if target is not None:
+            # Acting on crossings at a fixed resolution batches agents together and prevents
+            # chattering around score breakpoints that move with every grid solve
+            crossing = self.now + (target - agent.soc) / rate
+            crossing = np.ceil(crossing / self.resolution) * self.resolution
+            self._schedule(max(crossing, self.now + self.resolution), EVENT_SOC_THRESHOLD,
+                           (vehicle_id, self.versions[vehicle_id]))
+
+def _position_at(trips, minute, status, location):
+    """
+    Status and location ``VehicleMovement.update_positions`` gives one vehicle
+    at ``minute`` of the day, from its trips in table order and its previous state.
+    """
+    if status == 'driving':
+        status = 'parked'
+    for departure, arrival, destination in trips:
+        if departure <= minute < arrival and destination != 'home':
+            status, location = 'driving', destination
+    for departure, arrival, destination in trips:
+        if arrival == minute:
+            status, location = 'parked', destination
+    return status, location
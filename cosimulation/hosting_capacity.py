@@ -0,0 +1,154 @@
+# cosimulation/hosting_capacity.py - Hosting-capacity search by bisection over BDWPT penetration
+
+import os
+import copy
+import logging
+
+import numpy as np
+import pandas as pd
+
+from .scenarios import ScenarioManager
+
+logger = logging.getLogger(__name__)
+
+CONSTRAINTS = ('voltage_low', 'voltage_high', 'thermal')
+
+class HostingCapacitySolver:
+    """
+    Finds, per base scenario, the highest BDWPT penetration at which the grid
+    stays within its voltage and thermal limits.
+
+    Every probe is a co-simulation that stops at the first violation of a
+    monitored constraint. The search brackets each constraint separately: a
+    probe that completes raises the lower bound of every monitored constraint,
+    and a probe that stops lowers the upper bound of the constraint it
+    violated. The overall hosting capacity is the lowest per-constraint value.
+
+    Each probe starts from the same fleet and reseeds the global RNG, so the
+    equipped vehicle sets are nested across penetrations, as bisection assumes.
+    """
+
+    def __init__(self, config, traffic_model, power_grid):
+        from .simulation_engine import CoSimulationEngine
+        self.config = config
+        self.params = config.hosting_capacity_params
+        self.traffic_model = traffic_model
+        self.engine = CoSimulationEngine(config, traffic_model, power_grid)
+        self.scenario_manager = ScenarioManager(config)
+        self.initial_vehicles = copy.deepcopy(traffic_model.vehicles)
+        self.constraints = tuple(self.params['constraints'])
+        unknown = set(self.constraints) - set(CONSTRAINTS)
+        if unknown:
+            raise ValueError(f"Unknown hosting-capacity constraints {sorted(unknown)}; expected {CONSTRAINTS}")
+
+    def run(self, base_names=None):
+        """
+        Search every base scenario.
+
+        Args:
+            base_names (list, optional): Base scenarios to search; defaults to all.
+
+        Returns:
+            dict: Per base scenario, the overall hosting capacity (percent), the
+                limiting constraint, per-constraint capacities and the number of runs.
+        """
+        base_names = base_names or list(self.scenario_manager.base_scenarios)
+        return {base_name: self.search(base_name) for base_name in base_names}
+
+    def search(self, base_name):
+        """Bracket the hosting capacity of each constraint for one base scenario."""
+        tolerance = self.params['tolerance_pct']
+        # Per constraint: highest penetration known to pass and lowest known to violate
+        passing = {constraint: None for constraint in self.constraints}
+        failing = {constraint: None for constraint in self.constraints}
+        runs = 0
+
+        def probe(penetration, constraints):
+            nonlocal runs
+            runs += 1
+            violated = self._evaluate(base_name, penetration, constraints)
+            for constraint in constraints:
+                if constraint == violated:
+                    failing[constraint] = penetration
+                elif violated is None:
+                    passing[constraint] = penetration
+            return violated
+
+        # The end points settle most cases in one or two runs: every constraint is
+        # probed at the maximum penetration, and those violated there at zero
+        upper = self.params['max_penetration_pct']
+        end_points = (
+            (upper, lambda c: passing[c] is None and failing[c] is None),
+            (0.0, lambda c: passing[c] is None and failing[c] is not None and failing[c] > 0),
+        )
+        for penetration, unsettled in end_points:
+            constraints = [c for c in self.constraints if unsettled(c)]
+            while constraints and probe(penetration, constraints) is not None:
+                constraints = [c for c in self.constraints if unsettled(c)]
+
+        # Bisect the remaining brackets, most binding constraint first
+        while True:
+            open_constraints = [
+                c for c in self.constraints
+                if passing[c] is not None and failing[c] is not None and failing[c] - passing[c] > tolerance
+            ]
+            if not open_constraints:
+                break
+            target = min(open_constraints, key=lambda c: (passing[c], failing[c]))
+            penetration = (passing[target] + failing[target]) / 2
+            # Only constraints whose bracket contains the probe can learn from it
+            monitored = [c for c in open_constraints if passing[c] < penetration < failing[c]]
+            logger.debug(f"Probing {base_name} at {penetration:.2f}% for {monitored}")
+            probe(penetration, monitored)
+
+        capacities = {}
+        for constraint in self.constraints:
+            if failing[constraint] is None:
+                capacity = upper  # Not reached within the searched range
+            else:
+                capacity = passing[constraint] if passing[constraint] is not None else 0.0
+            capacities[constraint] = {
+                'hosting_capacity_pct': capacity,
+                'first_violation_pct': failing[constraint],
+            }
+        limiting = min(self.constraints, key=lambda c: capacities[c]['hosting_capacity_pct'])
+        if capacities[limiting]['first_violation_pct'] is None:
+            limiting = None
+        result = {
+            'hosting_capacity_pct': capacities[limiting]['hosting_capacity_pct'] if limiting else upper,
+            'limiting_constraint': limiting,
+            'constraints': capacities,
+            'runs': runs,
+        }
+        logger.info(f"Hosting capacity of {base_name}: {result['hosting_capacity_pct']:.2f}% "
+                    f"(limited by {limiting or 'none within the searched range'}, {runs} runs)")
+        return result
+
+    def _evaluate(self, base_name, penetration, constraints):
+        """Run one probe; return the violated constraint or None."""
+        self.traffic_model.vehicles = copy.deepcopy(self.initial_vehicles)
+        np.random.seed(self.params['seed'])
+        self.engine.stop_on_violation = tuple(constraints)
+        self.engine.run_simulation(self.scenario_manager.get_scenario(base_name, penetration))
+        violation = self.engine.violation
+        return violation['constraint'] if violation else None
+
+    def save(self, results, path=None):
+        """Write one row per base scenario and constraint."""
+        path = path or os.path.join(self.config.results_dir, 'hosting_capacity.csv')
+        rows = [
+            {
+                'base_scenario': base_name,
+                'constraint': constraint,
+                'hosting_capacity_pct': values['hosting_capacity_pct'],
+                'first_violation_pct': values['first_violation_pct'],
+                'limiting': constraint == result['limiting_constraint'],
+                'runs': result['runs'],
+            }
+            for base_name, result in results.items()
+            for constraint, values in result['constraints'].items()
+        ]
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        pd.DataFrame(rows).to_csv(path, index=False)
+        logger.info(f"Saved hosting capacity to {path}")
+        return path
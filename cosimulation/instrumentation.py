@@ -0,0 +1,143 @@
+# cosimulation/instrumentation.py - Lightweight per-stage timing and counters for run_simulation
+
+import os
+import json
+import time
+import logging
+from collections import defaultdict
+
+import numpy as np
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+logger = logging.getLogger(__name__)
+
+# Current resident set size, read from procfs (Linux only)
+_STATM_PATH = '/proc/self/statm'
+_PAGE_KB = os.sysconf('SC_PAGE_SIZE') // 1024 if hasattr(os, 'sysconf') else 4
+
+# Log-spaced histogram bin edges for stage durations: 1 µs to 100 s, 4 bins per decade
+HISTOGRAM_EDGES = np.logspace(-6, 2, 33)
+
+class _NullStage:
+    """Shared no-op context manager used when instrumentation is disabled."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+_NULL_STAGE = _NullStage()
+
+def _current_rss_kb():
+    """Resident set size of this process now, or None where procfs is unavailable."""
+    try:
+        with open(_STATM_PATH, 'rb') as f:
+            return int(f.read().split()[1]) * _PAGE_KB
+    except OSError:
+        return None
+
+class _Stage:
+    __slots__ = ('profiler', 'name', 'start', 'rss_kb')
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.rss_kb = _current_rss_kb()
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        seconds = time.perf_counter() - self.start
+        rss_kb = _current_rss_kb()
+        self.profiler._record(self.name, seconds, None if rss_kb is None else rss_kb - self.rss_kb)
+        return False
+
+class StageProfiler:
+    """
+    Collects wall-clock durations per loop stage (as log-spaced histograms),
+    event counters and the change in resident memory (RSS) across each stage
+    execution. RSS is read before and after every stage, so a stage reports
+    the memory it added or released, not the process-wide high-water mark
+    (reported once, as ``peak_rss_kb`` of the whole run).
+
+    When disabled, ``stage()`` returns a shared no-op context manager and
+    ``count()`` returns immediately, so the instrumented loop pays only for
+    the calls themselves.
+    """
+
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self.reset()
+
+    def reset(self):
+        self.histograms = defaultdict(lambda: np.zeros(len(HISTOGRAM_EDGES) + 1, dtype=np.int64))
+        self.totals = defaultdict(float)
+        self.calls = defaultdict(int)
+        self.minimums = {}
+        self.maximums = {}
+        self.rss_growth_kb = {}
+        self.max_rss_growth_kb = {}
+        self.counters = defaultdict(int)
+        self.started = time.perf_counter()
+
+    def stage(self, name):
+        """Context manager timing one execution of stage ``name``."""
+        if not self.enabled:
+            return _NULL_STAGE
+        return _Stage(self, name)
+
+    def count(self, name, amount=1):
+        """Add ``amount`` to counter ``name``."""
+        if self.enabled:
+            self.counters[name] += amount
+
+    def _record(self, name, seconds, rss_delta_kb=None):
+        self.histograms[name][np.searchsorted(HISTOGRAM_EDGES, seconds)] += 1
+        self.totals[name] += seconds
+        self.calls[name] += 1
+        self.minimums[name] = min(self.minimums.get(name, seconds), seconds)
+        self.maximums[name] = max(self.maximums.get(name, seconds), seconds)
+        if rss_delta_kb is not None:
+            self.rss_growth_kb[name] = self.rss_growth_kb.get(name, 0) + rss_delta_kb
+            self.max_rss_growth_kb[name] = max(self.max_rss_growth_kb.get(name, rss_delta_kb), rss_delta_kb)
+
+    def report(self):
+        """Machine-readable summary of everything collected since the last reset."""
+        wall_time = time.perf_counter() - self.started
+        stages = {}
+        for name, calls in self.calls.items():
+            stages[name] = {
+                'calls': calls,
+                'total_s': self.totals[name],
+                'mean_s': self.totals[name] / calls,
+                'min_s': self.minimums[name],
+                'max_s': self.maximums[name],
+                'share_of_wall_time': self.totals[name] / wall_time if wall_time else 0.0,
+                # Net RSS change summed over all calls, and the largest change in one call
+                'rss_growth_kb': self.rss_growth_kb.get(name),
+                'max_rss_growth_kb': self.max_rss_growth_kb.get(name),
+                # Counts per bin; bin i holds durations in (edges[i-1], edges[i]]
+                'histogram': self.histograms[name].tolist(),
+            }
+        return {
+            'wall_time_s': wall_time,
+            'histogram_edges_s': HISTOGRAM_EDGES.tolist(),
+            # Process-wide high-water mark (ru_maxrss), not attributable to a stage
+            'peak_rss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss if resource is not None else None,
+            'stages': stages,
+            'counters': dict(self.counters),
+        }
+
+    def write_report(self, path, **metadata):
+        """Write the report as JSON, together with any extra metadata fields."""
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w') as f:
+            json.dump({**metadata, **self.report()}, f, indent=2)
+        logger.info(f"Wrote performance report to {path}")
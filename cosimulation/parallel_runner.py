@@ -0,0 +1,197 @@
+# cosimulation/parallel_runner.py - Run scenarios in worker processes with shared read-only inputs
+
+import os
+import logging
+import traceback
+import multiprocessing
+from multiprocessing import shared_memory
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+class SharedFrame:
+    """
+    A DataFrame published once into a shared-memory block. Numeric columns are
+    stored as-is and object columns as int32 codes plus their (small) list of
+    distinct values, so workers rebuild the frame from a compact handle
+    instead of unpickling the data.
+    """
+
+    def __init__(self, df):
+        columns, arrays, offset = [], [], 0
+        for name in df.columns:
+            values = df[name]
+            categories = None
+            if values.dtype.kind in 'biuf':
+                array = np.ascontiguousarray(values.to_numpy())
+            else:
+                codes, uniques = pd.factorize(values)
+                array = codes.astype(np.int32)
+                categories = list(uniques)
+            columns.append({'name': name, 'dtype': array.dtype.str, 'offset': offset, 'categories': categories})
+            arrays.append(array)
+            offset += -(-array.nbytes // 8) * 8  # Keep every column 8-byte aligned
+
+        self._shm = shared_memory.SharedMemory(create=True, size=max(offset, 1))
+        for column, array in zip(columns, arrays):
+            target = np.ndarray(array.shape, dtype=array.dtype, buffer=self._shm.buf, offset=column['offset'])
+            target[:] = array
+        self.handle = {'shm_name': self._shm.name, 'num_rows': len(df), 'columns': columns}
+
+    def close(self):
+        """Release and remove the shared block (publisher side)."""
+        self._shm.close()
+        self._shm.unlink()
+
+    @staticmethod
+    def attach(handle):
+        """
+        Rebuild the DataFrame in a worker. Numeric columns are read-only views
+        of the shared block; the block stays mapped for the life of the process.
+        """
+        shm = _attach_shared_memory(handle['shm_name'])
+        data = {}
+        for column in handle['columns']:
+            array = np.ndarray(handle['num_rows'], dtype=np.dtype(column['dtype']),
+                               buffer=shm.buf, offset=column['offset'])
+            array.flags.writeable = False
+            if column['categories'] is not None:
+                categories = np.empty(len(column['categories']), dtype=object)
+                categories[:] = column['categories']
+                array = categories[array]
+            data[column['name']] = array
+        return pd.DataFrame(data, copy=False)
+
+# Shared blocks attached by this worker process, kept open while their views are in use
+_attached_blocks = {}
+
+def _attach_shared_memory(name):
+    if name not in _attached_blocks:
+        # Spawned workers share the publisher's resource tracker, so attaching does not
+        # hand ownership of the block to this process; the publisher unlinks it
+        _attached_blocks[name] = shared_memory.SharedMemory(name=name)
+    return _attached_blocks[name]
+
+def available_memory_mb():
+    """Memory available to new processes in MB, or None if it cannot be determined."""
+    try:
+        import psutil
+        return psutil.virtual_memory().available / 2**20
+    except ImportError:
+        pass
+    try:
+        with open('/proc/meminfo') as f:
+            for line in f:
+                if line.startswith('MemAvailable:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+class ParallelScenarioRunner:
+    """
+    Runs scenarios concurrently, one per worker process. Each worker builds its
+    own grid (OpenDSS is process-global) and traffic model; the fleet and the
+    trip tables are generated once by the caller and shared read-only through
+    shared memory. Every scenario starts from the same initial fleet state.
+    """
+
+    def __init__(self, config):
+        self.config = config
+        self.params = config.parallel_params
+
+    def get_max_workers(self, num_tasks):
+        """Worker count limited by CPUs, the configured maximum and available memory."""
+        max_workers = self.params['max_workers'] or os.cpu_count() or 1
+        available = available_memory_mb()
+        if available is not None:
+            memory_limit = max(1, int(available // self.params['memory_per_worker_mb']))
+            if memory_limit < max_workers:
+                logger.info(f"Limiting workers to {memory_limit} for {available:.0f} MB of available memory")
+                max_workers = memory_limit
+        return max(1, min(max_workers, num_tasks))
+
+    def publish_inputs(self, traffic_model, day_types):
+        """
+        Generate the fleet and the trip tables of ``day_types`` once and publish
+        them to shared memory.
+
+        Returns:
+            dict: SharedFrame per key ('fleet' or a day type); the caller closes them.
+        """
+        trips = {day_type: traffic_model.get_daily_trip_pattern(day_type) for day_type in sorted(day_types)}
+        shared = {'fleet': SharedFrame(pd.DataFrame(traffic_model.vehicles))}
+        shared.update({day_type: SharedFrame(df) for day_type, df in trips.items()})
+        return shared
+
+    def run(self, scenarios, traffic_model, on_result=None, seeds=None):
+        """
+        Run ``scenarios`` in parallel.
+
+        Args:
+            scenarios (list): Scenario dicts from ScenarioManager.
+            traffic_model (TrafficModel): Source of the shared fleet and trip tables.
+            on_result (callable, optional): Called as ``on_result(scenario, results)``
+                in the parent as each scenario completes.
+            seeds (dict, optional): Random seed for each scenario name.
+
+        Returns:
+            dict: Results keyed by scenario name, in the order of ``scenarios``. A
+            scenario that fails is logged and left out; the others still complete.
+        """
+        shared = self.publish_inputs(traffic_model, {scenario['day_type'] for scenario in scenarios})
+        handles = {key: frame.handle for key, frame in shared.items()}
+
+        max_workers = self.get_max_workers(len(scenarios))
+        logger.info(f"Running {len(scenarios)} scenarios on {max_workers} worker processes")
+        results = {}
+        try:
+            context = multiprocessing.get_context('spawn')
+            with ProcessPoolExecutor(max_workers=max_workers, mp_context=context) as executor:
+                futures = {
+                    executor.submit(run_scenario_worker, self.config, scenario, handles,
+                                    (seeds or {}).get(scenario['name'])): scenario
+                    for scenario in scenarios
+                }
+                for future in as_completed(futures):
+                    scenario = futures[future]
+                    try:
+                        results[scenario['name']] = future.result()
+                        logger.info(f"Scenario {scenario['name']} completed")
+                        if on_result is not None:
+                            on_result(scenario, results[scenario['name']])
+                    except Exception as e:
+                        logger.error(f"Scenario {scenario['name']} failed: {e}")
+                        logger.error(f"Full traceback: {traceback.format_exc()}")
+        finally:
+            for frame in shared.values():
+                frame.close()
+
+        return {scenario['name']: results[scenario['name']] for scenario in scenarios if scenario['name'] in results}
+
+def run_scenario_worker(config, scenario, handles, seed=None, summary_only=False):
+    """
+    Worker: simulate one scenario on a private grid and traffic model. With
+    ``summary_only`` only the summary is sent back to the parent.
+    """
+    # Imported here so the parent does not pay for them when only publishing data
+    from traffic_model.data_loader import TrafficDataLoader
+    from traffic_model.main_traffic import TrafficModel
+    from power_grid_model.ieee_13_bus_model import IEEE13BusSystem
+    from cosimulation.simulation_engine import CoSimulationEngine
+
+    if seed is not None:
+        np.random.seed(seed)
+
+    vehicles = SharedFrame.attach(handles['fleet']).to_dict('records')
+    daily_trips = {key: SharedFrame.attach(handle) for key, handle in handles.items() if key != 'fleet'}
+    traffic_model = TrafficModel(config, TrafficDataLoader(config.data_dir, config.get_data_cache_dir()), vehicles, daily_trips)
+
+    power_grid = IEEE13BusSystem(config)
+    power_grid.build_network()
+    engine = CoSimulationEngine(config, traffic_model, power_grid)
+    results = engine.run_simulation(scenario, resume=config.checkpoint_params['resume'])
+    return {'summary': results['summary']} if summary_only else results
@@ -0,0 +1,250 @@
+# cosimulation/result_recorder.py - Preallocated columnar storage for per-step results
+
+import copy
+import numpy as np
+import pandas as pd
+import logging
+
+logger = logging.getLogger(__name__)
+
+AGENT_MODES = ('G2V', 'V2G', 'idle')
+
+class ResultRecorder:
+    """
+    Stores per-step co-simulation results in typed arrays allocated once at
+    scenario start and written by step index. Multi-column groups (bus voltages,
+    BDWPT node powers, line flows) are (steps x items) matrices in column-major
+    order, so every DataFrame column is a contiguous view.
+
+    With a writer attached the arrays only hold ``chunk_size`` steps: each full
+    chunk is folded into the running summary and handed to the writer, then the
+    buffers are reused for the next chunk.
+    """
+
+    SCALAR_COLUMNS = (
+        'total_load_kw', 'total_losses_kw', 'total_bdwpt_kw',
+        'bdwpt_charging_kw', 'bdwpt_discharging_kw'
+    )
+
+    def __init__(self, num_steps, bus_ids, bdwpt_nodes, writer=None, chunk_size=None,
+                 voltage_limits=(0.95, 1.05), max_loading_percent=100):
+        """
+        Args:
+            num_steps (int): Number of simulation time steps.
+            bus_ids (list): Buses whose voltages are recorded, in column order.
+            bdwpt_nodes (list): BDWPT nodes whose power is recorded, in column order.
+            writer (ChunkedResultWriter, optional): Destination for flushed chunks.
+            chunk_size (int, optional): Steps held in memory; defaults to the whole run.
+            voltage_limits (tuple): (min, max) p.u. voltage counted as a violation outside.
+            max_loading_percent (float): Line loading counted as a thermal violation above.
+        """
+        self.num_steps = num_steps
+        self.bus_ids = list(bus_ids)
+        self.bdwpt_nodes = list(bdwpt_nodes)
+        self.writer = writer
+        self.chunk_size = min(chunk_size or num_steps, num_steps) if writer else num_steps
+        self.chunk_start = 0
+        self.rows_filled = 0
+        self.line_names = None
+        self.summary = SummaryAccumulator(voltage_limits, max_loading_percent)
+
+        rows = self.chunk_size
+        self.timestamps = np.empty(rows, dtype='datetime64[ns]')
+        self.converged = np.zeros(rows, dtype=bool)
+        self.scalars = {name: np.zeros(rows) for name in self.SCALAR_COLUMNS}
+        self.voltages = np.full((rows, len(self.bus_ids)), np.nan, order='F')
+        self.bdwpt_node_kw = np.zeros((rows, len(self.bdwpt_nodes)), order='F')
+        self.mode_counts = np.zeros((rows, len(AGENT_MODES)), dtype=np.int64, order='F')
+        self.line_flows = None  # Allocated on the first step, once the line count is known
+
+    @property
+    def streaming(self):
+        return self.writer is not None
+
+    def record(self, step_index, timestamp, pf_results, bdwpt_powers, mode_counts):
+        """Write one step's results into row ``step_index`` (relative to the current chunk)."""
+        row = step_index - self.chunk_start
+        self.timestamps[row] = np.datetime64(timestamp, 'ns')
+        self.converged[row] = bool(pf_results['converged'])
+
+        node_powers = np.fromiter((bdwpt_powers.get(node, 0.0) for node in self.bdwpt_nodes),
+                                  dtype=np.float64, count=len(self.bdwpt_nodes))
+        self.bdwpt_node_kw[row] = node_powers
+        self.scalars['total_load_kw'][row] = pf_results['powers']['total_load']
+        self.scalars['total_losses_kw'][row] = pf_results['powers']['total_losses']
+        self.scalars['total_bdwpt_kw'][row] = node_powers.sum()
+        self.scalars['bdwpt_charging_kw'][row] = node_powers[node_powers > 0].sum()
+        self.scalars['bdwpt_discharging_kw'][row] = abs(node_powers[node_powers < 0].sum())
+
+        voltages = pf_results['voltages']
+        self.voltages[row] = np.fromiter((voltages.get(bus, np.nan) for bus in self.bus_ids),
+                                         dtype=np.float64, count=len(self.bus_ids))
+        self.mode_counts[row] = [mode_counts[mode] for mode in AGENT_MODES]
+
+        line_results = pf_results.get('lines')
+        if line_results is not None:
+            if self.line_flows is None:
+                self._allocate_line_flows(line_results, len(line_results['loading_pct']))
+            for key, values in line_results.items():
+                self.line_flows[key][row] = values
+
+        self.rows_filled = max(self.rows_filled, row + 1)
+        if self.streaming and self.rows_filled == self.chunk_size:
+            self.flush()
+
+    def flush(self):
+        """Fold the buffered rows into the summary and, when streaming, write them out."""
+        rows = self.rows_filled
+        if rows == 0:
+            return
+        self.summary.update(self, rows)
+        if self.streaming:
+            self.writer.write_chunk(self.to_dataframe(self.line_names or (), rows))
+            self.chunk_start += rows
+            self.rows_filled = 0
+
+    def finish(self):
+        """Flush any remaining rows and close the writer."""
+        self.flush()
+        if self.streaming:
+            self.writer.close()
+
+    def get_checkpoint_state(self, since_step):
+        """
+        Offsets and running totals needed to resume, plus the buffered rows for
+        steps >= ``since_step`` (earlier rows are in previous checkpoints or on disk).
+        """
+        first = max(since_step - self.chunk_start, 0)
+        return {
+            'chunk_start': self.chunk_start,
+            'rows_filled': self.rows_filled,
+            'line_names': self.line_names,
+            'summary': copy.deepcopy(vars(self.summary)),
+            'writer_parts': list(self.writer.parts) if self.streaming else None,
+            'first_step': self.chunk_start + first,
+            'rows': {name: values[first:self.rows_filled].copy() for name, values in self._buffers().items()},
+        }
+
+    def restore_checkpoint_states(self, states):
+        """Rebuild the buffer and totals by replaying checkpoint states in order."""
+        latest = states[-1]
+        self.chunk_start = latest['chunk_start']
+        self.rows_filled = latest['rows_filled']
+        self.line_names = latest['line_names']
+        vars(self.summary).update(copy.deepcopy(latest['summary']))
+
+        for state in states:
+            # Rows that belong to chunks already written out are skipped
+            offset = state['first_step'] - self.chunk_start
+            skip = max(-offset, 0)
+            line_rows = {name[len('line:'):]: rows for name, rows in state['rows'].items() if name.startswith('line:')}
+            if line_rows and self.line_flows is None:
+                self._allocate_line_flows(line_rows, next(iter(line_rows.values())).shape[1])
+            buffers = self._buffers()
+            for name, rows in state['rows'].items():
+                rows = rows[skip:]
+                start = offset + skip
+                buffers[name][start:start + len(rows)] = rows
+
+    def _allocate_line_flows(self, keys, num_lines):
+        self.line_flows = {key: np.zeros((self.chunk_size, num_lines), order='F') for key in keys}
+
+    def _buffers(self):
+        """Every per-step buffer by a flat name, for checkpointing."""
+        buffers = {
+            'timestamps': self.timestamps,
+            'converged': self.converged,
+            'voltages': self.voltages,
+            'bdwpt_node_kw': self.bdwpt_node_kw,
+            'mode_counts': self.mode_counts,
+        }
+        buffers.update({f'scalar:{name}': values for name, values in self.scalars.items()})
+        if self.line_flows is not None:
+            buffers.update({f'line:{key}': values for key, values in self.line_flows.items()})
+        return buffers
+
+    def get_step(self, step_index):
+        """Return one buffered step as a flat dict (for debugging and inspection)."""
+        return self.to_dataframe(self.line_names or ()).iloc[step_index - self.chunk_start].to_dict()
+
+    def to_dataframe(self, line_names=(), rows=None):
+        """
+        Build the timeseries DataFrame once from the recorded arrays, without copying.
+
+        Args:
+            line_names (list): Line names for the loading-percent columns.
+            rows (int, optional): Only include the first ``rows`` buffered rows.
+        """
+        rows = self.chunk_size if rows is None else rows
+        scalars = {name: values[:rows] for name, values in self.scalars.items()}
+        columns = {'timestamp': self.timestamps[:rows], 'converged': self.converged[:rows]}
+        columns.update(scalars)
+        for j, bus in enumerate(self.bus_ids):
+            columns[f'voltage_bus_{bus}'] = self.voltages[:rows, j]
+        for j, node in enumerate(self.bdwpt_nodes):
+            columns[f'bdwpt_node_{node}_kw'] = self.bdwpt_node_kw[:rows, j]
+        for j, mode in enumerate(AGENT_MODES):
+            columns[f'vehicles_{mode}'] = self.mode_counts[:rows, j]
+        columns['net_load'] = scalars['total_load_kw'] - scalars['total_bdwpt_kw']
+        if self.line_flows is not None:
+            for j, name in enumerate(line_names):
+                columns[f'loading_line_{name}_pct'] = self.line_flows['loading_pct'][:rows, j]
+
+        return pd.DataFrame(columns, copy=False)
+
+class SummaryAccumulator:
+    """Running totals and extremes for the scenario summary, updated one chunk at a time."""
+
+    def __init__(self, voltage_limits=(0.95, 1.05), max_loading_percent=100):
+        self.v_min_limit, self.v_max_limit = voltage_limits
+        self.max_loading_percent = max_loading_percent
+        self.steps = 0
+        self.sums = {name: 0.0 for name in ResultRecorder.SCALAR_COLUMNS}
+        self.peak_load = -np.inf
+        self.min_load = np.inf
+        self.min_voltage = np.nan
+        self.max_voltage = np.nan
+        self.voltage_violations = 0
+        self.reverse_flow_events = 0
+        self.max_line_loading = 0.0
+        self.thermal_violations = 0
+
+    def update(self, recorder, rows):
+        """Fold the first ``rows`` buffered rows of ``recorder`` into the totals."""
+        load = recorder.scalars['total_load_kw'][:rows]
+        self.steps += rows
+        for name in self.sums:
+            self.sums[name] += recorder.scalars[name][:rows].sum()
+        self.peak_load = max(self.peak_load, load.max())
+        self.min_load = min(self.min_load, load.min())
+        self.reverse_flow_events += int((load - recorder.scalars['total_bdwpt_kw'][:rows] < 0).sum())
+
+        voltages = recorder.voltages[:rows]
+        if voltages.size and not np.isnan(voltages).all():
+            self.min_voltage = np.fmin(self.min_voltage, np.nanmin(voltages))
+            self.max_voltage = np.fmax(self.max_voltage, np.nanmax(voltages))
+        self.voltage_violations += int(((voltages < self.v_min_limit) | (voltages > self.v_max_limit)).sum())
+
+        if recorder.line_flows is not None:
+            loading = recorder.line_flows['loading_pct'][:rows]
+            if loading.size:
+                self.max_line_loading = max(self.max_line_loading, loading.max())
+            self.thermal_violations += int((loading > self.max_loading_percent).sum())
+
+    def result(self, hours_per_step):
+        """Summary statistics in the format of CoSimulationEngine results."""
+        return {
+            'peak_load': self.peak_load,
+            'min_load': self.min_load,
+            'avg_load': self.sums['total_load_kw'] / self.steps if self.steps else np.nan,
+            'total_energy_kwh': self.sums['total_load_kw'] * hours_per_step,
+            'total_losses_kwh': self.sums['total_losses_kw'] * hours_per_step,
+            'min_voltage': self.min_voltage,
+            'max_voltage': self.max_voltage,
+            'bdwpt_energy_charged_kwh': self.sums['bdwpt_charging_kw'] * hours_per_step,
+            'bdwpt_energy_discharged_kwh': self.sums['bdwpt_discharging_kw'] * hours_per_step,
+            'voltage_violations': self.voltage_violations,
+            'reverse_flow_events': self.reverse_flow_events,
+            'max_line_loading_pct': self.max_line_loading,
+            'thermal_violations': self.thermal_violations,
+        }
@@ -0,0 +1,124 @@
+# cosimulation/result_writer.py - Chunked on-disk storage for streamed step results
+
+import os
+import json
+import glob
+import logging
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow  # noqa: F401 (pandas uses it for Parquet I/O)
+    PARQUET_AVAILABLE = True
+except ImportError:
+    PARQUET_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_FILE = 'manifest.json'
+
+class ChunkedResultWriter:
+    """
+    Writes the timeseries of one run as a directory of fixed-size parts
+    (``part-00000.parquet`` or ``part-00000.npz``) plus a manifest listing the
+    parts in order. Each part is written once and never modified, so a run can
+    be read back while it is still in progress.
+    """
+
+    def __init__(self, output_dir, fmt='parquet', compression='zstd', resume_parts=None):
+        """
+        Args:
+            output_dir (str): Directory for the parts and manifest. Existing parts
+                are removed unless they are listed in ``resume_parts``.
+            fmt (str): 'parquet' (requires pyarrow) or 'npz'.
+            compression (str): Parquet compression codec.
+            resume_parts (list, optional): Parts recorded in a checkpoint. These are
+                kept and any parts written after the checkpoint are discarded.
+        """
+        if fmt == 'parquet' and not PARQUET_AVAILABLE:
+            logger.warning("pyarrow not available - streaming results as compressed npz parts")
+            fmt = 'npz'
+        if fmt not in ('parquet', 'npz'):
+            raise ValueError(f"Unsupported result format: {fmt}")
+
+        self.output_dir = output_dir
+        self.format = fmt
+        self.compression = compression
+        self.parts = []
+        self.columns = None
+        self.rows_written = 0
+
+        os.makedirs(output_dir, exist_ok=True)
+        if resume_parts:
+            self.format = os.path.splitext(resume_parts[0]['file'])[1][1:]
+            self.parts = [dict(part) for part in resume_parts]
+            self.columns = read_manifest(output_dir)['columns']
+            self.rows_written = sum(part['rows'] for part in self.parts)
+        keep = {part['file'] for part in self.parts}
+        for path in glob.glob(os.path.join(output_dir, 'part-*')):
+            if os.path.basename(path) not in keep:
+                os.remove(path)
+        self._write_manifest()
+
+    def write_chunk(self, df):
+        """Append one chunk of rows as a new part."""
+        if self.columns is None:
+            self.columns = {name: str(dtype) for name, dtype in df.dtypes.items()}
+
+        file_name = f"part-{len(self.parts):05d}.{self.format}"
+        path = os.path.join(self.output_dir, file_name)
+        if self.format == 'parquet':
+            df.to_parquet(path, compression=self.compression, index=False)
+        else:
+            np.savez_compressed(path, **{name: df[name].to_numpy() for name in df.columns})
+
+        self.parts.append({'file': file_name, 'rows': len(df)})
+        self.rows_written += len(df)
+        self._write_manifest()
+        logger.debug(f"Wrote {len(df)} rows to {path}")
+
+    def close(self):
+        logger.info(f"Streamed {self.rows_written} rows in {len(self.parts)} parts to {self.output_dir}")
+
+    def _write_manifest(self):
+        manifest = {
+            'format': self.format,
+            'columns': self.columns,
+            'parts': self.parts,
+            'rows_written': self.rows_written,
+        }
+        # Replace atomically so readers never see a half-written manifest
+        tmp_path = os.path.join(self.output_dir, MANIFEST_FILE + '.tmp')
+        with open(tmp_path, 'w') as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(tmp_path, os.path.join(self.output_dir, MANIFEST_FILE))
+
+def read_manifest(path):
+    with open(os.path.join(path, MANIFEST_FILE)) as f:
+        return json.load(f)
+
+def iter_timeseries_chunks(path, columns=None):
+    """
+    Yield the parts of a streamed timeseries as DataFrames, in order.
+
+    Args:
+        path (str): Directory written by ChunkedResultWriter.
+        columns (list, optional): Subset of columns to load.
+    """
+    manifest = read_manifest(path)
+    for part in manifest['parts']:
+        part_path = os.path.join(path, part['file'])
+        if manifest['format'] == 'parquet':
+            yield pd.read_parquet(part_path, columns=columns)
+        else:
+            with np.load(part_path) as data:
+                names = columns if columns is not None else data.files
+                yield pd.DataFrame({name: data[name] for name in names})
+
+def read_timeseries(path, columns=None):
+    """Load a whole streamed timeseries into one DataFrame."""
+    chunks = list(iter_timeseries_chunks(path, columns))
+    if not chunks:
+        return pd.DataFrame(columns=columns)
+    return pd.concat(chunks, ignore_index=True)
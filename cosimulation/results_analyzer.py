@@ -1,9 +1,12 @@
 # filepath: d:\1st_year_PhD\EEA_2025\EEA2025_v1.4.1\cosimulation\results_analyzer.py
 # /3_cosimulation/results_analyzer.py
 
+import numpy as np
 import pandas as pd
 import logging
 
+from .result_writer import read_manifest, iter_timeseries_chunks
+
 logger = logging.getLogger(__name__)
 
 class ResultsAnalyzer:
@@ -28,13 +31,11 @@ class ResultsAnalyzer:
         """
         kpis = {}
 
-        # First, identify the baseline results for each scenario type
-        # Extract base scenario type from scenario name (e.g., "Weekday Peak_0%" -> "Weekday Peak")
+        # First, identify the baseline results for each scenario type from the summary metadata
         baseline_results = {}
         for scenario_name, results in all_results.items():
             if results['summary']['bdwpt_penetration'] == 0:
-                # Extract base scenario name (e.g., "Weekday Peak_0%" -> "Weekday Peak")
-                base_scenario = scenario_name.replace("_0%", "")
+                base_scenario = results['summary']['base_name']
                 baseline_results[base_scenario] = results
                 logger.debug(f"Found baseline for '{base_scenario}': {scenario_name}")
         
@@ -59,14 +60,15 @@ class ResultsAnalyzer:
                     'reverse_flow_events': results['summary']['reverse_flow_events'],
                     'energy_from_v2g_kwh': results['summary']['bdwpt_energy_discharged_kwh'],
                     'energy_to_g2v_kwh': results['summary']['bdwpt_energy_charged_kwh'],
+                    # Stored results of an identical earlier baseline run, not a new simulation
+                    'reused_baseline': results['summary'].get('reused_baseline', False),
                 }
+                kpi.update(self.calculate_timeseries_kpis(results))
                 kpis[scenario_name] = kpi
                 logger.debug(f"Added baseline KPI for {scenario_name}")
                 continue
 
-            # Extract base scenario name for non-baseline scenarios
-            # e.g., "Weekday Peak_15%" -> "Weekday Peak"
-            base_scenario = "_".join(scenario_name.split("_")[:-1])
+            base_scenario = results['summary']['base_name']
             baseline = baseline_results.get(base_scenario)
 
             if not baseline:
@@ -94,8 +96,84 @@ class ResultsAnalyzer:
                 'energy_from_v2g_kwh': results['summary']['bdwpt_energy_discharged_kwh'],
                 'energy_to_g2v_kwh': results['summary']['bdwpt_energy_charged_kwh'],
             }
+            kpi.update(self.calculate_timeseries_kpis(results))
             kpis[scenario_name] = kpi
             logger.info(f"Calculated KPIs for {scenario_name} relative to baseline {base_scenario}")
         
         logger.info("KPI calculation complete.")
-        return kpis
\ No newline at end of file
+        return kpis
+
+    def calculate_timeseries_kpis(self, results):
+        """
+        Duration and energy KPIs reduced from a scenario's timeseries. Streamed
+        results are read chunk by chunk, loading only the needed columns, so a
+        run never has to fit in memory.
+
+        Args:
+            results (dict): Result dictionary from the simulation engine.
+
+        Returns:
+            dict: voltage_violation_hours (any bus outside limits),
+                  longest_violation_hours (longest continuous such period),
+                  thermal_overload_hours (any line above its loading limit) and
+                  energy_not_served_kwh (load during non-converged power flows).
+                  Empty when the results carry no timeseries.
+        """
+        chunks = self._iter_kpi_chunks(results)
+        if chunks is None:
+            return {}
+
+        tolerance = self.config.grid_params['voltage_tolerance']
+        max_loading = self.config.grid_params['max_loading_percent']
+        hours_per_step = self.config.simulation_params['time_step_minutes'] / 60
+        violation_steps = overload_steps = longest = current = 0
+        unserved_kw = 0.0
+
+        for chunk in chunks:
+            voltages = chunk[[c for c in chunk.columns if c.startswith('voltage_bus_')]].to_numpy(dtype=float)
+            violated = ((voltages < 1 - tolerance) | (voltages > 1 + tolerance)).any(axis=1)
+            violation_steps += int(violated.sum())
+            longest, current = _longest_run(violated, longest, current)
+
+            loading = chunk[[c for c in chunk.columns if c.startswith('loading_line_')]].to_numpy(dtype=float)
+            overload_steps += int((loading > max_loading).any(axis=1).sum())
+
+            failed = ~chunk['converged'].to_numpy(dtype=bool)
+            unserved_kw += np.abs(chunk['total_load_kw'].to_numpy(dtype=float)[failed]).sum()
+
+        return {
+            'voltage_violation_hours': violation_steps * hours_per_step,
+            'longest_violation_hours': longest * hours_per_step,
+            'thermal_overload_hours': overload_steps * hours_per_step,
+            'energy_not_served_kwh': unserved_kw * hours_per_step,
+        }
+
+    def _iter_kpi_chunks(self, results):
+        """Chunks of the KPI columns: the in-memory frame, or the parts on disk."""
+        def needed(columns):
+            return [c for c in columns
+                    if c.startswith(('voltage_bus_', 'loading_line_')) or c in ('converged', 'total_load_kw')]
+
+        if results.get('timeseries') is not None:
+            df = results['timeseries']
+            return iter([df[needed(df.columns)]])
+        path = results.get('timeseries_path')
+        if path:
+            return iter_timeseries_chunks(path, needed(read_manifest(path)['columns']))
+        return None
+
+def _longest_run(flags, longest, current):
+    """
+    Fold one chunk of boolean flags into the longest run of consecutive True
+    values. ``current`` is the run still open at the end of the previous chunk.
+
+    Returns:
+        tuple: (longest run so far, run still open at the end of this chunk)
+    """
+    if flags.all():
+        current += len(flags)
+        return max(longest, current), current
+    breaks = np.flatnonzero(~flags)
+    runs = np.diff(breaks) - 1
+    longest = max(longest, current + breaks[0], runs.max(initial=0), len(flags) - 1 - breaks[-1])
+    return longest, len(flags) - 1 - breaks[-1]
@@ -0,0 +1,142 @@
+# cosimulation/run_catalog.py - Embedded SQLite index of simulation runs
+
+import os
+import json
+import sqlite3
+import logging
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Summary statistics stored as their own (queryable) columns; other numeric summary
+# values are kept in the JSON 'extra' column
+SUMMARY_COLUMNS = (
+    'peak_load', 'min_load', 'avg_load', 'total_energy_kwh', 'total_losses_kwh',
+    'min_voltage', 'max_voltage', 'bdwpt_energy_charged_kwh', 'bdwpt_energy_discharged_kwh',
+    'voltage_violations', 'reverse_flow_events', 'max_line_loading_pct', 'thermal_violations',
+    'grid_solves',
+)
+
+_SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS runs (
+    run_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    created_at TEXT NOT NULL,
+    run_type TEXT NOT NULL,
+    scenario TEXT NOT NULL,
+    base_name TEXT,
+    bdwpt_penetration REAL,
+    day_type TEXT,
+    kernel TEXT,
+    config_hash TEXT,
+    seed INTEGER,
+    runtime_s REAL,
+    timeseries_path TEXT,
+    {', '.join(f'{name} REAL' for name in SUMMARY_COLUMNS)},
+    extra TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_runs_scenario ON runs (base_name, bdwpt_penetration, day_type);
+CREATE INDEX IF NOT EXISTS idx_runs_penetration ON runs (bdwpt_penetration, day_type, min_voltage);
+CREATE INDEX IF NOT EXISTS idx_runs_config ON runs (config_hash);
+CREATE INDEX IF NOT EXISTS idx_runs_type ON runs (run_type);
+"""
+
+class RunCatalog:
+    """
+    Index of completed runs: scenario metadata, config hash, seed, runtime and
+    summary KPIs, with a pointer to the run's columnar timeseries. Queries run
+    against the index only; no timeseries is loaded.
+
+    Example:
+        catalog.query("bdwpt_penetration = ? AND day_type = ? AND min_voltage < ?",
+                      (40, 'weekday', 0.95))
+    """
+
+    def __init__(self, path):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.conn = sqlite3.connect(path)
+        self.conn.executescript(_SCHEMA)
+
+    def record(self, scenario, summary, run_type='single', config_hash=None, seed=None,
+               kernel=None, timeseries_path=None, extra=None):
+        """
+        Add one run.
+
+        Args:
+            scenario (dict): Scenario dict from ScenarioManager.
+            summary (dict): The run's summary from the simulation engine.
+            run_type (str): 'single', 'ensemble', 'sensitivity', ...
+            config_hash (str, optional): ``SimulationConfig.get_fingerprint()`` of the run.
+            seed (int, optional): Seed of the run, if it was seeded.
+            kernel (str, optional): Simulation kernel used.
+            timeseries_path (str, optional): Directory of the columnar timeseries.
+            extra (dict, optional): Further JSON-serializable metadata.
+
+        Returns:
+            int: The new run id.
+        """
+        extra = dict(extra or {})
+        extra.update({
+            key: value for key, value in summary.items()
+            if key not in SUMMARY_COLUMNS and key not in ('scenario', 'base_name', 'bdwpt_penetration', 'runtime_s')
+            and isinstance(value, (int, float, np.number))
+        })
+        row = {
+            'created_at': datetime.now().isoformat(timespec='seconds'),
+            'run_type': run_type,
+            'scenario': scenario['name'],
+            'base_name': scenario['base_name'],
+            'bdwpt_penetration': scenario['bdwpt_penetration'],
+            'day_type': scenario['day_type'],
+            'kernel': kernel,
+            'config_hash': config_hash,
+            'seed': None if seed is None else int(seed),
+            'runtime_s': summary.get('runtime_s'),
+            'timeseries_path': timeseries_path,
+            **{name: _to_sql(summary.get(name)) for name in SUMMARY_COLUMNS},
+            'extra': json.dumps({key: _to_sql(value) for key, value in extra.items()}, default=str),
+        }
+        with self.conn:
+            cursor = self.conn.execute(
+                f"INSERT INTO runs ({', '.join(row)}) VALUES ({', '.join('?' * len(row))})",
+                tuple(row.values()))
+        return cursor.lastrowid
+
+    def query(self, where=None, params=(), columns='*', order_by='run_id'):
+        """
+        Select runs from the index.
+
+        Args:
+            where (str, optional): SQL condition with ``?`` placeholders.
+            params (tuple): Values for the placeholders.
+            columns (str): Columns to return.
+            order_by (str): Sort order.
+
+        Returns:
+            pd.DataFrame: Matching rows.
+        """
+        sql = f"SELECT {columns} FROM runs"
+        if where:
+            sql += f" WHERE {where}"
+        sql += f" ORDER BY {order_by}"
+        return pd.read_sql_query(sql, self.conn, params=params)
+
+    def close(self):
+        self.conn.close()
+
+def _to_sql(value):
+    """Plain Python value for SQLite (numpy scalars and NaN included)."""
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, float) and np.isnan(value):
+        return None
+    return value
+
+def open_catalog(config):
+    """The configured run catalog, or None when cataloguing is disabled."""
+    if not config.catalog_params['enabled']:
+        return None
+    return RunCatalog(config.catalog_params['path'])
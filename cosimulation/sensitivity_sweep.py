@@ -0,0 +1,244 @@
+# cosimulation/sensitivity_sweep.py - Global sensitivity analysis over control and BDWPT parameters
+
+import os
+import copy
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+from scipy.stats import qmc
+
+from .results_analyzer import ResultsAnalyzer
+from .parallel_runner import ParallelScenarioRunner, run_scenario_worker
+from .run_catalog import open_catalog
+
+logger = logging.getLogger(__name__)
+
+# Parameter sections that do not affect traffic, so fleet and trips can be shared by all design points
+SWEEPABLE_SECTIONS = ('control_params', 'bdwpt_params')
+
+class SensitivitySweep:
+    """
+    Runs a design of experiments over ``control_params`` and ``bdwpt_params``
+    values and computes sensitivity indices for each KPI.
+
+    Methods:
+        'sobol': Saltelli design (N * (d + 2) points) built from two Sobol or
+            Latin-hypercube base samples; first-order (Saltelli 2010) and total
+            (Jansen) indices.
+        'morris': ``num_samples`` one-at-a-time trajectories on a
+            ``morris_levels`` grid; mean, mean absolute and standard deviation
+            of the elementary effects.
+
+    The fleet and trip tables are generated once and shared with every worker.
+    All design points use the same seed, so they also equip the same vehicles.
+    """
+
+    def __init__(self, config):
+        self.config = config
+        self.params = config.sensitivity_params
+        self.analyzer = ResultsAnalyzer(config)
+        self.parameters = list(self.params['parameters'])
+        for name in self.parameters:
+            section, _, key = name.partition('.')
+            if section not in SWEEPABLE_SECTIONS or key not in getattr(config, section):
+                raise ValueError(f"Cannot sweep '{name}'; expected one of {SWEEPABLE_SECTIONS} as 'section.key'")
+        bounds = np.array([self.params['parameters'][name] for name in self.parameters], dtype=float)
+        self.lower, self.upper = bounds[:, 0], bounds[:, 1]
+
+    def generate_design(self):
+        """
+        Design points in the unit hypercube.
+
+        Returns:
+            np.ndarray: (points, d) array, laid out as expected by ``compute_indices``.
+        """
+        d = len(self.parameters)
+        n = self.params['num_samples']
+        seed = self.params['seed']
+        if self.params['method'] == 'morris':
+            return self._morris_design(n, d, np.random.default_rng(seed))
+
+        if self.params['sampler'] == 'sobol':
+            base = qmc.Sobol(2 * d, scramble=True, seed=seed).random(n)
+        else:
+            base = qmc.LatinHypercube(2 * d, seed=seed).random(n)
+        a, b = base[:, :d], base[:, d:]
+        blocks = [a, b]
+        for i in range(d):
+            ab = a.copy()
+            ab[:, i] = b[:, i]
+            blocks.append(ab)
+        return np.vstack(blocks)
+
+    def _morris_design(self, trajectories, d, rng):
+        levels = self.params['morris_levels']
+        delta = levels / (2 * (levels - 1))
+        grid = np.arange(levels) / (levels - 1)
+        points = []
+        for _ in range(trajectories):
+            x = rng.choice(grid, size=d)
+            points.append(x.copy())
+            for i in rng.permutation(d):
+                x[i] += delta if x[i] + delta <= 1 + 1e-12 else -delta
+                points.append(x.copy())
+        return np.array(points)
+
+    def scale(self, unit_points):
+        """Map unit-hypercube points onto the parameter ranges."""
+        return self.lower + unit_points * (self.upper - self.lower)
+
+    def run(self, traffic_model):
+        """
+        Run every design point for each configured (base scenario, penetration)
+        and compute the sensitivity indices.
+
+        Args:
+            traffic_model (TrafficModel): Source of the shared fleet and trip tables.
+
+        Returns:
+            tuple: (design DataFrame with parameter values and KPIs, indices DataFrame).
+        """
+        from .scenarios import ScenarioManager
+        scenario_manager = ScenarioManager(self.config)
+        targets = [scenario_manager.get_scenario(base_name, penetration)
+                   for base_name, penetration in self.params['scenarios']]
+        baselines = {base_name: scenario_manager.get_scenario(base_name, 0)
+                     for base_name in {scenario['base_name'] for scenario in targets}}
+
+        unit_points = self.generate_design()
+        values = self.scale(unit_points)
+        logger.info(f"Sensitivity sweep: {len(values)} design points x {len(targets)} scenarios "
+                    f"({self.params['method']} method)")
+
+        runner = ParallelScenarioRunner(self.config)
+        shared = runner.publish_inputs(traffic_model, {scenario['day_type'] for scenario in targets})
+        handles = {key: frame.handle for key, frame in shared.items()}
+        seed = self.params['seed']
+        summaries = {}
+        config_hashes = {}
+        try:
+            context = multiprocessing.get_context('spawn')
+            num_tasks = len(values) * len(targets) + len(baselines)
+            with ProcessPoolExecutor(max_workers=runner.get_max_workers(num_tasks), mp_context=context) as executor:
+                # Baselines have no BDWPT agents, so they do not depend on the swept parameters
+                futures = {
+                    executor.submit(run_scenario_worker, self._task_config(None), scenario,
+                                    handles, seed, True): (None, scenario['name'])
+                    for scenario in baselines.values()
+                }
+                for point, row in enumerate(values):
+                    task_config = self._task_config(row)
+                    config_hashes[point] = task_config.get_fingerprint()
+                    for scenario in targets:
+                        future = executor.submit(run_scenario_worker, task_config, scenario, handles, seed, True)
+                        futures[future] = (point, scenario['name'])
+                for future in as_completed(futures):
+                    summaries[futures[future]] = future.result()['summary']
+        finally:
+            for frame in shared.values():
+                frame.close()
+
+        catalog = open_catalog(self.config)
+        if catalog is not None:
+            kernel = self.config.simulation_params['kernel']
+            for point, row in enumerate(values):
+                parameters = dict(zip(self.parameters, row.tolist()))
+                for scenario in targets:
+                    catalog.record(scenario, summaries[(point, scenario['name'])], run_type='sensitivity',
+                                   config_hash=config_hashes[point], seed=seed, kernel=kernel,
+                                   extra={'design_point': point, **parameters})
+
+        design = pd.DataFrame(values, columns=self.parameters)
+        kpi_rows = []
+        for point in range(len(values)):
+            results = {name: {'summary': summaries[(None, name)]} for name in
+                       (scenario['name'] for scenario in baselines.values())}
+            results.update({scenario['name']: {'summary': summaries[(point, scenario['name'])]}
+                            for scenario in targets})
+            kpis = self.analyzer.calculate_kpis(results)
+            row = {}
+            for scenario in targets:
+                for kpi, value in kpis[scenario['name']].items():
+                    if isinstance(value, (int, float, np.number)):
+                        row[f"{scenario['name']}:{kpi}"] = value
+            kpi_rows.append(row)
+        kpi_values = pd.DataFrame(kpi_rows)
+        design = pd.concat([design, kpi_values], axis=1)
+        indices = self.compute_indices(unit_points, kpi_values)
+        return design, indices
+
+    def _task_config(self, row):
+        """Copy of the config with one design point applied."""
+        config = copy.deepcopy(self.config)
+        # Design points of the same scenario run concurrently; keep them from sharing output directories
+        config.output_params['streaming'] = False
+        config.checkpoint_params['enabled'] = False
+        config.checkpoint_params['resume'] = False
+        config.instrumentation_params['enabled'] = False
+        if row is not None:
+            for name, value in zip(self.parameters, row):
+                section, _, key = name.partition('.')
+                getattr(config, section)[key] = float(value)
+        return config
+
+    def compute_indices(self, unit_points, kpi_values):
+        """
+        Sensitivity indices of each KPI column with respect to each parameter.
+
+        Args:
+            unit_points (np.ndarray): The design from ``generate_design``.
+            kpi_values (pd.DataFrame): One row per design point, one column per KPI.
+
+        Returns:
+            pd.DataFrame: One row per (kpi, parameter).
+        """
+        d = len(self.parameters)
+        rows = []
+        for kpi in kpi_values.columns:
+            y = kpi_values[kpi].to_numpy(dtype=float)
+            if self.params['method'] == 'morris':
+                effects = self._elementary_effects(unit_points, y, d)
+                for i, name in enumerate(self.parameters):
+                    rows.append({
+                        'kpi': kpi,
+                        'parameter': name,
+                        'mu': effects[i].mean(),
+                        'mu_star': np.abs(effects[i]).mean(),
+                        'sigma': effects[i].std(ddof=1) if len(effects[i]) > 1 else np.nan,
+                    })
+                continue
+
+            n = len(y) // (d + 2)
+            f_a, f_b = y[:n], y[n:2 * n]
+            variance = np.var(np.concatenate([f_a, f_b]))
+            for i, name in enumerate(self.parameters):
+                f_ab = y[(2 + i) * n:(3 + i) * n]
+                if variance > 0:
+                    first_order = np.mean(f_b * (f_ab - f_a)) / variance
+                    total = 0.5 * np.mean((f_a - f_ab) ** 2) / variance
+                else:
+                    first_order = total = np.nan
+                rows.append({'kpi': kpi, 'parameter': name, 'S1': first_order, 'ST': total})
+        return pd.DataFrame(rows)
+
+    def _elementary_effects(self, unit_points, y, d):
+        """Elementary effects per parameter from consecutive points of each trajectory."""
+        effects = [[] for _ in range(d)]
+        for start in range(0, len(y), d + 1):
+            for step in range(start, start + d):
+                change = unit_points[step + 1] - unit_points[step]
+                i = int(np.flatnonzero(change)[0])
+                effects[i].append((y[step + 1] - y[step]) / change[i])
+        return [np.array(values) for values in effects]
+
+    def save(self, design, indices, output_dir=None):
+        """Write the design (with KPIs) and the indices as CSV files."""
+        output_dir = output_dir or os.path.join(self.config.results_dir, 'sensitivity')
+        os.makedirs(output_dir, exist_ok=True)
+        design.to_csv(os.path.join(output_dir, 'design.csv'), index=False)
+        indices.to_csv(os.path.join(output_dir, f"{self.params['method']}_indices.csv"), index=False)
+        logger.info(f"Saved sensitivity results to {output_dir}")
+        return output_dir
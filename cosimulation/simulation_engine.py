@@ -1,5 +1,10 @@
 # cosimulation/simulation_engine.py - Main co-simulation engine
 
+import os
+import copy
+import time
+import random
+import hashlib
 import numpy as np
 import pandas as pd
 import logging
@@ -7,9 +12,20 @@ from datetime import datetime, timedelta
 from tqdm import tqdm
 
 from power_grid_model.bdwpt_agent import BDWPTAgent
+from power_grid_model.load_profiles import LoadProfileProvider
+from cosimulation.result_recorder import ResultRecorder, AGENT_MODES
+from cosimulation.result_writer import ChunkedResultWriter
+from cosimulation.trajectory_recorder import TrajectoryRecorder
+from cosimulation.checkpoint import CheckpointStore
+from cosimulation.baseline_store import BaselineStore
+from cosimulation.event_kernel import EventDrivenKernel
+from cosimulation.instrumentation import StageProfiler
 
 logger = logging.getLogger(__name__)
 
+# Vehicle fields the traffic model changes while a run progresses; agents keep their own SoC and mode
+MOVING_VEHICLE_FIELDS = ('status', 'location')
+
 class CoSimulationEngine:
     """Co-simulation engine coordinating traffic and power grid models"""
     
@@ -18,53 +34,246 @@ class CoSimulationEngine:
         self.traffic_model = traffic_model
         self.power_grid = power_grid
         self.bdwpt_agents = {}
+        self.load_profiles = None
+        self.recorder = None
+        self.trajectories = None
+        self._bdwpt_node_set = set(config.grid_params['bdwpt_nodes'])
+        self.mode_counts = {}
         self.results = None
+        self.checkpoints = None
+        self._last_grid_inputs = None
+        self._last_pf_results = None
+        self.grid_solves = 0
+        self._last_checkpoint_step = -1
+        self._history_cursors = {}
+        self._static_day_types = None
+        self._run_started = None
+        self.run_key = None
+        self.profiler = StageProfiler(config.instrumentation_params['enabled'])
+        # Constraints ('voltage_low', 'voltage_high', 'thermal') that end a run at their first violation
+        self.stop_on_violation = ()
+        self.violation = None
+        
+    def run_simulation(self, scenario, resume=False):
+        """
+        Run complete co-simulation for a scenario
         
-    def run_simulation(self, scenario):
-        """Run complete co-simulation for a scenario"""
+        Args:
+            scenario (dict): Scenario definition from ScenarioManager.
+            resume (bool): Continue from the latest checkpoint of this scenario, if any.
+        """
         logger.info(f"Starting co-simulation for scenario: {scenario['name']}")
-          # Initialize simulation
-        self._initialize_simulation(scenario)
+        self.profiler.reset()
+        self.violation = None
+        self._run_started = time.perf_counter()
+        if scenario['bdwpt_penetration'] == 0 and self.config.baseline_params['fast_path']:
+            return self._run_baseline(scenario)
+        if self.config.simulation_params['kernel'] == 'event':
+            if self.config.trace_params['enabled']:
+                raise ValueError("Trace-driven traffic is streamed step by step; use the 'time_step' kernel")
+            return self._run_event_driven(scenario)
+        
+        checkpoint_params = self.config.checkpoint_params
+        self.checkpoints = None
+        if checkpoint_params['enabled'] or resume:
+            self.checkpoints = CheckpointStore(self._get_checkpoint_dir(scenario))
         
-        # Prepare results storage
-        results_data = []
+        # Initialize simulation, or restore it from the latest checkpoint
+        start_step = 0
+        if resume and self.checkpoints.exists():
+            start_step = self._restore_checkpoint(scenario)
+        else:
+            if self.checkpoints is not None:
+                self.checkpoints.clear()
+            self._initialize_simulation(scenario)
         
         # Get time series
         time_series = self.config.get_time_series()
         time_steps = time_series['time_steps']
+        interval = checkpoint_params['interval_steps']
         
         # Main simulation loop
-        for t, timestamp in enumerate(tqdm(time_steps, desc="Simulation Progress")):
+        profiler = self.profiler
+        progress = tqdm(time_steps[start_step:], desc="Simulation Progress", initial=start_step, total=len(time_steps))
+        for t, timestamp in enumerate(progress, start=start_step):
             # Get hour of day for tariff and load profile
             hour = timestamp.hour
             minute_of_day = timestamp.hour * 60 + timestamp.minute
             
             # Step 1: Update traffic model
-            self._update_traffic(timestamp, scenario['day_type'])
+            with profiler.stage('traffic_update'):
+                self._update_traffic(timestamp, scenario['day_type'])
             
             # Step 2: Calculate BDWPT power at each node
-            bdwpt_powers = self._calculate_bdwpt_powers(hour)
+            with profiler.stage('bdwpt_power'):
+                bdwpt_powers = self._calculate_bdwpt_powers(hour)
             
-            # Step 3: Update power grid loads
-            self._update_grid_loads(hour, scenario['load_profile'], bdwpt_powers)
-            
-            # Step 4: Solve power flow
-            pf_results = self.power_grid.solve_power_flow()
+            if self._grid_solve_due(t, bdwpt_powers):
+                # Step 3: Update power grid loads
+                with profiler.stage('grid_load_update'):
+                    self._update_grid_loads(t, scenario['day_type'], bdwpt_powers)
+                
+                # Step 4: Solve power flow
+                with profiler.stage('power_flow'):
+                    pf_results = self.power_grid.solve_power_flow()
+                self._count_solve(pf_results)
+                self._last_pf_results = pf_results
+                self.grid_solves += 1
+            else:
+                # Between grid solves the latest solution (and its voltages) stays in effect
+                pf_results = self._last_pf_results
             
             # Step 5: Store results
-            step_results = self._collect_step_results(
-                timestamp, pf_results, bdwpt_powers
-            )
-            results_data.append(step_results)
+            with profiler.stage('result_collection'):
+                self._collect_step_results(t, timestamp, pf_results, bdwpt_powers)
+            
+            if self.stop_on_violation and self._detect_violation(t, pf_results):
+                break
+            
+            if checkpoint_params['enabled'] and (t + 1) % interval == 0 and t + 1 < len(time_steps):
+                with profiler.stage('checkpoint'):
+                    self._save_checkpoint(t, scenario)
             
         # Compile final results
-        self.results = self._compile_results(results_data, scenario)
+        with self.profiler.stage('compile_results'):
+            self.results = self._compile_results(scenario)
+        if self.checkpoints is not None:
+            # A completed run has nothing left to resume
+            self.checkpoints.clear()
+        self._write_performance_report(scenario)
+        
+        logger.info("Co-simulation completed successfully")
+        return self.results
+        
+    def _run_event_driven(self, scenario):
+        """Run a scenario with the discrete-event kernel instead of the time-step loop"""
+        if self.config.checkpoint_params['enabled']:
+            logger.warning("Checkpoints are only written by the time-step loop; the event kernel runs without them")
+        self.checkpoints = None
+        self._initialize_simulation(scenario)
+        EventDrivenKernel(self).run(scenario)
+        with self.profiler.stage('compile_results'):
+            self.results = self._compile_results(scenario)
+        self._write_performance_report(scenario)
         
         logger.info("Co-simulation completed successfully")
         return self.results
         
+    def _run_baseline(self, scenario):
+        """
+        Run a 0% penetration scenario on the fast path. Without BDWPT agents the
+        traffic and agent stages cannot affect the grid, so they are skipped
+        and the grid is only re-solved when the base load changes. Results are
+        reused from the baseline store when an identical baseline was run before.
+        """
+        self.checkpoints = None
+        store = None
+        # Stopped runs are partial and streamed results live outside the store, so neither is stored
+        if (self.config.baseline_params['reuse'] and not self.stop_on_violation
+                and not self.config.output_params['streaming']):
+            store = BaselineStore(os.path.join(self.config.cache_dir, 'baselines'))
+            key = self._get_baseline_key(scenario)
+            cached = store.load(key)
+            if cached is not None:
+                logger.info(f"Reusing stored baseline for {scenario['name']}")
+                # The stored runtime is the original run's; report this call's, flagged as a reuse
+                cached['summary'] = dict(cached['summary'], reused_baseline=True,
+                                         runtime_s=time.perf_counter() - self._run_started)
+                self.results = cached
+                return self.results
+        
+        self._initialize_simulation(scenario)
+        day_type = scenario['day_type']
+        loads = self._get_load_profiles().get_matrix(day_type)
+        no_bdwpt = {node: 0 for node in self.config.grid_params['bdwpt_nodes']}
+        profiler = self.profiler
+        pf_results = None
+        for t, timestamp in enumerate(tqdm(self.config.get_time_series()['time_steps'], desc="Baseline Progress")):
+            if pf_results is None or np.any(loads[t] != loads[t - 1]):
+                with profiler.stage('grid_load_update'):
+                    self._update_grid_loads(t, day_type, no_bdwpt)
+                with profiler.stage('power_flow'):
+                    pf_results = self.power_grid.solve_power_flow()
+                self._count_solve(pf_results)
+                self._last_pf_results = pf_results
+                self.grid_solves += 1
+            with profiler.stage('result_collection'):
+                self._collect_step_results(t, timestamp, pf_results, no_bdwpt)
+            if self.stop_on_violation and self._detect_violation(t, pf_results):
+                break
+        
+        with profiler.stage('compile_results'):
+            self.results = self._compile_results(scenario)
+        if store is not None:
+            store.save(key, self.results)
+        self._write_performance_report(scenario)
+        
+        logger.info("Baseline simulation completed successfully")
+        return self.results
+        
+    def _get_baseline_key(self, scenario):
+        """
+        Key of a baseline result. The fast path draws no random numbers, so the
+        key has no seed and every seed or replica shares one baseline.
+        """
+        loads = np.ascontiguousarray(self._get_load_profiles().get_matrix(scenario['day_type']))
+        simulation = self.config.simulation_params
+        return BaselineStore.make_key(
+            scenario=scenario,
+            base_scenario=self.config.scenarios[scenario['base_name']],
+            grid=self.power_grid.get_network_fingerprint(),
+            grid_params=self.config.grid_params,
+            load_profile=hashlib.sha256(loads.tobytes()).hexdigest(),
+            horizon=[simulation['start_time'], simulation['end_time'], simulation['time_step_minutes']],
+        )
+        
+    def _detect_violation(self, step_index, pf_results):
+        """
+        Check the monitored constraints after a step. On the first violation,
+        record it in ``self.violation`` and return True so the run stops.
+        """
+        limits = self.recorder.summary
+        voltages = pf_results['voltages']
+        voltages = np.array([voltages[bus] for bus in self.recorder.bus_ids if bus in voltages])
+        checks = {
+            'voltage_low': lambda: (voltages < limits.v_min_limit).any(),
+            'voltage_high': lambda: (voltages > limits.v_max_limit).any(),
+            'thermal': lambda: pf_results.get('lines') is not None and
+                               (np.asarray(pf_results['lines']['loading_pct']) > limits.max_loading_percent).any(),
+        }
+        for constraint in self.stop_on_violation:
+            if checks[constraint]():
+                self.violation = {'constraint': constraint, 'step': step_index}
+                logger.info(f"Stopping at step {step_index}: {constraint} limit violated")
+                return True
+        return False
+        
+    def _count_solve(self, pf_results):
+        """Update solver counters after a power flow"""
+        self.profiler.count('grid_solves')
+        self.profiler.count('solver_iterations', pf_results.get('iterations', 0))
+        if not pf_results['converged']:
+            self.profiler.count('non_converged_steps')
+            
+    def _write_performance_report(self, scenario):
+        """Write the per-stage timing report of the finished run, if instrumentation is enabled"""
+        if not self.profiler.enabled:
+            return
+        path = os.path.join(self.config.get_scenario_results_dir(scenario['name']), 'performance_report.json')
+        self.profiler.write_report(
+            path,
+            scenario=scenario['name'],
+            kernel=self.config.simulation_params['kernel'],
+            total_steps=self.config.get_time_series()['total_steps']
+        )
+        
     def _initialize_simulation(self, scenario):
         """Initialize simulation components"""
+        # With common random numbers every scenario starts from the same fleet state
+        if self.config.crn_params['enabled']:
+            self.traffic_model.reset_vehicles()
+        self.traffic_model.restart_trips()
+        
         # Set BDWPT penetration
         self.traffic_model.set_bdwpt_penetration(scenario['bdwpt_penetration'])
           # Create BDWPT agents for equipped vehicles
@@ -82,6 +291,173 @@ class CoSimulationEngine:
                 
         logger.info(f"Initialized {len(self.bdwpt_agents)} BDWPT agents")
         
+        # Agents are counted by mode once they have acted; counts are kept incrementally
+        self.mode_counts = {mode: 0 for mode in AGENT_MODES}
+        
+        self._last_grid_inputs = None
+        self._last_pf_results = None
+        self.grid_solves = 0
+        self._last_checkpoint_step = -1
+        self._history_cursors = {vehicle_id: 0 for vehicle_id in self.bdwpt_agents}
+        self._static_day_types = None
+        
+        # Prepare results storage: the whole horizon in memory, or one chunk at a time when streaming
+        self.run_key = self.config.new_run_key()
+        self._create_recorder(scenario)
+        self._create_trajectory_recorder()
+        
+    def _create_recorder(self, scenario, writer_parts=None):
+        """Create the result recorder (and chunk writer when streaming)"""
+        output_params = self.config.output_params
+        writer = None
+        if output_params['streaming']:
+            writer = ChunkedResultWriter(
+                self._get_timeseries_dir(scenario),
+                output_params['format'],
+                output_params['compression'],
+                resume_parts=writer_parts
+            )
+        tolerance = self.config.grid_params['voltage_tolerance']
+        self.recorder = ResultRecorder(
+            self.config.get_time_series()['total_steps'],
+            list(self.power_grid.buses),
+            self.config.grid_params['bdwpt_nodes'],
+            writer=writer,
+            chunk_size=output_params['chunk_size_steps'],
+            voltage_limits=(1 - tolerance, 1 + tolerance),
+            max_loading_percent=self.config.grid_params['max_loading_percent']
+        )
+        
+    def _create_trajectory_recorder(self):
+        """Create the sampled agent trajectory recorder (none when disabled or without agents)"""
+        params = self.config.trajectory_params
+        self.trajectories = None
+        if params['enabled'] and self.bdwpt_agents:
+            self.trajectories = TrajectoryRecorder(
+                self.config.get_time_series()['total_steps'],
+                list(self.bdwpt_agents),
+                sample_size=params['sample_size'],
+                seed=params['seed'],
+                percentiles=params['percentiles'],
+                soc_bins=params['soc_bins']
+            )
+        
+    def _get_timeseries_dir(self, scenario):
+        """Directory that streamed timeseries chunks of the current run are written to"""
+        return self.config.get_run_timeseries_dir(scenario['name'], self.run_key)
+        
+    def _get_checkpoint_dir(self, scenario):
+        """Directory holding the checkpoints of a scenario run"""
+        return os.path.join(self.config.get_scenario_results_dir(scenario['name']), 'checkpoints')
+        
+    def _save_checkpoint(self, step_index, scenario):
+        """Checkpoint the engine after ``step_index``, storing only what changed since the last one"""
+        # The fleet and the trip tables (generated once per day type) never change afterwards
+        day_types = set(self.traffic_model.daily_trips)
+        if day_types != self._static_day_types:
+            self.checkpoints.save_static({
+                'scenario': scenario,
+                'vehicles': self.traffic_model.vehicles,
+                'daily_trips': self.traffic_model.daily_trips,
+            })
+            self._static_day_types = day_types
+        
+        agents = {}
+        for vehicle_id, agent in self.bdwpt_agents.items():
+            cursor = self._history_cursors[vehicle_id]
+            agents[vehicle_id] = {
+                'soc': agent.soc,
+                'mode': agent.mode,
+                'power_setpoint': agent.power_setpoint,
+                'energy_exchanged': agent.energy_exchanged,
+                'new_history': agent.operation_history[cursor:],
+            }
+            self._history_cursors[vehicle_id] = len(agent.operation_history)
+        
+        self.checkpoints.save(step_index, {
+            'step_index': step_index,
+            'run_key': self.run_key,
+            'vehicles': {field: [vehicle[field] for vehicle in self.traffic_model.vehicles]
+                         for field in MOVING_VEHICLE_FIELDS},
+            'agents': agents,
+            'mode_counts': dict(self.mode_counts),
+            'grid_inputs': self._last_grid_inputs,
+            'grid_solves': self.grid_solves,
+            'numpy_rng': np.random.get_state(),
+            'python_rng': random.getstate(),
+            'recorder': self.recorder.get_checkpoint_state(self._last_checkpoint_step + 1),
+            'trajectories': (self.trajectories.get_checkpoint_state(self._last_checkpoint_step + 1)
+                             if self.trajectories is not None else None),
+        })
+        self._last_checkpoint_step = step_index
+        
+    def _resync_grid(self, day_type):
+        """
+        Recompile the circuit and re-solve the last applied step on resume.
+        
+        OpenDSS starts each solve from the previous solution, which cannot be
+        saved, so a resumed run matches an uninterrupted one to the solver tolerance.
+        """
+        self.power_grid.build_network()
+        if self._last_grid_inputs is not None:
+            step_index, bdwpt_powers = self._last_grid_inputs
+            self._update_grid_loads(step_index, day_type, bdwpt_powers)
+            self._last_pf_results = self.power_grid.solve_power_flow()
+        
+    def _restore_checkpoint(self, scenario):
+        """
+        Restore the engine from the latest checkpoint of ``scenario``.
+        
+        Returns:
+            int: The first step that still has to be simulated.
+        """
+        static, states = self.checkpoints.load()
+        latest = states[-1]
+        logger.info(f"Resuming {scenario['name']} from checkpoint after step {latest['step_index']}")
+        
+        self.traffic_model.daily_trips = static['daily_trips']
+        self._static_day_types = set(static['daily_trips'])
+        self.traffic_model.vehicles = copy.deepcopy(static['vehicles'])
+        for field, values in latest['vehicles'].items():
+            for vehicle, value in zip(self.traffic_model.vehicles, values):
+                vehicle[field] = value
+        # The trace is not checkpointed; it is re-read up to the resumed step, keeping trips still in progress
+        self.traffic_model.restart_trips()
+        
+        # Agents: current state from the latest checkpoint, history replayed from all of them
+        self.bdwpt_agents = {}
+        for vehicle in self.traffic_model.vehicles:
+            if vehicle['id'] not in latest['agents']:
+                continue
+            agent = BDWPTAgent(vehicle['id'], vehicle['battery_capacity_kwh'], self.config)
+            state = latest['agents'][vehicle['id']]
+            agent.soc = state['soc']
+            agent.mode = state['mode']
+            agent.power_setpoint = state['power_setpoint']
+            agent.energy_exchanged = state['energy_exchanged']
+            for checkpoint in states:
+                agent.operation_history.extend(checkpoint['agents'][vehicle['id']]['new_history'])
+            self.bdwpt_agents[vehicle['id']] = agent
+        self._history_cursors = {vehicle_id: len(agent.operation_history)
+                                 for vehicle_id, agent in self.bdwpt_agents.items()}
+        self.mode_counts = dict(latest['mode_counts'])
+        self.grid_solves = latest['grid_solves']
+        
+        self.run_key = latest['run_key']  # Keep streaming into the interrupted run's directory
+        self._create_recorder(scenario, writer_parts=latest['recorder']['writer_parts'])
+        self.recorder.restore_checkpoint_states([checkpoint['recorder'] for checkpoint in states])
+        self._create_trajectory_recorder()
+        if self.trajectories is not None and latest.get('trajectories') is not None:
+            self.trajectories.restore_checkpoint_states([checkpoint['trajectories'] for checkpoint in states])
+        
+        self._last_grid_inputs = latest['grid_inputs']
+        self._resync_grid(scenario['day_type'])
+        
+        np.random.set_state(latest['numpy_rng'])
+        random.setstate(latest['python_rng'])
+        self._last_checkpoint_step = latest['step_index']
+        return latest['step_index'] + 1
+        
     def _update_traffic(self, timestamp, day_type):
         """Update traffic model for current time step"""
         hour = timestamp.hour
@@ -90,14 +466,19 @@ class CoSimulationEngine:
         trips = self.traffic_model.generate_trip_patterns(hour, day_type)
           # Update vehicle positions
         minute_of_day = hour * 60 + timestamp.minute
-        vehicles_on_roads = self.traffic_model.update_vehicle_positions(minute_of_day, day_type)
+        vehicles_on_roads = self.traffic_model.update_vehicle_positions(minute_of_day, day_type, timestamp)
         
         # Update SoC for driving vehicles
+        moved = 0
         for vehicle in self.traffic_model.vehicles:
-            if vehicle['status'] == 'driving' and vehicle['id'] in self.bdwpt_agents:
+            if vehicle['status'] != 'driving':
+                continue
+            moved += 1
+            if vehicle['id'] in self.bdwpt_agents:
                 # Simple energy consumption based on time step
                 distance = self.config.traffic_params['average_trip_distance_km'] / 30  # km per minute
                 self.bdwpt_agents[vehicle['id']].update_soc_from_driving(distance)
+        self.profiler.count('vehicles_moved', moved)
                 
     def _calculate_bdwpt_powers(self, hour):
         """Calculate BDWPT power exchange at each node"""
@@ -113,7 +494,8 @@ class CoSimulationEngine:
             vehicles = self.traffic_model.get_bdwpt_vehicles_by_node(node)
             
             if vehicles:
-                logger.info(f"Found {len(vehicles)} BDWPT-equipped vehicles at node {node}")
+                logger.debug(f"Found {len(vehicles)} BDWPT-equipped vehicles at node {node}")
+                self.profiler.count('agents_evaluated', len(vehicles))
 
             for vehicle in vehicles:
                 if vehicle['id'] in self.bdwpt_agents:
@@ -128,12 +510,16 @@ class CoSimulationEngine:
                         voltage = 1.0  # Default voltage
                     
                     # Agent decides action
+                    previous_mode = agent.mode if agent.operation_history else None
                     try:
                         action = agent.decide_action(voltage, tariff, self.config.time_step_minutes)
                         logger.debug(f"Agent {agent.vehicle_id} action: {action}")
                     except Exception as e:
                         logger.error(f"Error in agent decision for vehicle {vehicle['id']}: {e}")
-                        action = {'power_kw': 0}                    # Accumulate power
+                        action = {'power_kw': 0}
+                    self._update_mode_counts(agent, previous_mode)
+                    
+                    # Accumulate power
                     total_power += action['power_kw']
                     
             bdwpt_powers[node] = total_power
@@ -141,101 +527,114 @@ class CoSimulationEngine:
         logger.debug(f"Calculated BDWPT powers at hour {hour}: {bdwpt_powers}")
         return bdwpt_powers
         
-    def _update_grid_loads(self, hour, load_profile_type, bdwpt_powers):
+    def _update_grid_loads(self, step_index, day_type, bdwpt_powers):
         """Update power grid loads including BDWPT"""
-        # Get base load multiplier from profile
-        time_minutes = hour * 60
-        day_type = 'weekday' if 'Weekday' in load_profile_type else 'weekend'
-          # Update base loads
-        for bus, load in self.power_grid.loads.items():
-            try:
-                # Get node-specific load profile
-                load_kw = self.config.get_load_profile(bus, time_minutes, day_type)
-                logger.debug(f"Load for bus {bus}: {load_kw} kW")
-            except Exception as e:
-                logger.error(f"Error getting load profile for bus {bus}: {e}")
-                logger.error(f"bus type: {type(bus)}, time_minutes type: {type(time_minutes)}, day_type: {day_type}")
-                raise e
+        # Apply this step's row of the precomputed base-load matrix in one bulk update
+        self.power_grid.set_base_loads(self._get_load_profiles().get_step_loads(day_type, step_index))
             
         # FIX: Use the new update_bdwpt_load method
         if any(p != 0 for p in bdwpt_powers.values()):
-            logger.info(f"Updating grid with non-zero BDWPT powers: {bdwpt_powers}")
+            logger.debug(f"Updating grid with non-zero BDWPT powers: {bdwpt_powers}")
         for node, power in bdwpt_powers.items():
             self.power_grid.update_bdwpt_load(node, power)
+        self._last_grid_inputs = (step_index, dict(bdwpt_powers))
             
-    def _collect_step_results(self, timestamp, pf_results, bdwpt_powers):
-        """Collect results for current time step"""
-        results = {
-            'timestamp': timestamp,
-            'converged': pf_results['converged'],
-            'total_load_kw': pf_results['powers']['total_load'],
-            'total_losses_kw': pf_results['powers']['total_losses'],
-            'total_bdwpt_kw': sum(bdwpt_powers.values()),
-            'bdwpt_charging_kw': sum(p for p in bdwpt_powers.values() if p > 0),
-            'bdwpt_discharging_kw': abs(sum(p for p in bdwpt_powers.values() if p < 0)),
-        }
+    def _get_load_profiles(self):
+        """Base-load matrices are built once per day type and shared across scenarios"""
+        if self.load_profiles is None:
+            self.load_profiles = LoadProfileProvider(self.config, self.power_grid.load_buses)
+        return self.load_profiles
         
-        # Add voltage data
-        for bus, voltage in pf_results['voltages'].items():
-            results[f'voltage_bus_{bus}'] = voltage
-            
-        # Add BDWPT power by node
-        for node, power in bdwpt_powers.items():
-            results[f'bdwpt_node_{node}_kw'] = power
-              # Count vehicles in different modes
-        mode_counts = {'G2V': 0, 'V2G': 0, 'idle': 0}
-        for agent in self.bdwpt_agents.values():
-            if agent.operation_history:
-                mode_counts[agent.mode] += 1
-        results.update({f'vehicles_{mode}': count for mode, count in mode_counts.items()})
-        
-        return results
-    
-    def _compile_results(self, results_data, scenario):
-        """Compile simulation results into final format"""
-        logger.info(f"Compiling results for {len(results_data)} time steps")
+    def _grid_solve_due(self, step_index, bdwpt_powers):
+        """Whether the grid is solved at this step under the multi-rate schedule"""
+        if self._last_grid_inputs is None or self._last_pf_results is None:
+            return True
+        params = self.config.multirate_params
+        last_solve_step, solved_powers = self._last_grid_inputs
+        if step_index - last_solve_step >= params['grid_solve_interval_steps']:
+            return True
+        threshold = params['injection_threshold_kw']
+        if threshold is None:
+            return False
+        moved = sum(abs(power - solved_powers.get(node, 0)) for node, power in bdwpt_powers.items())
+        return moved > threshold
         
-        # Debug: Check results_data structure
-        if results_data:
-            sample_keys = list(results_data[0].keys()) if results_data[0] else []
-            logger.info(f"Sample step result keys: {sample_keys}")
+    def _update_mode_counts(self, agent, previous_mode):
+        """Move an agent between mode counters after it has acted"""
+        if not agent.operation_history:
+            return
+        if previous_mode is not None:
+            self.mode_counts[previous_mode] -= 1
+        self.mode_counts[agent.mode] += 1
         
-        # Create DataFrame from results
-        df = pd.DataFrame(results_data)
-        logger.info(f"Created DataFrame with shape: {df.shape}, columns: {list(df.columns)}")
+    def _collect_step_results(self, step_index, timestamp, pf_results, bdwpt_powers, socs=None):
+        """
+        Collect results for current time step
+        
+        Args:
+            socs (np.ndarray, optional): Agent SoCs at this step, when the agents'
+                own values are not current (event kernel).
+        """
+        if self.recorder.line_names is None:
+            self.recorder.line_names = list(self.power_grid.line_names)
+        self.recorder.record(step_index, timestamp, pf_results, bdwpt_powers, self.mode_counts)
+        if self.trajectories is not None:
+            self._record_trajectories(step_index, timestamp, socs)
+            
+    def _record_trajectories(self, step_index, timestamp, socs=None):
+        """Pass every agent's SoC and exchanged power to the trajectory recorder"""
+        agents = self.bdwpt_agents
+        vehicles = self.traffic_model.vehicles
+        if socs is None:
+            socs = np.fromiter((agent.soc for agent in agents.values()), dtype=np.float64, count=len(agents))
+        # Agents only exchange power while at a BDWPT node
+        powers = np.fromiter(
+            (agent.power_setpoint if vehicles[vehicle_id]['location'] in self._bdwpt_node_set else 0.0
+             for vehicle_id, agent in agents.items()),
+            dtype=np.float64, count=len(agents))
+        self.trajectories.record(step_index, timestamp, socs, powers)
+            
+    def _compile_results(self, scenario):
+        """Compile simulation results into final format"""
+        recorder = self.recorder
+        logger.info(f"Compiling results for {recorder.num_steps} time steps")
+        recorder.finish()
         
         # Get time step minutes with fallback
         time_step_minutes = getattr(self.config, 'time_step_minutes', 
                                    self.config.simulation_params.get('time_step_minutes', 15))
-        logger.info(f"Using time_step_minutes: {time_step_minutes}")
+        hours_per_step = time_step_minutes / 60
         
-        # Calculate summary statistics
+        # Summary statistics come from running accumulators, so they do not need the full timeseries
         summary = {
             'scenario': scenario['name'],
-            'base_name': scenario['name'],  # Add base name for KPI calculation
+            'base_name': scenario['base_name'],  # Base scenario, used to match baselines for KPIs
             'bdwpt_penetration': scenario['bdwpt_penetration'],
-            'peak_load': df['total_load_kw'].max(),
-            'min_load': df['total_load_kw'].min(),
-            'avg_load': df['total_load_kw'].mean(),
-            'total_energy_kwh': df['total_load_kw'].sum() * time_step_minutes / 60,
-            'total_losses_kwh': df['total_losses_kw'].sum() * time_step_minutes / 60,
-            'min_voltage': df[[col for col in df.columns if 'voltage_bus' in col]].min().min(),
-            'max_voltage': df[[col for col in df.columns if 'voltage_bus' in col]].max().max(),
-            'bdwpt_energy_charged_kwh': df['bdwpt_charging_kw'].sum() * time_step_minutes / 60,
-            'bdwpt_energy_discharged_kwh': df['bdwpt_discharging_kw'].sum() * time_step_minutes / 60,
         }
+        summary.update(recorder.summary.result(hours_per_step))
+        summary['grid_solves'] = self.grid_solves
+        summary['runtime_s'] = time.perf_counter() - self._run_started
+        summary['reused_baseline'] = False
         
-        # Count voltage violations
-        voltage_cols = [col for col in df.columns if 'voltage_bus' in col]
-        voltage_violations = 0
-        for col in voltage_cols:
-            violations = ((df[col] < 0.95) | (df[col] > 1.05)).sum()
-            voltage_violations += violations
-        summary['voltage_violations'] = voltage_violations
-        
-        # Count reverse power flow events (when BDWPT discharge > local load)
-        df['net_load'] = df['total_load_kw'] - df['total_bdwpt_kw']
-        summary['reverse_flow_events'] = (df['net_load'] < 0).sum()
+        line_names = self.power_grid.line_names
+        if recorder.streaming:
+            # Timeseries and line flows are already on disk; keep only their location
+            df = None
+            line_flows = None
+            timeseries_path = recorder.writer.output_dir
+        else:
+            # Build the DataFrame once from the recorded arrays
+            # A run stopped at a violation only has its first rows filled
+            rows = recorder.rows_filled
+            df = recorder.to_dataframe(line_names, rows)
+            logger.info(f"Created DataFrame with shape: {df.shape}")
+            flows = recorder.line_flows or {'loading_pct': np.zeros((recorder.num_steps, 0))}
+            line_flows = {
+                'line_names': list(line_names),
+                'rating_amps': self.power_grid.line_ratings_amps,
+                **{key: values[:rows] for key, values in flows.items()}
+            }
+            timeseries_path = None
         
         # Agent statistics
         agent_stats = []
@@ -246,6 +645,9 @@ class CoSimulationEngine:
         
         return {
             'timeseries': df,
+            'timeseries_path': timeseries_path,
             'summary': summary,
-            'agent_stats': pd.DataFrame(agent_stats) if agent_stats else None
+            'line_flows': line_flows,
+            'agent_stats': pd.DataFrame(agent_stats) if agent_stats else None,
+            'agent_trajectories': self.trajectories.result() if self.trajectories is not None else None
         }
\ No newline at end of file
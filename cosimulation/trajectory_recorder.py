@@ -0,0 +1,133 @@
+# cosimulation/trajectory_recorder.py - Sampled per-agent SoC and power trajectories
+
+import numpy as np
+import logging
+
+logger = logging.getLogger(__name__)
+
+class TrajectoryRecorder:
+    """
+    Keeps full-resolution SoC and power traces for a reservoir sample of the
+    BDWPT agents, plus fleet-wide percentile bands of both per step and a
+    (steps x soc_bins) histogram of the fleet's SoC. Stored memory is
+    (steps x (sample_size + 2 * len(percentiles) + soc_bins)) whatever the
+    fleet size; each step only holds the fleet's current values transiently.
+    """
+
+    def __init__(self, num_steps, vehicle_ids, sample_size=20, seed=None, percentiles=(5, 25, 50, 75, 95),
+                 soc_bins=50):
+        """
+        Args:
+            num_steps (int): Number of simulation time steps.
+            vehicle_ids (iterable): Agent ids, in the order their values are passed to ``record``.
+            sample_size (int): Agents whose full traces are kept.
+            seed (int, optional): Seed of the reservoir sample.
+            percentiles (tuple): Fleet percentiles kept per step.
+            soc_bins (int): Equal-width SoC bins over [0, 1] of the fleet SoC histogram.
+        """
+        self.percentiles = tuple(percentiles)
+        vehicle_ids = list(vehicle_ids)
+        self.fleet_size, self.sample_index = _reservoir_sample(vehicle_ids, sample_size, np.random.default_rng(seed))
+        self.vehicle_ids = [vehicle_ids[i] for i in self.sample_index]
+        self.rows_filled = 0
+
+        samples = len(self.sample_index)
+        self.timestamps = np.full(num_steps, np.datetime64('NaT'), dtype='datetime64[ns]')
+        self.soc = np.full((num_steps, samples), np.nan, dtype=np.float32)
+        self.power_kw = np.zeros((num_steps, samples), dtype=np.float32)
+        self.soc_bands = np.full((num_steps, len(self.percentiles)), np.nan, dtype=np.float32)
+        self.power_bands = np.full((num_steps, len(self.percentiles)), np.nan, dtype=np.float32)
+        self.soc_bins = soc_bins
+        self.soc_histogram = np.zeros((num_steps, soc_bins), dtype=np.int32)
+
+    def record(self, step_index, timestamp, soc, power_kw):
+        """
+        Record one step.
+
+        Args:
+            step_index (int): Simulation step.
+            timestamp (datetime): Time of the step.
+            soc (np.ndarray): SoC of every agent, in ``vehicle_ids`` order.
+            power_kw (np.ndarray): Power exchanged by every agent (positive = G2V).
+        """
+        self.timestamps[step_index] = np.datetime64(timestamp, 'ns')
+        self.soc[step_index] = soc[self.sample_index]
+        self.power_kw[step_index] = power_kw[self.sample_index]
+        self.soc_bands[step_index] = np.percentile(soc, self.percentiles)
+        self.power_bands[step_index] = np.percentile(power_kw, self.percentiles)
+        bins = np.minimum((np.clip(soc, 0.0, 1.0) * self.soc_bins).astype(np.int64), self.soc_bins - 1)
+        self.soc_histogram[step_index] = np.bincount(bins, minlength=self.soc_bins)
+        self.rows_filled = max(self.rows_filled, step_index + 1)
+
+    def result(self):
+        """The recorded trajectories, trimmed to the steps that ran."""
+        rows = self.rows_filled
+        return {
+            'vehicle_ids': list(self.vehicle_ids),
+            'fleet_size': self.fleet_size,
+            'timestamps': self.timestamps[:rows],
+            'soc': self.soc[:rows],
+            'power_kw': self.power_kw[:rows],
+            'percentiles': self.percentiles,
+            'soc_bands': self.soc_bands[:rows],
+            'power_bands': self.power_bands[:rows],
+            'soc_bin_edges': np.linspace(0.0, 1.0, self.soc_bins + 1),
+            'soc_histogram': self.soc_histogram[:rows],
+        }
+
+    def get_checkpoint_state(self, since_step):
+        """
+        The reservoir sample and fill level needed to resume, plus the rows for
+        steps >= ``since_step`` (earlier rows are in previous checkpoints).
+        """
+        return {
+            'fleet_size': self.fleet_size,
+            'sample_index': self.sample_index.copy(),
+            'vehicle_ids': list(self.vehicle_ids),
+            'rows_filled': self.rows_filled,
+            'first_step': since_step,
+            'rows': {name: values[since_step:self.rows_filled].copy() for name, values in self._buffers().items()},
+        }
+
+    def restore_checkpoint_states(self, states):
+        """Rebuild the sample and the recorded rows by replaying checkpoint states in order."""
+        latest = states[-1]
+        self.fleet_size = latest['fleet_size']
+        self.sample_index = latest['sample_index'].copy()
+        self.vehicle_ids = list(latest['vehicle_ids'])
+        self.rows_filled = latest['rows_filled']
+        buffers = self._buffers()
+        for state in states:
+            first = state['first_step']
+            for name, rows in state['rows'].items():
+                buffers[name][first:first + len(rows)] = rows
+
+    def _buffers(self):
+        """Every per-step array by name, for checkpointing."""
+        return {
+            'timestamps': self.timestamps,
+            'soc': self.soc,
+            'power_kw': self.power_kw,
+            'soc_bands': self.soc_bands,
+            'power_bands': self.power_bands,
+            'soc_histogram': self.soc_histogram,
+        }
+
+def _reservoir_sample(items, size, rng):
+    """
+    Algorithm R: positions of a uniform sample of ``size`` items from a stream
+    of unknown length, in one pass.
+
+    Returns:
+        tuple: (number of items seen, sorted np.ndarray of sampled positions)
+    """
+    reservoir = []
+    seen = 0
+    for seen, _ in enumerate(items, start=1):
+        if len(reservoir) < size:
+            reservoir.append(seen - 1)
+        else:
+            slot = rng.integers(seen)
+            if slot < size:
+                reservoir[slot] = seen - 1
+    return seen, np.sort(np.array(reservoir, dtype=np.int64))
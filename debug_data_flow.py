@@ -41,7 +41,7 @@ try:
     scenario_manager = ScenarioManager(config)
     
     # Set up for 15% BDWPT penetration
-    traffic_model.set_bdwpt_penetration(15)
+    cosim_engine._initialize_simulation(scenario_manager.get_scenario("Weekday Peak", 15))
     
     # Test one time step in detail
     print("\n3. Testing one simulation step...")
@@ -55,7 +55,8 @@ try:
     print(f"   Total BDWPT power: {sum(bdwpt_powers.values()):.2f} kW")
     
     # Update grid loads
-    cosim_engine._update_grid_loads(8, "Weekday Peak", bdwpt_powers)
+    step_index = 8 * 60 // config.time_step_minutes
+    cosim_engine._update_grid_loads(step_index, "weekday", bdwpt_powers)
     
     # Solve power flow
     pf_results = power_grid.solve_power_flow()
@@ -64,7 +65,8 @@ try:
     print(f"   Voltages sample: {dict(list(pf_results.get('voltages', {}).items())[:3])}")
     
     # Collect step results
-    step_results = cosim_engine._collect_step_results(timestamp, pf_results, bdwpt_powers)
+    cosim_engine._collect_step_results(step_index, timestamp, pf_results, bdwpt_powers)
+    step_results = cosim_engine.recorder.get_step(step_index)
     print(f"\n4. Step results analysis:")
     print(f"   Keys: {sorted(step_results.keys())}")
     print(f"   Total load: {step_results.get('total_load_kw', 'MISSING')}")
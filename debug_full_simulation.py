@@ -62,8 +62,8 @@ try:
         print(f"  Total BDWPT power: {sum(bdwpt_powers.values()):.2f} kW")
         
         # Update grid loads
-        load_profile_type = scenario['load_profile']
-        cosim_engine._update_grid_loads(hour, load_profile_type, bdwpt_powers)
+        step_index = (hour * 60 + timestamp.minute) // config.time_step_minutes
+        cosim_engine._update_grid_loads(step_index, scenario['day_type'], bdwpt_powers)
         print(f"✓ Grid loads updated")
         
         # Solve power flow
@@ -74,7 +74,8 @@ try:
         print(f"  Voltage range: {min(pf_results['voltages'].values()):.3f} - {max(pf_results['voltages'].values()):.3f} p.u.")
         
         # Collect step results
-        step_results = cosim_engine._collect_step_results(timestamp, pf_results, bdwpt_powers)
+        cosim_engine._collect_step_results(step_index, timestamp, pf_results, bdwpt_powers)
+        step_results = cosim_engine.recorder.get_step(step_index)
         print(f"✓ Step results collected with {len(step_results)} fields")
         print(f"  Keys: {sorted(step_results.keys())}")
         
@@ -127,7 +128,7 @@ try:
     print("TESTING _compile_results METHOD")
     print("=" * 40)
     
-    compiled_results = cosim_engine._compile_results(results_data, scenario)
+    compiled_results = cosim_engine._compile_results(scenario)
     print(f"✓ Results compiled successfully!")
     print(f"  Keys: {compiled_results.keys()}")
     
@@ -35,8 +35,8 @@ try:
     
     print("3. Testing one simulation step...")
     
-    # Configure traffic model
-    traffic_model.set_bdwpt_penetration(15)
+    # Configure traffic model and agents
+    cosim_engine._initialize_simulation(scenario)
     
     # Test BDWPT power calculation
     bdwpt_powers = cosim_engine._calculate_bdwpt_powers(8)  # 8 AM
@@ -44,7 +44,8 @@ try:
     print(f"Total BDWPT power: {sum(bdwpt_powers.values()):.2f} kW")
     
     # Test grid load update
-    cosim_engine._update_grid_loads(8, "Weekday Peak", bdwpt_powers)
+    step_index = 8 * 60 // config.time_step_minutes
+    cosim_engine._update_grid_loads(step_index, "weekday", bdwpt_powers)
     print("✓ Grid loads updated")
     
     # Test power flow solution
@@ -54,7 +55,8 @@ try:
     # Test results collection
     from datetime import datetime
     timestamp = datetime(2024, 1, 1, 8, 0)
-    step_results = cosim_engine._collect_step_results(timestamp, pf_results, bdwpt_powers)
+    cosim_engine._collect_step_results(step_index, timestamp, pf_results, bdwpt_powers)
+    step_results = cosim_engine.recorder.get_step(step_index)
     print(f"✓ Step results collected")
     print(f"Step results keys: {step_results.keys()}")
     print(f"Total load: {step_results.get('total_load_kw', 'N/A')}")
@@ -7,18 +7,6 @@ import numpy as np
 import pandas as pd
 from datetime import datetime
 
-# --- START OF DIAGNOSTIC CODE ---
-# 打印当前工作目录和脚本路径，帮助定位问题
-script_path = os.path.abspath(__file__)
-current_working_dir = os.getcwd()
-print(f"--- SCRIPT STARTUP DIAGNOSTICS ---")
-print(f"Script Location: {script_path}")
-print(f"Current Working Directory: {current_working_dir}")
-print(f"Python Executable: {sys.executable}")
-print(f"------------------------------------")
-# --- END OF DIAGNOSTIC CODE ---
-
-
 # Import custom modules
 from config import SimulationConfig
 from traffic_model.data_loader import TrafficDataLoader
@@ -26,18 +14,15 @@ from traffic_model.main_traffic import TrafficModel
 from power_grid_model.ieee_13_bus_model import IEEE13BusSystem
 from cosimulation.simulation_engine import CoSimulationEngine
 from cosimulation.scenarios import ScenarioManager
+from cosimulation.parallel_runner import ParallelScenarioRunner
+from cosimulation.ensemble_runner import EnsembleRunner
+from cosimulation.sensitivity_sweep import SensitivitySweep
+from cosimulation.hosting_capacity import HostingCapacitySolver
+from cosimulation.result_writer import ChunkedResultWriter
+from cosimulation.run_catalog import open_catalog
 from cosimulation.results_analyzer import ResultsAnalyzer
 from visualizations.plot_results import Visualizer
 
-# Setup logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('simulation.log', mode='w'), # Use 'w' to overwrite log each time
-        logging.StreamHandler(sys.stdout)
-    ]
-)
 logger = logging.getLogger(__name__)
 
 class BDWPTSimulationPlatform:
@@ -51,6 +36,7 @@ class BDWPTSimulationPlatform:
         self.scenario_manager = None
         self.results_analyzer = None
         self.visualizer = None
+        self.catalog = None
         
     def initialize(self):
         """Initialize all simulation components"""
@@ -58,7 +44,7 @@ class BDWPTSimulationPlatform:
         
         # Initialize data loader first
         logger.info("Setting up data loader...")
-        data_loader = TrafficDataLoader(self.config.data_dir)
+        data_loader = TrafficDataLoader(self.config.data_dir, self.config.get_data_cache_dir())
 
         # Initialize traffic model
         logger.info("Setting up traffic model...")
@@ -83,6 +69,7 @@ class BDWPTSimulationPlatform:
         # Initialize results analyzer and visualizer
         self.results_analyzer = ResultsAnalyzer(self.config)
         self.visualizer = Visualizer(self.config)
+        self.catalog = open_catalog(self.config)
         
         logger.info("Initialization complete!")
         
@@ -95,7 +82,8 @@ class BDWPTSimulationPlatform:
         
         # Run co-simulation
         start_time = time.time()
-        results = self.cosim_engine.run_simulation(scenario)
+        results = self.cosim_engine.run_simulation(
+            scenario, resume=self.config.checkpoint_params['resume'])
         elapsed_time = time.time() - start_time
         
         logger.info(f"Simulation completed in {elapsed_time:.2f} seconds")
@@ -107,6 +95,11 @@ class BDWPTSimulationPlatform:
         all_results = {}
         scenarios_to_run = self.scenario_manager.get_all_scenarios_to_run()
         
+        if self.config.parallel_params['enabled'] and len(scenarios_to_run) > 1:
+            runner = ParallelScenarioRunner(self.config)
+            return runner.run(scenarios_to_run, self.traffic_model,
+                              on_result=lambda scenario, results: self.save_results(results, scenario['name'], scenario))
+        
         for scenario in scenarios_to_run:
             key = scenario['name']
             logger.info(f"\n{'='*60}")
@@ -116,7 +109,7 @@ class BDWPTSimulationPlatform:
             try:
                 results = self.run_scenario(scenario['base_name'], scenario['bdwpt_penetration'])
                 all_results[key] = results
-                self.save_results(results, key)
+                self.save_results(results, key, scenario)
             except Exception as e:
                 logger.error(f"FATAL ERROR in scenario {key}: {str(e)}")
                 import traceback
@@ -125,6 +118,58 @@ class BDWPTSimulationPlatform:
                 
         return all_results
         
+    def run_ensemble(self):
+        """Run Monte-Carlo replicas of all scenarios and report KPI confidence intervals"""
+        runner = EnsembleRunner(self.config)
+        ensemble = runner.run(self.scenario_manager.get_all_scenarios_to_run())
+        
+        confidence = self.config.ensemble_params['confidence_level']
+        logger.info("\n" + "="*25 + f" ENSEMBLE KPIs ({confidence:.0%} CI) " + "="*25)
+        rows = []
+        for scenario, result in ensemble.items():
+            for kpi in ('peak_reduction_kw', 'loss_reduction_kwh', 'energy_from_v2g_kwh', 'voltage_improvement'):
+                stats = result['kpis'][kpi]
+                rows.append({
+                    'Scenario': scenario,
+                    'Replicas': result['replicas'],
+                    'KPI': kpi,
+                    'Mean': stats['mean'],
+                    'CI Half-Width': stats['half_width'],
+                })
+        logger.info("\n" + pd.DataFrame(rows).to_string())
+        runner.save(ensemble)
+        return ensemble
+        
+    def run_sensitivity(self):
+        """Run the sensitivity sweep and report the most influential parameter per KPI"""
+        sweep = SensitivitySweep(self.config)
+        design, indices = sweep.run(self.traffic_model)
+        sweep.save(design, indices)
+        
+        measure = 'ST' if self.config.sensitivity_params['method'] == 'sobol' else 'mu_star'
+        ranked = indices.dropna(subset=[measure])
+        if not ranked.empty:
+            top = ranked.loc[ranked[measure].abs().groupby(ranked['kpi']).idxmax()]
+            logger.info("\n" + "="*25 + " MOST INFLUENTIAL PARAMETERS " + "="*25)
+            logger.info("\n" + top[['kpi', 'parameter', measure]].to_string(index=False))
+        return design, indices
+        
+    def run_hosting_capacity(self):
+        """Search the BDWPT hosting capacity of every base scenario"""
+        solver = HostingCapacitySolver(self.config, self.traffic_model, self.power_grid)
+        results = solver.run()
+        
+        logger.info("\n" + "="*25 + " HOSTING CAPACITY " + "="*25)
+        rows = [{
+            'Base Scenario': base_name,
+            'Hosting Capacity (%)': result['hosting_capacity_pct'],
+            'Limiting Constraint': result['limiting_constraint'] or '-',
+            'Runs': result['runs'],
+        } for base_name, result in results.items()]
+        logger.info("\n" + pd.DataFrame(rows).to_string(index=False))
+        solver.save(results)
+        return results
+        
     def analyze_results(self, all_results):
         """Analyze simulation results and calculate KPIs"""
         logger.info("\nAnalyzing simulation results...")
@@ -155,29 +200,39 @@ class BDWPTSimulationPlatform:
         os.makedirs(figures_path, exist_ok=True)
         logger.info(f"Ensuring figures directory exists at: {figures_path}")
 
-        self.visualizer.plot_load_curves(all_results)
-        self.visualizer.plot_voltage_profiles(all_results)
-        self.visualizer.plot_kpi_comparison(kpis)
-        self.visualizer.plot_bdwpt_heatmap(all_results)
-        
+        self.visualizer.render_all(all_results, kpis)
+
         logger.info(f"Visualizations have been saved to: {figures_path}")
         
-    def save_results(self, results, scenario_name):
-        """Save simulation results to CSV and text files."""
+    def save_results(self, results, scenario_name, scenario=None, seed=None):
+        """Save simulation results and record the run in the catalog."""
         try:
-            clean_name = scenario_name.replace("%", "pct").replace(" ", "_")
-            
             # Use absolute path for clarity
-            base_output_dir = os.path.abspath(self.config.results_dir)
-            output_dir = os.path.join(base_output_dir, clean_name)
+            output_dir = self.config.get_scenario_results_dir(scenario_name)
             os.makedirs(output_dir, exist_ok=True)
             logger.info(f"Attempting to save results to absolute path: {output_dir}")
             
             # Save time series data
+            timeseries_path = results.get('timeseries_path')
             if 'timeseries' in results and isinstance(results['timeseries'], pd.DataFrame):
-                timeseries_file = os.path.join(output_dir, 'timeseries_data.csv')
-                results['timeseries'].to_csv(timeseries_file, index=False)
-                logger.info(f"SUCCESS: Saved timeseries data to {timeseries_file}")
+                if self.config.output_params['timeseries_csv']:
+                    timeseries_file = os.path.join(output_dir, 'timeseries_data.csv')
+                    results['timeseries'].to_csv(timeseries_file, index=False)
+                    logger.info(f"SUCCESS: Saved timeseries data to {timeseries_file}")
+                if self.catalog is not None:
+                    # The catalog points at columnar files, which can be read column by column
+                    # One directory per run, so catalog rows of earlier runs keep pointing at their own data
+                    writer = ChunkedResultWriter(
+                        self.config.get_run_timeseries_dir(scenario_name, self.config.new_run_key()),
+                        self.config.output_params['format'],
+                        self.config.output_params['compression']
+                    )
+                    writer.write_chunk(results['timeseries'])
+                    writer.close()
+                    timeseries_path = writer.output_dir
+            elif timeseries_path:
+                # Streaming runs have already written their timeseries in chunks
+                logger.info(f"SUCCESS: Timeseries data was streamed to {timeseries_path}")
             
             # Save summary statistics
             if 'summary' in results:
@@ -185,9 +240,20 @@ class BDWPTSimulationPlatform:
                 with open(summary_file, 'w') as f:
                     f.write(f"Scenario: {scenario_name}\n")
                     f.write(f"Simulation completed at: {datetime.now()}\n")
-                    # ... (rest of summary writing)
+                    for key, value in results['summary'].items():
+                        f.write(f"{key}: {value}\n")
                 logger.info(f"SUCCESS: Saved summary to {summary_file}")
             
+            if self.catalog is not None and scenario is not None:
+                run_id = self.catalog.record(
+                    scenario, results['summary'],
+                    config_hash=self.config.get_fingerprint(),
+                    seed=seed,
+                    kernel=self.config.simulation_params['kernel'],
+                    timeseries_path=timeseries_path
+                )
+                logger.info(f"Recorded {scenario_name} in the run catalog as run {run_id}")
+            
         except Exception as e:
             logger.error(f"CRITICAL FAILURE during file save for {scenario_name}: {e}")
             import traceback
@@ -202,6 +268,16 @@ class BDWPTSimulationPlatform:
         
         try:
             self.initialize()
+            if self.config.ensemble_params['enabled']:
+                self.run_ensemble()
+                return
+            if self.config.sensitivity_params['enabled']:
+                self.run_sensitivity()
+                return
+            if self.config.hosting_capacity_params['enabled']:
+                self.run_hosting_capacity()
+                return
+            
             all_results = self.run_all_scenarios()
             
             if not all_results:
@@ -220,6 +296,33 @@ class BDWPTSimulationPlatform:
             logger.error(f"A fatal error occurred during the simulation run: {str(e)}")
             raise
 
+def print_startup_diagnostics():
+    """Print the script location and working directory, to help locate output problems."""
+    # 打印当前工作目录和脚本路径，帮助定位问题
+    print(f"--- SCRIPT STARTUP DIAGNOSTICS ---")
+    print(f"Script Location: {os.path.abspath(__file__)}")
+    print(f"Current Working Directory: {os.getcwd()}")
+    print(f"Python Executable: {sys.executable}")
+    print(f"------------------------------------")
+
+def setup_logging(logs_dir):
+    """
+    Log to stdout and to ``simulation.log`` in ``logs_dir`` (overwritten on each run).
+    Only the main process calls this: spawned workers re-import this module, and
+    OpenDSS changes the working directory, so the log path must be absolute.
+    """
+    os.makedirs(logs_dir, exist_ok=True)
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+        handlers=[
+            logging.FileHandler(os.path.join(os.path.abspath(logs_dir), 'simulation.log'), mode='w'),
+            logging.StreamHandler(sys.stdout)
+        ]
+    )
+
 if __name__ == "__main__":
+    print_startup_diagnostics()
     platform = BDWPTSimulationPlatform()
+    setup_logging(platform.config.logs_dir)
     platform.run()
\ No newline at end of file
@@ -17,6 +17,7 @@ class BDWPTAgent:
         self.power_setpoint = 0  # kW
         self.energy_exchanged = 0  # kWh
         self.operation_history = []
+        self.soc_modulated = False  # Whether the last decision's power varies continuously with SoC
         
     def decide_action(self, voltage_pu, tariff, time_step_minutes=1):
         """
@@ -35,6 +36,7 @@ class BDWPTAgent:
         
         # Get control parameters
         params = self.config.control_params
+        self.soc_modulated = False
         
         # Priority 1: SoC-based constraints
         if self.soc < params['soc_force_charge']:
@@ -81,6 +83,7 @@ class BDWPTAgent:
                     # Modulate power based on score
                     power_factor = min(1.0, score)
                     self.power_setpoint = -self.config.bdwpt_params['discharging_power_kw'] * power_factor
+                    self.soc_modulated = power_factor < 1.0
                 else:
                     self.mode = 'idle'
                     self.power_setpoint = 0
@@ -91,6 +94,7 @@ class BDWPTAgent:
                     # Modulate power based on score
                     power_factor = min(1.0, abs(score))
                     self.power_setpoint = self.config.bdwpt_params['charging_power_kw'] * power_factor
+                    self.soc_modulated = power_factor < 1.0
                 else:
                     self.mode = 'idle'
                     self.power_setpoint = 0
@@ -187,6 +191,40 @@ class BDWPTAgent:
             # Track total energy exchanged
             self.energy_exchanged += energy_kwh
             
+    def advance(self, minutes):
+        """Integrate SoC over an interval at the current power setpoint (event-driven kernel)"""
+        self._update_soc(minutes)
+        
+    def get_soc_rate(self):
+        """SoC change per minute at the current power setpoint"""
+        if self.power_setpoint > 0:
+            energy_per_minute = self.power_setpoint / 60 * self.config.bdwpt_params['efficiency']
+        else:
+            energy_per_minute = self.power_setpoint / 60 / self.config.bdwpt_params['efficiency']
+        return energy_per_minute / self.battery_capacity
+        
+    def get_soc_breakpoints(self, voltage_pu, tariff):
+        """
+        SoC values at which decide_action may change its outcome for fixed
+        voltage and tariff: the control thresholds plus the SoC at which the
+        economic decision score crosses the V2G/G2V thresholds or saturates
+        the power (|score| = 1). Between breakpoints the outcome is constant
+        unless ``soc_modulated`` is set.
+        """
+        params = self.config.control_params
+        breakpoints = [
+            0.0, 1.0,
+            params['soc_force_charge'],
+            params['soc_force_discharge'],
+            params['soc_min_v2g'],
+            self.config.ev_params['max_soc_threshold'],
+        ]
+        # score = base + 0.2 * (soc - 0.65) / 0.35, see _calculate_decision_score
+        base_score = self._calculate_decision_score(voltage_pu, tariff) - 0.2 * (self.soc - 0.65) / 0.35
+        for threshold in (0.2, -0.2, 1.0, -1.0):
+            breakpoints.append(0.65 + 0.35 * (threshold - base_score) / 0.2)
+        return sorted(b for b in breakpoints if 0.0 <= b <= 1.0)
+        
     def update_soc_from_driving(self, distance_km):
         """Update SoC based on driving energy consumption"""
         energy_consumed = distance_km * self.config.ev_params['energy_consumption_kwh_per_km']
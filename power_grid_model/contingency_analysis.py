@@ -0,0 +1,173 @@
+# power_grid_model/contingency_analysis.py - N-1 contingency screening on recorded injections
+
+import os
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+
+from power_grid_model.ieee_13_bus_model import IEEE13BusSystem
+from power_grid_model.load_profiles import LoadProfileProvider
+
+logger = logging.getLogger(__name__)
+
+# Violation bit flags stored in the (outages x time) matrix
+VIOLATION_UNDERVOLTAGE = 1
+VIOLATION_OVERVOLTAGE = 2
+VIOLATION_THERMAL = 4
+VIOLATION_LOSS_OF_SUPPLY = 8
+VIOLATION_NOT_CONVERGED = 16
+
+BASE_CASE = 'base'
+
+class ContingencyAnalyzer:
+    """
+    Re-solves the feeder for every recorded time step under each single outage
+    (lines, capacitors, transformers) using the base loads and BDWPT injections of
+    a completed run. Traffic and agents are not re-simulated.
+    """
+
+    def __init__(self, config):
+        self.config = config
+        self.params = config.contingency_params
+
+    def screen(self, timeseries, day_type, outages=None):
+        """
+        Run N-1 screening for one completed scenario.
+
+        Args:
+            timeseries (pd.DataFrame): The 'timeseries' frame from CoSimulationEngine results.
+            day_type (str): Day type of the scenario, used to rebuild the base loads.
+            outages (list, optional): Element names such as 'Line.650632'. Defaults to
+                every line, capacitor and transformer in the feeder.
+
+        Returns:
+            dict: 'outages' (row labels, base case first), 'timestamps', 'violations'
+                  (int8 bit flags, outages x time), 'min_voltage_pu' and 'max_loading_pct'.
+        """
+        grid = IEEE13BusSystem(self.config)
+        grid.build_network()
+        if outages is None:
+            outages = grid.get_contingency_elements()
+        if not outages:
+            raise RuntimeError("Contingency screening requires the OpenDSS model")
+
+        base_loads = LoadProfileProvider(self.config, grid.load_buses).get_matrix(day_type)
+        bdwpt_nodes = self.config.grid_params['bdwpt_nodes']
+        injections = timeseries[[f'bdwpt_node_{node}_kw' for node in bdwpt_nodes]].to_numpy(dtype=np.float64)
+        base_loads = base_loads[:len(injections)]
+
+        labels = [BASE_CASE] + list(outages)
+        num_steps = len(injections)
+        violations = np.zeros((len(labels), num_steps), dtype=np.int8)
+        min_voltage = np.zeros((len(labels), num_steps))
+        max_loading = np.zeros((len(labels), num_steps))
+
+        # Nodes energized without any outage; de-energizing one of them is a loss of supply
+        energized = _energized_nodes(grid, base_loads[0], bdwpt_nodes, injections[0], self.params)
+
+        max_workers = min(self.params['max_workers'] or os.cpu_count() or 1, len(labels))
+        chunks = [labels[i::max_workers] for i in range(max_workers)]
+        logger.info(f"Screening {len(outages)} outages x {num_steps} steps on {max_workers} workers")
+
+        # OpenDSS is process-global, so each worker builds its own circuit (from the snapshot cache)
+        context = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(max_workers=max_workers, mp_context=context) as executor:
+            futures = [
+                executor.submit(_screen_outages, self.config, chunk, base_loads, bdwpt_nodes, injections, energized)
+                for chunk in chunks if chunk
+            ]
+            for future in as_completed(futures):
+                for label, flags, v_min, loading in future.result():
+                    row = labels.index(label)
+                    violations[row], min_voltage[row], max_loading[row] = flags, v_min, loading
+
+        logger.info(f"Contingency screening complete: {int((violations[1:] != 0).any(axis=1).sum())} "
+                    f"of {len(outages)} outages cause violations")
+        return {
+            'outages': labels,
+            'timestamps': timeseries['timestamp'].to_numpy(),
+            'violations': violations,
+            'min_voltage_pu': min_voltage,
+            'max_loading_pct': max_loading,
+        }
+
+    @staticmethod
+    def summarize(screening):
+        """Per-outage summary table: violating steps by type, worst voltage and loading."""
+        violations = screening['violations']
+        flags = {
+            'undervoltage_steps': VIOLATION_UNDERVOLTAGE,
+            'overvoltage_steps': VIOLATION_OVERVOLTAGE,
+            'thermal_steps': VIOLATION_THERMAL,
+            'loss_of_supply_steps': VIOLATION_LOSS_OF_SUPPLY,
+            'not_converged_steps': VIOLATION_NOT_CONVERGED,
+        }
+        summary = pd.DataFrame(
+            {name: ((violations & flag) != 0).sum(axis=1) for name, flag in flags.items()},
+            index=pd.Index(screening['outages'], name='outage')
+        )
+        summary['violating_steps'] = (violations != 0).sum(axis=1)
+        summary['min_voltage_pu'] = screening['min_voltage_pu'].min(axis=1)
+        summary['max_loading_pct'] = screening['max_loading_pct'].max(axis=1)
+        return summary
+
+def _apply_step(grid, base_loads, bdwpt_nodes, injections):
+    grid.set_base_loads(base_loads)
+    for node, power in zip(bdwpt_nodes, injections):
+        grid.update_bdwpt_load(node, power)
+
+def _energized_nodes(grid, base_loads, bdwpt_nodes, injections, params):
+    _apply_step(grid, base_loads, bdwpt_nodes, injections)
+    grid.solve_power_flow()
+    node_names, voltages = grid.get_node_voltages_pu()
+    return {name for name, v in zip(node_names, voltages) if v > params['deenergized_voltage_pu']}
+
+def _screen_outages(config, labels, base_loads, bdwpt_nodes, injections, energized):
+    """Worker: solve every step for each outage in ``labels`` on a private circuit."""
+    grid = IEEE13BusSystem(config)
+    grid.build_network()
+    tolerance = config.grid_params['voltage_tolerance']
+    max_loading_percent = config.grid_params['max_loading_percent']
+    deenergized = config.contingency_params['deenergized_voltage_pu']
+
+    results = []
+    for label in labels:
+        if label != BASE_CASE:
+            grid.set_element_enabled(label, False)
+
+        flags = np.zeros(len(injections), dtype=np.int8)
+        min_voltage = np.zeros(len(injections))
+        max_loading = np.zeros(len(injections))
+        watched_names = None
+        for t in range(len(injections)):
+            _apply_step(grid, base_loads[t], bdwpt_nodes, injections[t])
+            pf_results = grid.solve_power_flow()
+            node_names, voltages = grid.get_node_voltages_pu()
+            if node_names is not watched_names:
+                # Node order only changes when the network index is rebuilt
+                watched_names = node_names
+                watched = np.array([name in energized for name in node_names])
+            live = watched & (voltages > deenergized)
+
+            if not pf_results['converged']:
+                flags[t] |= VIOLATION_NOT_CONVERGED
+            if (watched & ~live).any():
+                flags[t] |= VIOLATION_LOSS_OF_SUPPLY
+            if live.any():
+                min_voltage[t] = voltages[live].min()
+                if min_voltage[t] < 1 - tolerance:
+                    flags[t] |= VIOLATION_UNDERVOLTAGE
+                if voltages[live].max() > 1 + tolerance:
+                    flags[t] |= VIOLATION_OVERVOLTAGE
+            loading = pf_results['lines']['loading_pct']
+            max_loading[t] = loading.max() if loading.size else 0.0
+            if max_loading[t] > max_loading_percent:
+                flags[t] |= VIOLATION_THERMAL
+
+        if label != BASE_CASE:
+            grid.set_element_enabled(label, True)
+        results.append((label, flags, min_voltage, max_loading))
+    return results
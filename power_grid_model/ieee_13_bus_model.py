@@ -1,8 +1,12 @@
 # power_grid_model/ieee_13_bus_model.py - IEEE 13-bus test system with BDWPT
 
+import os
+import json
+import hashlib
 import numpy as np
 import pandas as pd
 import logging
+from scipy import sparse
 try:
     import py_dss_interface
     USE_OPENDSS = True
@@ -23,6 +27,11 @@ class IEEE13BusSystem:
         self.bdwpt_loads = {}
         self.voltages = {}
         self.power_flows = {}
+        self.bdwpt_elements = {}  # bus_id -> OpenDSS element name
+        self._load_element_names = []
+        self.line_names = []
+        self.line_ratings_amps = np.zeros(0)
+        self._network_index = None  # Node voltage bases and branch-current operator, built on the first solve
         
         if USE_OPENDSS:
             self.dss = py_dss_interface.DSS()
@@ -32,6 +41,8 @@ class IEEE13BusSystem:
     def build_network(self):
         """Build IEEE 13-bus test system"""
         logger.info("Building IEEE 13-bus test system...")
+        # The cached operator describes the previous circuit
+        self._network_index = None
         
         if USE_OPENDSS:
             self._build_opendss_model()
@@ -39,22 +50,18 @@ class IEEE13BusSystem:
             self._build_simple_model()
             
     def _build_opendss_model(self):
-        """Build model using OpenDSS"""
-        self.dss.text("clear")
-        self.dss.text("new circuit.IEEE13 basekv=4.16 pu=1.00 phases=3 bus1=650")
-        
-        self._define_line_codes()
-        self._add_lines()
-        self._add_loads()
-        self._add_capacitors()
-        self.dss.text("New Transformer.SubXF Phases=3 Windings=2 Xhl=0.01")
-        self.dss.text("~ wdg=1 bus=650 kv=4.16 kva=5000 %r=0.0005")
-        self.dss.text("~ wdg=2 bus=RG60 kv=4.16 kva=5000 %r=0.0005")
-        
-        self._predefine_bdwpt_loads()
-        
-        self.dss.text("set voltagebases=[4.16]")
-        self.dss.text("calcvoltagebases")
+        """Build model using OpenDSS, restoring a cached compiled snapshot when available"""
+        commands = self._get_network_commands()
+        network_hash = hashlib.sha256("\n".join(commands).encode('utf-8')).hexdigest()[:16]
+        snapshot_dir = os.path.join(self.config.cache_dir, f"circuit_{network_hash}")
+        use_cache = self.config.grid_params['use_circuit_cache']
+        
+        if use_cache and self._restore_circuit_snapshot(snapshot_dir):
+            logger.info(f"OpenDSS model restored from cached snapshot {network_hash}")
+            return
+        
+        for command in commands:
+            self.dss.text(command)
         self.dss.solution.solve()
         
         # --- START OF FIX ---
@@ -72,9 +79,98 @@ class IEEE13BusSystem:
                 continue
         # --- END OF FIX ---
         
+        # Track base loads by bus, matching the simple model's {'P', 'Q'} layout
+        self.loads = {}
+        self._load_element_names = []
+        for load_name in self.dss.loads.names:
+            if load_name.startswith('bdwpt_'):
+                continue
+            self.dss.loads.name = load_name
+            self.loads[int(load_name)] = {'P': self.dss.loads.kw, 'Q': self.dss.loads.kvar}
+            self._load_element_names.append(load_name)
+        
         # Initialize voltages for all tracked buses
         self.voltages = {bus: 1.0 for bus in self.buses}
+        
+        if use_cache:
+            self._save_circuit_snapshot(snapshot_dir, commands)
         logger.info("OpenDSS model built successfully")
+        
+    def get_network_fingerprint(self):
+        """Short hash of the feeder definition, used to key cached results"""
+        if USE_OPENDSS:
+            definition = "\n".join(self._get_network_commands())
+        else:
+            definition = repr((sorted(self.buses.items()), sorted(self.loads.items())))
+        return hashlib.sha256(definition.encode('utf-8')).hexdigest()[:16]
+        
+    def _get_network_commands(self):
+        """Return the complete, ordered list of DSS commands defining the feeder"""
+        commands = [
+            "clear",
+            "new circuit.IEEE13 basekv=4.16 pu=1.00 phases=3 bus1=650",
+        ]
+        commands += self._line_code_commands()
+        commands += self._line_commands()
+        commands += self._load_commands()
+        commands += self._capacitor_commands()
+        commands += [
+            "New Transformer.SubXF Phases=3 Windings=2 Xhl=0.01",
+            "~ wdg=1 bus=650 kv=4.16 kva=5000 %r=0.0005",
+            "~ wdg=2 bus=RG60 kv=4.16 kva=5000 %r=0.0005",
+        ]
+        commands += self._predefine_bdwpt_loads()
+        commands += [
+            "set voltagebases=[4.16]",
+            "calcvoltagebases",
+        ]
+        return commands
+        
+    def _save_circuit_snapshot(self, snapshot_dir, commands):
+        """
+        Save the circuit definition as a single compiled script together with the
+        derived index maps, so later startups need one redirect and no rescans.
+        """
+        try:
+            os.makedirs(snapshot_dir, exist_ok=True)
+            with open(os.path.join(snapshot_dir, 'master.dss'), 'w') as f:
+                f.write("\n".join(commands) + "\n")
+            
+            index = {
+                'buses': self.buses,
+                'loads': self.loads,
+                'load_element_names': self._load_element_names,
+                'bdwpt_elements': self.bdwpt_elements,
+            }
+            # Write then rename so concurrent workers never read a partial index
+            tmp_file = os.path.join(snapshot_dir, f"index.json.{os.getpid()}.tmp")
+            with open(tmp_file, 'w') as f:
+                json.dump(index, f)
+            os.replace(tmp_file, os.path.join(snapshot_dir, 'index.json'))
+            logger.info(f"Saved compiled circuit snapshot to {snapshot_dir}")
+        except OSError as e:
+            logger.warning(f"Could not save circuit snapshot to {snapshot_dir}: {e}")
+            
+    def _restore_circuit_snapshot(self, snapshot_dir):
+        """Restore the circuit and index maps from a snapshot. Returns False on a cache miss."""
+        index_file = os.path.join(snapshot_dir, 'index.json')
+        if not os.path.exists(index_file):
+            return False
+        
+        with open(index_file, 'r') as f:
+            index = json.load(f)
+        self.dss.text(f"redirect [{os.path.join(snapshot_dir, 'master.dss')}]")
+        self._network_index = None
+        # Solve once as a fresh compile does, so both start the next solve from the same operating point
+        self.dss.solution.solve()
+        
+        # JSON object keys are strings; bus ids are integers everywhere else
+        self.buses = {int(bus_id): bus for bus_id, bus in index['buses'].items()}
+        self.loads = {int(bus_id): load for bus_id, load in index['loads'].items()}
+        self._load_element_names = index['load_element_names']
+        self.bdwpt_elements = {int(bus_id): name for bus_id, name in index['bdwpt_elements'].items()}
+        self.voltages = {bus: 1.0 for bus in self.buses}
+        return True
 
     def _predefine_bdwpt_loads(self):
         """
@@ -82,10 +178,14 @@ class IEEE13BusSystem:
         with an initial power of 0 to avoid creating them in each time step.
         """
         logger.info("Pre-defining BDWPT loads at all potential nodes...")
+        commands = []
+        self.bdwpt_elements = {}
         for bus_id in self.config.grid_params['bdwpt_nodes']:
             bdwpt_name = f"BDWPT_{bus_id}"
-            self.dss.text(f"New Load.{bdwpt_name} Bus1={bus_id} Phases=3 Conn=Wye Model=1 kV=4.16 kW=0 kvar=0")
+            commands.append(f"New Load.{bdwpt_name} Bus1={bus_id} Phases=3 Conn=Wye Model=1 kV=4.16 kW=0 kvar=0")
+            self.bdwpt_elements[bus_id] = f"Load.{bdwpt_name}"
         logger.info(f"Defined {len(self.config.grid_params['bdwpt_nodes'])} placeholder BDWPT loads.")
+        return commands
         
     def _build_simple_model(self):
         """Build simplified model for testing without OpenDSS"""
@@ -113,7 +213,7 @@ class IEEE13BusSystem:
         }
         logger.info("Simple model built successfully")
         
-    def _define_line_codes(self):
+    def _line_code_commands(self):
         line_codes = [
             "New linecode.601 nphases=3 r1=0.3465 x1=1.0179 r0=0.7876 x0=1.2133 c1=11.155 c0=5.3302 units=mi",
             "New linecode.602 nphases=3 r1=0.7526 x1=1.1814 r0=1.1681 x0=1.4751 c1=11.389 c0=5.4246 units=mi",
@@ -121,9 +221,9 @@ class IEEE13BusSystem:
             "New linecode.604 nphases=2 r1=1.3238 x1=1.3569 r0=1.6559 x0=1.7023 c1=10.348 c0=4.8928 units=mi",
             "New linecode.605 nphases=1 r1=1.3292 x1=1.3475 r0=1.6559 x0=1.6895 c1=10.362 c0=4.8998 units=mi",
         ]
-        for code in line_codes: self.dss.text(code)
+        return line_codes
             
-    def _add_lines(self):
+    def _line_commands(self):
         lines = [
             "New Line.650632 Phases=3 Bus1=650.1.2.3 Bus2=632.1.2.3 LineCode=601 Length=2000 units=ft",
             "New Line.632670 Phases=3 Bus1=632.1.2.3 Bus2=670.1.2.3 LineCode=601 Length=667 units=ft",
@@ -136,9 +236,9 @@ class IEEE13BusSystem:
             "New Line.684611 Phases=1 Bus1=684.3 Bus2=611.3 LineCode=605 Length=300 units=ft",
             "New Line.684652 Phases=1 Bus1=684.1 Bus2=652.1 LineCode=605 Length=800 units=ft",
         ]
-        for line in lines: self.dss.text(line)
+        return lines
             
-    def _add_loads(self):
+    def _load_commands(self):
         loads = [
             "New Load.634 Bus1=634.1.2.3 Phases=3 Conn=Wye Model=1 kV=4.16 kW=160 kvar=110",
             "New Load.645 Bus1=645.2.3 Phases=2 Conn=Wye Model=1 kV=4.16 kW=0 kvar=0",
@@ -149,11 +249,11 @@ class IEEE13BusSystem:
             "New Load.692 Bus1=692.3 Phases=1 Conn=Delta Model=5 kV=4.16 kW=0 kvar=0",
             "New Load.611 Bus1=611.3 Phases=1 Conn=Wye Model=5 kV=2.4 kW=170 kvar=80",
         ]
-        for load in loads: self.dss.text(load)
+        return loads
             
-    def _add_capacitors(self):
+    def _capacitor_commands(self):
         caps = ["New Capacitor.Cap1 Bus1=675 phases=3 kvar=600", "New Capacitor.Cap2 Bus1=611.3 phases=1 kvar=100"]
-        for cap in caps: self.dss.text(cap)
+        return caps
             
     def update_bdwpt_load(self, bus_id, power_kw, power_factor=0.95):
         """
@@ -163,7 +263,7 @@ class IEEE13BusSystem:
         if bus_id not in self.config.grid_params['bdwpt_nodes']:
             return
             
-        bdwpt_name = f"Load.BDWPT_{bus_id}"
+        bdwpt_name = self.bdwpt_elements.get(bus_id, f"Load.BDWPT_{bus_id}")
         
         if USE_OPENDSS:
             kvar = power_kw * np.tan(np.arccos(power_factor))
@@ -172,6 +272,26 @@ class IEEE13BusSystem:
         else:
             self.bdwpt_loads[bus_id] = power_kw
             
+    @property
+    def load_buses(self):
+        """Bus ids of the base loads, in the order expected by set_base_loads."""
+        return list(self.loads.keys())
+        
+    def set_base_loads(self, loads_kw):
+        """
+        Apply a full vector of base-load powers in one pass.
+        
+        Args:
+            loads_kw: kW values aligned with ``load_buses``.
+        """
+        if USE_OPENDSS:
+            dss_loads = self.dss.loads
+            for load_name, power_kw in zip(self._load_element_names, loads_kw):
+                dss_loads.name = load_name
+                dss_loads.kw = float(power_kw)
+        for load, power_kw in zip(self.loads.values(), loads_kw):
+            load['P'] = float(power_kw)
+            
     def reset_bdwpt_loads(self):
         """Reset all BDWPT loads to 0 for the new time step."""
         for bus_id in self.config.grid_params['bdwpt_nodes']:
@@ -192,7 +312,8 @@ class IEEE13BusSystem:
         """Extract results from OpenDSS solution"""
         results = {
             'voltages': {}, 'powers': {},
-            'losses': 0, 'converged': self.dss.solution.converged
+            'losses': 0, 'converged': self.dss.solution.converged,
+            'iterations': self.dss.solution.iterations
         }
         
         bus_names = self.dss.circuit.buses_names
@@ -212,6 +333,9 @@ class IEEE13BusSystem:
         # Average multi-phase voltages
         for bus_id, volt_list in temp_voltages.items():
             results['voltages'][bus_id] = np.mean(volt_list) if volt_list else 1.0
+            
+        node_voltages = self._get_node_voltages()
+        results['lines'] = self._get_line_flows(node_voltages)
 
         try:
             total_power = self.dss.circuit.total_power
@@ -224,6 +348,145 @@ class IEEE13BusSystem:
         
         return results
         
+    def _build_network_index(self):
+        """
+        Build the node voltage bases and a sparse operator mapping the full
+        node-voltage vector to every line terminal current, from each line's
+        primitive admittance matrix. Per-element selection happens only here;
+        each step then needs one array read.
+        """
+        node_order = [name.lower() for name in self.dss.circuit.y_node_order]
+        node_index = {name: i for i, name in enumerate(node_order)}
+        ground = len(node_order)  # Extra slot holding 0 V for grounded conductors
+        
+        node_base_volts = []
+        for name in node_order:
+            self.dss.circuit.set_active_bus(name.split('.')[0])
+            node_base_volts.append(self.dss.bus.kv_base * 1000)
+        
+        rows, cols, values = [], [], []
+        terminal_nodes, line_starts, from_counts, ratings = [], [], [], []
+        self.line_names = []
+        for line_name in self.dss.lines.names:
+            self.dss.circuit.set_active_element(f"Line.{line_name}")
+            element = self.dss.cktelement
+            num_conductors = element.num_conductors
+            conductors = []
+            for terminal, bus_name in enumerate(element.bus_names):
+                base_name = bus_name.split('.')[0].lower()
+                for node in element.node_order[terminal * num_conductors:(terminal + 1) * num_conductors]:
+                    # Nodes dropped from the Y matrix (isolated by an outage) read as 0 V
+                    conductors.append(node_index.get(f"{base_name}.{node}", ground) if node else ground)
+                    
+            # Disabled (outaged) lines keep their slot but carry no current
+            if element.is_enabled:
+                y_flat = np.asarray(element.y_prim)
+                y_prim = (y_flat[0::2] + 1j * y_flat[1::2]).reshape(len(conductors), len(conductors))
+                offset = len(terminal_nodes)
+                for i in range(len(conductors)):
+                    for j, col in enumerate(conductors):
+                        rows.append(offset + i)
+                        cols.append(col)
+                        values.append(y_prim[i, j])
+                    
+            line_starts.append(len(terminal_nodes))
+            from_counts.append(num_conductors)
+            terminal_nodes.extend(conductors)
+            ratings.append(self.dss.lines.norm_amps)
+            self.line_names.append(line_name)
+            
+        # Sending-end conductors are the first `from_counts` entries of each line block
+        line_of_conductor = np.repeat(np.arange(len(line_starts)), np.diff(line_starts + [len(terminal_nodes)]))
+        from_mask = np.zeros(len(terminal_nodes), dtype=bool)
+        for start, count in zip(line_starts, from_counts):
+            from_mask[start:start + count] = True
+            
+        self.line_ratings_amps = np.array(ratings, dtype=np.float64)
+        self._network_index = {
+            'node_names': node_order,
+            'node_base_volts': np.array(node_base_volts, dtype=np.float64),
+            'operator': sparse.csr_matrix(
+                (values, (rows, cols)), shape=(len(terminal_nodes), ground + 1)
+            ),
+            'terminal_nodes': np.array(terminal_nodes, dtype=np.int64),
+            'line_starts': np.array(line_starts, dtype=np.int64),
+            'from_mask': from_mask,
+            'from_line': line_of_conductor[from_mask],
+            'num_nodes': ground,
+        }
+        logger.info(f"Indexed {len(node_order)} nodes and {len(self.line_names)} lines for bulk extraction")
+        
+    def _get_node_voltages(self):
+        """Return all complex node voltages (V) in node order, plus a trailing 0 V ground slot"""
+        if self._network_index is None:
+            self._build_network_index()
+        
+        v_flat = np.asarray(self.dss.circuit.y_node_varray)
+        if len(v_flat) != 2 * self._network_index['num_nodes']:
+            # Node set changed since the index was built
+            self._build_network_index()
+        voltages = np.zeros(self._network_index['num_nodes'] + 1, dtype=np.complex128)
+        voltages[:-1] = v_flat[0::2] + 1j * v_flat[1::2]
+        return voltages
+        
+    def get_node_voltages_pu(self):
+        """
+        Per-node voltage magnitudes from the last solve.
+        
+        Returns:
+            tuple: (node names such as '632.1', np.ndarray of magnitudes in p.u.)
+        """
+        node_voltages = self._get_node_voltages()
+        index = self._network_index
+        return index['node_names'], np.abs(node_voltages[:-1]) / index['node_base_volts']
+        
+    def _get_line_flows(self, node_voltages):
+        """
+        Per-line sending-end current and power, series losses and loading percent,
+        computed from the full node-voltage vector.
+        """
+        index = self._network_index
+        currents = index['operator'] @ node_voltages
+        powers_kva = node_voltages[index['terminal_nodes']] * np.conj(currents) / 1000
+        
+        starts = index['line_starts']
+        from_mask, from_line = index['from_mask'], index['from_line']
+        
+        current_a = np.zeros(len(starts))
+        np.maximum.at(current_a, from_line, np.abs(currents[from_mask]))
+        power_kw = np.bincount(from_line, powers_kva.real[from_mask], minlength=len(starts))
+        losses_kw = np.add.reduceat(powers_kva.real, starts) if len(starts) else np.zeros(0)
+        
+        with np.errstate(divide='ignore', invalid='ignore'):
+            loading_pct = np.where(self.line_ratings_amps > 0, current_a / self.line_ratings_amps * 100, 0.0)
+        
+        return {
+            'current_a': current_a,
+            'power_kw': power_kw,
+            'losses_kw': losses_kw,
+            'loading_pct': loading_pct,
+        }
+        
+    def set_element_enabled(self, element_name, enabled):
+        """
+        Put an element (e.g. 'Line.650632', 'Capacitor.cap1') in or out of service.
+        The network index is rebuilt on the next solve.
+        """
+        if not USE_OPENDSS:
+            raise RuntimeError("Element outages require the OpenDSS model")
+        self.dss.text(f"{'enable' if enabled else 'disable'} {element_name}")
+        self._network_index = None
+        
+    def get_contingency_elements(self):
+        """Names of all elements that can be taken out for N-1 screening"""
+        if not USE_OPENDSS:
+            return []
+        return (
+            [f"Line.{name}" for name in self.dss.lines.names] +
+            [f"Capacitor.{name}" for name in self.dss.capacitors.names] +
+            [f"Transformer.{name}" for name in self.dss.transformers.names]
+        )
+        
     def _simple_power_flow(self):
         """Simple power flow calculation without OpenDSS"""
         total_load = sum(load['P'] for load in self.loads.values())
@@ -234,7 +497,8 @@ class IEEE13BusSystem:
         results = {
             'voltages': {},
             'powers': {'total_load': net_load, 'total_losses': net_load * 0.03},
-            'losses': net_load * 0.03, 'converged': True
+            'losses': net_load * 0.03, 'converged': True,
+            'lines': {key: np.zeros(0) for key in ('current_a', 'power_kw', 'losses_kw', 'loading_pct')}
         }
         for bus in self.buses:
             results['voltages'][bus] = 1.0 - voltage_drop * ((bus - 650) / 100) if bus != 650 else 1.0
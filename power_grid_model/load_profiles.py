@@ -0,0 +1,146 @@
+# power_grid_model/load_profiles.py - Precomputed (time x bus) base-load profiles
+
+import os
+import json
+import numpy as np
+import pandas as pd
+import logging
+
+logger = logging.getLogger(__name__)
+
+class LoadProfileProvider:
+    """
+    Serves per-step base-load vectors from a (time steps x buses) matrix that is
+    built once per day type and aligned to the simulation time steps.
+
+    The source is chosen from ``config.data_paths['load_profiles']``:
+      - ``<name>.npy`` with a ``<name>.json`` sidecar: a continuous measured series
+        (e.g. a year of smart-meter data), memory-mapped and indexed by timestamp.
+      - ``<name>.csv``: daily profiles with ``minute`` (minute of day), optional
+        ``day_type`` and one kW column per bus id.
+      - Otherwise the synthetic profile from ``SimulationConfig``.
+    """
+
+    def __init__(self, config, bus_ids):
+        """
+        Args:
+            config (SimulationConfig): The main configuration object.
+            bus_ids (list): Bus ids in the column order expected by the grid.
+        """
+        self.config = config
+        self.bus_ids = list(bus_ids)
+        self.profile_path = config.data_paths['load_profiles']
+        self._matrices = {}  # day_type -> (rows, column index or None)
+
+    def get_matrix(self, day_type):
+        """Return the full (time steps x buses) load matrix in kW for a day type."""
+        rows, columns = self._get_rows(day_type)
+        return np.asarray(rows) if columns is None else np.asarray(rows[:, columns])
+
+    def get_step_loads(self, day_type, step_index):
+        """Return the base-load vector (kW per bus) for one simulation step."""
+        rows, columns = self._get_rows(day_type)
+        row = rows[step_index]
+        return row if columns is None else row[columns]
+
+    def _get_rows(self, day_type):
+        if day_type not in self._matrices:
+            self._matrices[day_type] = self._build(day_type)
+        return self._matrices[day_type]
+
+    def _build(self, day_type):
+        time_steps = self.config.get_time_steps()
+        npy_path = os.path.splitext(self.profile_path)[0] + '.npy'
+
+        if os.path.exists(npy_path):
+            logger.info(f"Memory-mapping measured load profiles from {npy_path}")
+            return self._align_measured(npy_path, time_steps)
+
+        time_minutes = np.array([self.config.get_time_step_minutes(ts) for ts in time_steps])
+        if os.path.exists(self.profile_path):
+            logger.info(f"Loading {day_type} load profiles from {self.profile_path}")
+            return self._align_daily_csv(day_type, time_minutes), None
+
+        logger.info(f"No load profile file found, using synthetic {day_type} profile")
+        return self.config.get_load_profile_matrix(self.bus_ids, time_minutes, day_type), None
+
+    def _align_daily_csv(self, day_type, time_minutes):
+        """Sample daily CSV profiles onto the simulation minutes (step-wise hold)."""
+        df = pd.read_csv(self.profile_path)
+        if 'day_type' in df.columns:
+            df = df[df['day_type'] == day_type]
+        df = df.sort_values('minute')
+
+        columns = [str(bus_id) for bus_id in self.bus_ids]
+        missing = [col for col in columns if col not in df.columns]
+        if df.empty or missing:
+            raise ValueError(
+                f"Load profile file {self.profile_path} has no '{day_type}' rows "
+                f"or is missing bus columns: {missing}"
+            )
+
+        idx = np.searchsorted(df['minute'].to_numpy(), time_minutes, side='right') - 1
+        return df[columns].to_numpy(dtype=np.float64)[np.clip(idx, 0, None)]
+
+    def _align_measured(self, npy_path, time_steps):
+        """Select the rows of a measured series that match the simulation time steps."""
+        with open(os.path.splitext(npy_path)[0] + '.json', 'r') as f:
+            meta = json.load(f)
+        source = np.load(npy_path, mmap_mode=self.config.load_profile_params['mmap_mode'])
+
+        start = pd.Timestamp(meta['start_time'])
+        resolution = meta['resolution_minutes']
+        offsets = np.array([(ts - start).total_seconds() / 60 for ts in time_steps]) / resolution
+        rows = np.floor(offsets).astype(np.int64)
+        if rows[0] < 0 or rows[-1] >= source.shape[0]:
+            raise ValueError(f"Simulation period is not covered by measured profiles in {npy_path}")
+
+        # Evenly spaced steps map to a strided view, so nothing is read until used
+        strides = np.diff(rows)
+        if len(rows) > 1 and strides[0] > 0 and np.all(strides == strides[0]):
+            rows = source[rows[0]:rows[-1] + 1:strides[0]]
+        else:
+            rows = source[rows]
+
+        source_buses = [int(bus_id) for bus_id in meta['bus_ids']]
+        if source_buses == self.bus_ids:
+            return rows, None
+        missing = [bus_id for bus_id in self.bus_ids if bus_id not in source_buses]
+        if missing:
+            raise ValueError(f"Measured profiles in {npy_path} are missing buses: {missing}")
+        return rows, np.array([source_buses.index(bus_id) for bus_id in self.bus_ids])
+
+    @staticmethod
+    def convert_measured_csv(csv_path, npy_path, bus_ids, resolution_minutes=1, chunksize=100000):
+        """
+        Convert a large timestamped CSV (``timestamp`` plus one kW column per bus)
+        into the memory-mappable ``.npy``/``.json`` layout, one chunk at a time.
+
+        Returns:
+            str: Path of the written ``.npy`` file.
+        """
+        columns = [str(bus_id) for bus_id in bus_ids]
+
+        # First pass only reads timestamps to size the output file
+        timestamps = pd.read_csv(csv_path, usecols=['timestamp'], parse_dates=['timestamp'])['timestamp']
+        start = timestamps.min()
+        num_rows = int((timestamps.max() - start).total_seconds() // 60 // resolution_minutes) + 1
+        del timestamps
+
+        out = np.lib.format.open_memmap(npy_path, mode='w+', dtype=np.float32, shape=(num_rows, len(columns)))
+        for chunk in pd.read_csv(csv_path, usecols=['timestamp'] + columns,
+                                 parse_dates=['timestamp'], chunksize=chunksize):
+            rows = ((chunk['timestamp'] - start).dt.total_seconds() // 60 // resolution_minutes).to_numpy(np.int64)
+            out[rows] = chunk[columns].to_numpy(dtype=np.float32)
+        out.flush()
+        del out
+
+        with open(os.path.splitext(npy_path)[0] + '.json', 'w') as f:
+            json.dump({
+                'bus_ids': [int(bus_id) for bus_id in bus_ids],
+                'start_time': start.isoformat(),
+                'resolution_minutes': resolution_minutes
+            }, f, indent=2)
+
+        logger.info(f"Converted {csv_path} to {num_rows} x {len(columns)} profile matrix at {npy_path}")
+        return npy_path
@@ -0,0 +1,50 @@
+# tests/conftest.py - Shared fixtures: a small, fast configuration and engine factory
+
+import os
+import sys
+import random
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import SimulationConfig
+from traffic_model.data_loader import TrafficDataLoader
+from traffic_model.main_traffic import TrafficModel
+from power_grid_model.ieee_13_bus_model import IEEE13BusSystem
+from cosimulation.simulation_engine import CoSimulationEngine
+from cosimulation.scenarios import ScenarioManager
+
+@pytest.fixture
+def config(tmp_path):
+    """Six hours at 15-minute steps with a 300-vehicle fleet; all output goes to ``tmp_path``."""
+    config = SimulationConfig()
+    config.output_dir = str(tmp_path / 'output')
+    config.figures_dir = os.path.join(config.output_dir, 'figures')
+    config.results_dir = os.path.join(config.output_dir, 'results')
+    config.logs_dir = os.path.join(config.output_dir, 'logs')
+    config.cache_dir = os.path.join(config.output_dir, 'cache')
+    config.catalog_params['path'] = os.path.join(config.output_dir, 'run_catalog.sqlite')
+    config.data_cache_params['path'] = os.path.join(config.cache_dir, 'traffic_data')
+    config.simulation_params['start_time'] = datetime(2024, 1, 1, 6, 0)
+    config.simulation_params['end_time'] = datetime(2024, 1, 1, 11, 45)
+    config.traffic_params['total_vehicles'] = 300
+    return config
+
+@pytest.fixture
+def build_engine(config):
+    """Factory for an engine over a fresh traffic model and grid, seeded with ``seed``."""
+    def build(seed=0):
+        np.random.seed(seed)
+        random.seed(seed)
+        traffic_model = TrafficModel(config, TrafficDataLoader(config.data_dir, config.get_data_cache_dir()))
+        power_grid = IEEE13BusSystem(config)
+        power_grid.build_network()
+        return CoSimulationEngine(config, traffic_model, power_grid)
+    return build
+
+@pytest.fixture
+def scenarios(config):
+    return ScenarioManager(config)
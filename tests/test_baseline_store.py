@@ -0,0 +1,53 @@
+# tests/test_baseline_store.py - Stored and fast-path baselines
+
+import os
+
+import pandas as pd
+import pytest
+
+from cosimulation.baseline_store import BaselineStore
+
+def test_store_round_trip(tmp_path):
+    store = BaselineStore(str(tmp_path / 'baselines'))
+    key = BaselineStore.make_key(scenario='Weekday Peak', seed=1)
+    assert store.load(key) is None
+    store.save(key, {'summary': {'peak_load': 1.0}})
+    assert store.load(key) == {'summary': {'peak_load': 1.0}}
+    assert os.listdir(tmp_path / 'baselines') == [f'baseline-{key}.pkl']
+
+def test_keys_depend_on_every_component():
+    key = BaselineStore.make_key(scenario='Weekday Peak', seed=1)
+    assert key == BaselineStore.make_key(seed=1, scenario='Weekday Peak')
+    assert key != BaselineStore.make_key(scenario='Weekday Peak', seed=2)
+    assert key != BaselineStore.make_key(scenario='Weekend Peak', seed=1)
+
+def test_unreadable_baseline_is_ignored(tmp_path):
+    store = BaselineStore(str(tmp_path))
+    key = BaselineStore.make_key(scenario='Weekday Peak')
+    store.save(key, {'summary': {}})
+    with open(store._path(key), 'wb') as f:
+        f.write(b'truncated')
+    assert store.load(key) is None
+
+def test_reused_baseline_reports_its_own_runtime(config, build_engine, scenarios):
+    scenario = scenarios.get_scenario('Weekday Peak', 0)
+    first = build_engine(seed=0).run_simulation(scenario)
+    assert first['summary']['reused_baseline'] is False
+
+    reused = build_engine(seed=0).run_simulation(scenario)
+    assert reused['summary']['reused_baseline'] is True
+    assert reused['summary']['runtime_s'] < first['summary']['runtime_s']
+    pd.testing.assert_frame_equal(reused['timeseries'], first['timeseries'])
+
+def test_fast_path_matches_the_full_simulation(config, build_engine, scenarios):
+    config.baseline_params['reuse'] = False
+    scenario = scenarios.get_scenario('Weekday Peak', 0)
+    fast = build_engine(seed=0).run_simulation(scenario)
+    config.baseline_params['fast_path'] = False
+    full = build_engine(seed=0).run_simulation(scenario)
+
+    # Re-solving an unchanged load only moves the answer within the solver's convergence tolerance
+    pd.testing.assert_frame_equal(fast['timeseries'], full['timeseries'], rtol=1e-4)
+    for key in ('peak_load', 'total_losses_kwh', 'voltage_violations', 'reverse_flow_events'):
+        assert fast['summary'][key] == pytest.approx(full['summary'][key], rel=1e-4), key
+    assert fast['summary']['grid_solves'] < full['summary']['grid_solves']
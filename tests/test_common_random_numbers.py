@@ -0,0 +1,66 @@
+# tests/test_common_random_numbers.py - Common random numbers across penetration levels
+
+import numpy as np
+import pandas as pd
+
+from traffic_model.data_loader import TrafficDataLoader
+from traffic_model.main_traffic import TrafficModel
+
+def _traffic_model(config, global_seed):
+    np.random.seed(global_seed)
+    return TrafficModel(config, TrafficDataLoader(config.data_dir, config.get_data_cache_dir()))
+
+def _equipped(traffic_model):
+    return {v['id'] for v in traffic_model.vehicles if v['is_bdwpt_equipped']}
+
+def test_fleet_and_trips_do_not_depend_on_the_global_rng(config):
+    config.crn_params.update(enabled=True, seed=42)
+    first, second = _traffic_model(config, 0), _traffic_model(config, 1)
+    assert first.vehicles == second.vehicles
+    pd.testing.assert_frame_equal(first.get_daily_trip_pattern('weekday'),
+                                  second.get_daily_trip_pattern('weekday'))
+
+def test_streams_leave_the_global_rng_untouched(config):
+    config.crn_params.update(enabled=True, seed=42)
+    traffic_model = _traffic_model(config, 0)
+    state = np.random.get_state()
+    traffic_model.get_daily_trip_pattern('weekend')
+    np.testing.assert_array_equal(np.random.get_state()[1], state[1])
+
+def test_equipped_sets_are_nested_across_penetrations(config):
+    config.crn_params.update(enabled=True, seed=42)
+    traffic_model = _traffic_model(config, 0)
+    sets = {}
+    for penetration in (15, 40, 100):
+        traffic_model.set_bdwpt_penetration(penetration)
+        sets[penetration] = _equipped(traffic_model)
+    assert sets[15] < sets[40] < sets[100]
+    ev_ids = {v['id'] for v in traffic_model.vehicles if v['type'] == 'EV'}
+    assert sets[100] == ev_ids
+    assert len(sets[40]) == int(len(ev_ids) * 0.4)
+
+def test_reset_restores_the_initial_fleet(config):
+    config.crn_params.update(enabled=True, seed=42)
+    traffic_model = _traffic_model(config, 0)
+    initial = [dict(v) for v in traffic_model.vehicles]
+    for vehicle in traffic_model.vehicles:
+        vehicle['current_soc'] = 0.0
+    traffic_model.reset_vehicles()
+    assert traffic_model.vehicles == initial
+
+def test_without_crn_the_fleet_follows_the_global_rng(config):
+    first, second = _traffic_model(config, 0), _traffic_model(config, 1)
+    assert first.initial_vehicles is None
+    assert [v['current_soc'] for v in first.vehicles] != [v['current_soc'] for v in second.vehicles]
+
+def test_each_scenario_starts_from_the_same_fleet(config, build_engine, scenarios):
+    config.crn_params.update(enabled=True, seed=42)
+    scenario = scenarios.get_scenario('Weekday Peak', 40)
+    engine = build_engine(seed=0)
+    engine.run_simulation(scenarios.get_scenario('Weekday Peak', 15))
+    engine._initialize_simulation(scenario)
+    fresh = build_engine(seed=1)
+    fresh._initialize_simulation(scenario)
+
+    assert sorted(engine.bdwpt_agents) == sorted(fresh.bdwpt_agents)
+    assert {i: a.soc for i, a in engine.bdwpt_agents.items()} == {i: a.soc for i, a in fresh.bdwpt_agents.items()}
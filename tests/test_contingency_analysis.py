@@ -0,0 +1,56 @@
+# tests/test_contingency_analysis.py - N-1 screening on recorded injections
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from power_grid_model import ieee_13_bus_model
+from power_grid_model.ieee_13_bus_model import IEEE13BusSystem
+from power_grid_model.load_profiles import LoadProfileProvider
+from power_grid_model.contingency_analysis import (
+    ContingencyAnalyzer, BASE_CASE, VIOLATION_LOSS_OF_SUPPLY, VIOLATION_UNDERVOLTAGE,
+)
+
+pytestmark = pytest.mark.skipif(not ieee_13_bus_model.USE_OPENDSS, reason="requires OpenDSS")
+
+def _recorded_timeseries(config, steps=4):
+    timestamps = config.get_time_steps()[:steps]
+    frame = pd.DataFrame({'timestamp': timestamps})
+    for i, node in enumerate(config.grid_params['bdwpt_nodes']):
+        frame[f'bdwpt_node_{node}_kw'] = np.linspace(0, 40, steps) * (-1) ** i
+    return frame
+
+@pytest.fixture
+def screening(config):
+    config.contingency_params['max_workers'] = 2
+    return ContingencyAnalyzer(config).screen(_recorded_timeseries(config), 'weekday',
+                                              outages=['Line.650632', 'Line.632633'])
+
+def test_base_case_matches_a_direct_solve(config, screening):
+    grid = IEEE13BusSystem(config)
+    grid.build_network()
+    base_loads = LoadProfileProvider(config, grid.load_buses).get_matrix('weekday')
+    timeseries = _recorded_timeseries(config)
+    row = screening['outages'].index(BASE_CASE)
+    for t in range(len(timeseries)):
+        grid.set_base_loads(base_loads[t])
+        for node in config.grid_params['bdwpt_nodes']:
+            grid.update_bdwpt_load(node, timeseries[f'bdwpt_node_{node}_kw'].iat[t])
+        results = grid.solve_power_flow()
+        _, voltages = grid.get_node_voltages_pu()
+        assert screening['min_voltage_pu'][row, t] == pytest.approx(voltages[voltages > 0.1].min())
+        assert screening['max_loading_pct'][row, t] == pytest.approx(results['lines']['loading_pct'].max())
+
+def test_losing_the_feeder_head_is_a_loss_of_supply(screening):
+    assert screening['outages'] == [BASE_CASE, 'Line.650632', 'Line.632633']
+    head = screening['violations'][1]
+    assert ((head & VIOLATION_LOSS_OF_SUPPLY) != 0).all()
+    assert not (screening['violations'][0] & VIOLATION_LOSS_OF_SUPPLY).any()
+
+def test_summary_counts_flagged_steps(screening):
+    summary = ContingencyAnalyzer.summarize(screening)
+    assert list(summary.index) == screening['outages']
+    assert summary.loc['Line.650632', 'loss_of_supply_steps'] == 4
+    expected = ((screening['violations'] & VIOLATION_UNDERVOLTAGE) != 0).sum(axis=1)
+    np.testing.assert_array_equal(summary['undervoltage_steps'].to_numpy(), expected)
+    np.testing.assert_allclose(summary['min_voltage_pu'], screening['min_voltage_pu'].min(axis=1))
@@ -0,0 +1,147 @@
+# tests/test_data_cache.py - Checksummed binary cache of parsed input files
+
+import os
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from traffic_model import data_cache
+from traffic_model.data_cache import DataCache, file_checksum
+from traffic_model.road_network import RoadNetwork
+
+@pytest.fixture(autouse=True)
+def empty_memory_cache(monkeypatch):
+    # Each test starts like a new process
+    monkeypatch.setattr(data_cache, '_MEMORY', {})
+
+class CountingParser:
+    def __init__(self, parse):
+        self.parse = parse
+        self.calls = 0
+
+    def __call__(self, path):
+        self.calls += 1
+        return self.parse(path)
+
+def _csv(tmp_path):
+    path = tmp_path / 'fleet.csv'
+    pd.DataFrame({'type': ['EV', 'ICE', 'EV'], 'count': [3, 5, 7], 'capacity': [60.0, 0.0, 75.5]}).to_csv(
+        path, index=False)
+    return str(path)
+
+def _network_json(tmp_path):
+    path = tmp_path / 'network.json'
+    with open(path, 'w') as f:
+        json.dump({'segments': [
+            {'id': 'a', 'from_node': 1, 'to_node': 2, 'length_km': 1.0, 'type': 'local'},
+            {'id': 'b', 'from_node': 2, 'to_node': 3, 'length_km': 2.5, 'type': 'arterial'},
+        ], 'bdwpt_coverage': [2]}, f)
+    return str(path)
+
+def _restart():
+    data_cache._MEMORY.clear()
+
+def test_parsed_once_per_process_and_once_on_disk(tmp_path):
+    source = _csv(tmp_path)
+    parse = CountingParser(pd.read_csv)
+    cache = DataCache(str(tmp_path / 'cache'))
+
+    first = cache.load(source, parse)
+    assert cache.load(source, parse) is first
+    _restart()
+    warm = DataCache(str(tmp_path / 'cache')).load(source, parse)
+    assert parse.calls == 1
+    pd.testing.assert_frame_equal(warm, pd.read_csv(source))
+
+def test_unchanged_sources_are_not_hashed_again(tmp_path, monkeypatch):
+    source = _csv(tmp_path)
+    cache = DataCache(str(tmp_path / 'cache'))
+    cache.load(source, pd.read_csv)
+    _restart()
+    monkeypatch.setattr(data_cache, 'file_checksum', lambda path: pytest.fail("re-hashed an unchanged source"))
+    cache.load(source, pd.read_csv)
+
+def test_changed_source_is_parsed_again(tmp_path):
+    source = _csv(tmp_path)
+    parse = CountingParser(pd.read_csv)
+    cache = DataCache(str(tmp_path / 'cache'))
+    cache.load(source, parse)
+    with open(source, 'a') as f:
+        f.write('PHEV,9,40.0\n')
+    os.utime(source, ns=(0, os.stat(source).st_mtime_ns + 10**9))
+    assert len(cache.load(source, parse)) == 4
+    assert parse.calls == 2
+
+@pytest.mark.parametrize('damage', ['truncate', 'garbage'])
+def test_corrupted_frame_is_rejected_and_rebuilt(tmp_path, damage):
+    source = _csv(tmp_path)
+    parse = CountingParser(pd.read_csv)
+    cache_dir = tmp_path / 'cache'
+    DataCache(str(cache_dir)).load(source, parse)
+    cached = cache_dir / f"fleet-{file_checksum(source)[:16]}.npz"
+    content = cached.read_bytes()
+    cached.write_bytes(content[:len(content) // 2] if damage == 'truncate' else b'\x00' * len(content))
+
+    _restart()
+    rebuilt = DataCache(str(cache_dir)).load(source, parse)
+    assert parse.calls == 2
+    pd.testing.assert_frame_equal(rebuilt, pd.read_csv(source))
+    _restart()
+    DataCache(str(cache_dir)).load(source, parse)
+    assert parse.calls == 2
+
+def test_corrupted_network_is_rejected_and_rebuilt(tmp_path):
+    source = _network_json(tmp_path)
+    parse = CountingParser(RoadNetwork.from_json)
+    cache_dir = tmp_path / 'cache'
+    DataCache(str(cache_dir)).load(source, parse, RoadNetwork)
+    network_dir = cache_dir / f"network-{file_checksum(source)[:16]}.csr"
+    (network_dir / 'indices.npy').write_bytes(b'\x93NUMPY')
+
+    _restart()
+    network = DataCache(str(cache_dir)).load(source, parse, RoadNetwork)
+    assert parse.calls == 2
+    assert sorted(network.neighbors(2).tolist()) == [1, 3]
+
+def test_corrupted_index_is_rebuilt(tmp_path):
+    source = _csv(tmp_path)
+    cache_dir = tmp_path / 'cache'
+    DataCache(str(cache_dir)).load(source, pd.read_csv)
+    (cache_dir / DataCache.INDEX_FILE).write_text('{"truncated')
+    _restart()
+    DataCache(str(cache_dir)).load(source, pd.read_csv)
+    with open(cache_dir / DataCache.INDEX_FILE) as f:
+        assert os.path.abspath(source) in json.load(f)
+
+def test_objects_without_a_columnar_form_are_pickled(tmp_path):
+    source = tmp_path / 'doc.json'
+    source.write_text(json.dumps({'a': [1, 2]}))
+    parse = CountingParser(lambda path: json.load(open(path)))
+    DataCache(str(tmp_path / 'cache')).load(str(source), parse)
+    _restart()
+    assert DataCache(str(tmp_path / 'cache')).load(str(source), parse) == {'a': [1, 2]}
+    assert parse.calls == 1
+
+def test_mixed_type_columns_keep_their_values(tmp_path):
+    source = tmp_path / 'trips.json'
+    source.write_text('{}')
+    trips = pd.DataFrame({'vehicle_id': [0, 1, 2, 3], 'destination': [632, 'home', 671, 2.5],
+                          'origin': ['home', 'work', None, np.nan]})
+    parse = CountingParser(lambda path: trips.copy())
+    DataCache(str(tmp_path / 'cache')).load(str(source), parse)
+    _restart()
+    cached = DataCache(str(tmp_path / 'cache')).load(str(source), parse)
+    assert parse.calls == 1
+    pd.testing.assert_frame_equal(cached, trips)
+    assert cached['destination'].tolist() == [632, 'home', 671, 2.5]
+
+def test_without_a_directory_only_the_memory_cache_is_used(tmp_path):
+    source = _csv(tmp_path)
+    parse = CountingParser(pd.read_csv)
+    DataCache(None).load(source, parse)
+    DataCache(None).load(source, parse)
+    _restart()
+    DataCache(None).load(source, parse)
+    assert parse.calls == 2
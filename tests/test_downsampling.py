@@ -0,0 +1,58 @@
+# tests/test_downsampling.py - Min-max envelope and LTTB downsampling
+
+import numpy as np
+import pytest
+
+from visualizations.downsampling import downsample, minmax_envelope, lttb
+
+def _series(seed, n):
+    rng = np.random.default_rng(seed)
+    times = np.datetime64('2024-01-01') + np.arange(n) * np.timedelta64(15, 'm')
+    values = np.cumsum(rng.normal(size=n)) if seed % 2 else rng.normal(size=n)
+    return times, values
+
+@pytest.mark.parametrize('method', ['minmax', 'lttb'])
+@pytest.mark.parametrize('seed', range(20))
+def test_global_extremes_are_kept(method, seed):
+    times, values = _series(seed, 5000 + 731 * seed)
+    kept_times, kept_values = downsample(times, values, 300, method)
+    assert len(kept_values) <= 302
+    assert kept_values.max() == values.max()
+    assert kept_values.min() == values.min()
+    assert (np.diff(kept_times) > np.timedelta64(0)).all()
+    # Every kept point is an original sample
+    positions = np.searchsorted(times, kept_times)
+    np.testing.assert_array_equal(values[positions], kept_values)
+
+def test_minmax_keeps_every_bucket_extreme():
+    times, values = _series(1, 1000)
+    kept_times, kept_values = minmax_envelope(times, values, 10)
+    for bucket in np.split(values, 10):
+        assert bucket.min() in kept_values and bucket.max() in kept_values
+
+def test_short_series_are_returned_unchanged():
+    times, values = _series(0, 50)
+    for method in ('minmax', 'lttb'):
+        kept_times, kept_values = downsample(times, values, 100, method)
+        np.testing.assert_array_equal(kept_values, values)
+
+def test_lttb_keeps_the_end_points_and_a_spike():
+    times = np.arange(10_000, dtype=float)
+    values = np.sin(times / 500)
+    values[4321] = 5.0
+    kept_times, kept_values = lttb(times, values, 100)
+    assert kept_times[0] == 0 and kept_times[-1] == 9999
+    assert 4321 in kept_times
+
+def test_missing_samples_do_not_become_extremes():
+    times, values = _series(3, 2000)
+    values[::7] = np.nan
+    for method in ('minmax', 'lttb'):
+        kept_times, kept_values = downsample(times, values, 200, method)
+        assert np.nanmax(kept_values) == np.nanmax(values)
+        assert np.nanmin(kept_values) == np.nanmin(values)
+
+def test_unknown_method_raises():
+    times, values = _series(0, 10)
+    with pytest.raises(ValueError, match="Unknown downsampling method"):
+        downsample(times, values, 5, 'mean')
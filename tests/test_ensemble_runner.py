@@ -0,0 +1,69 @@
+# tests/test_ensemble_runner.py - Replica seeds and KPI confidence intervals
+
+import numpy as np
+import pandas as pd
+import pytest
+from scipy import stats
+
+from cosimulation.ensemble_runner import EnsembleRunner, run_replica_worker
+
+def test_replica_seeds_are_distinct_and_reproducible(config):
+    runner = EnsembleRunner(config)
+    seeds = [runner.get_replica_seed(replica) for replica in range(10)]
+    assert len(set(seeds)) == 10
+    assert seeds == [EnsembleRunner(config).get_replica_seed(replica) for replica in range(10)]
+
+def test_aggregate_matches_student_t_interval(config):
+    runner = EnsembleRunner(config)
+    values = [3.0, 5.0, 4.0, 6.0]
+    replicas = [{'A': {'scenario': 'A', 'peak_reduction_kw': v}} for v in values]
+
+    result = runner.aggregate(replicas)['A']
+    kpi = result['kpis']['peak_reduction_kw']
+    assert result['replicas'] == 4
+    assert 'scenario' not in result['kpis']
+    low, high = stats.t.interval(0.95, 3, loc=np.mean(values), scale=stats.sem(values))
+    assert kpi['mean'] == pytest.approx(4.5)
+    assert kpi['ci_low'] == pytest.approx(low)
+    assert kpi['ci_high'] == pytest.approx(high)
+
+def test_converged_uses_relative_or_absolute_target(config):
+    config.ensemble_params.update(target_relative_half_width=0.05, target_absolute_half_width=0.5)
+    runner = EnsembleRunner(config)
+    def aggregated(mean, half_width):
+        return {'A': {'replicas': 5, 'kpis': {'k': {'mean': mean, 'half_width': half_width}}}}
+    assert runner._converged(aggregated(100.0, 4.0))
+    assert runner._converged(aggregated(0.0, 0.4))
+    assert not runner._converged(aggregated(100.0, 6.0))
+    assert not runner._converged(aggregated(1.0, np.inf))
+
+def test_undefined_or_early_half_widths_are_not_converged(config):
+    config.ensemble_params.update(min_replicas=5, target_absolute_half_width=0.5)
+    runner = EnsembleRunner(config)
+    assert not runner._converged({'A': {'replicas': 5, 'kpis': {'k': {'mean': 1.0, 'half_width': np.nan}}}})
+    assert not runner._converged({'A': {'replicas': 5, 'kpis': {'k': {'mean': np.nan, 'half_width': 0.1}}}})
+    # Identical replicas have a zero half-width, but only count once enough of them ran
+    replicas = [{'A': {'x': 2.0}}] * 3
+    assert not runner._converged(runner.aggregate(replicas))
+    assert runner._converged(runner.aggregate(replicas * 2))
+    config.ensemble_params['min_replicas'] = 1
+    assert not runner._converged(runner.aggregate(replicas[:1]))
+
+def test_replica_worker_is_reproducible(config, scenarios):
+    group = [scenarios.get_scenario('Weekday Peak', 0), scenarios.get_scenario('Weekday Peak', 40)]
+    config.baseline_params['reuse'] = False
+    first = run_replica_worker(config, group, seed=7)
+    second = run_replica_worker(config, group, seed=7)
+    assert list(first) == [scenario['name'] for scenario in group]
+    for name, summary in first.items():
+        for key, value in summary.items():
+            if key != 'runtime_s':
+                assert second[name][key] == pytest.approx(value, nan_ok=True), key
+
+def test_save_writes_one_row_per_scenario_and_kpi(config, tmp_path):
+    runner = EnsembleRunner(config)
+    replicas = [{'A': {'x': 1.0, 'y': 2.0}}, {'A': {'x': 3.0, 'y': 2.0}}]
+    path = runner.save(runner.aggregate(replicas), str(tmp_path / 'ensemble.csv'))
+    saved = pd.read_csv(path)
+    assert sorted(saved['kpi']) == ['x', 'y']
+    assert (saved['replicas'] == 2).all()
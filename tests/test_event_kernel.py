@@ -0,0 +1,53 @@
+# tests/test_event_kernel.py - Discrete-event kernel
+
+import numpy as np
+import pandas as pd
+import pytest
+
+def _run(config, build_engine, scenarios, kernel):
+    config.simulation_params['kernel'] = kernel
+    return build_engine(seed=0).run_simulation(scenarios.get_scenario('Weekday Peak', 40))
+
+def test_outputs_have_the_time_step_format(config, build_engine, scenarios):
+    stepped = _run(config, build_engine, scenarios, 'time_step')
+    event = _run(config, build_engine, scenarios, 'event')
+
+    assert list(event['timeseries'].columns) == list(stepped['timeseries'].columns)
+    pd.testing.assert_series_equal(event['timeseries']['timestamp'], stepped['timeseries']['timestamp'])
+    assert set(event['summary']) == set(stepped['summary'])
+    assert event['summary']['grid_solves'] > 0
+
+def test_runs_are_reproducible(config, build_engine, scenarios):
+    first = _run(config, build_engine, scenarios, 'event')
+    second = _run(config, build_engine, scenarios, 'event')
+    pd.testing.assert_frame_equal(first['timeseries'], second['timeseries'], check_exact=True)
+
+def test_agent_soc_stays_within_bounds(config, build_engine, scenarios):
+    results = _run(config, build_engine, scenarios, 'event')
+    trajectories = results['agent_trajectories']
+    assert trajectories['fleet_size'] > 0
+    assert np.all((trajectories['soc'] >= 0) & (trajectories['soc'] <= 1))
+    charging = results['timeseries']['bdwpt_charging_kw'].to_numpy()
+    assert np.all(charging >= 0)
+
+def _run_on_step_aligned_trips(config, build_engine, scenarios, kernel):
+    config.simulation_params['kernel'] = kernel
+    engine = build_engine(seed=0)
+    step = config.simulation_params['time_step_minutes']
+    trips = engine.traffic_model.get_daily_trip_pattern('weekday').copy()
+    trips['departure_time'] = (trips['departure_time'] / step).round() * step
+    trips['arrival_time'] = np.maximum((trips['arrival_time'] / step).round() * step, trips['departure_time'] + step)
+    engine.traffic_model.daily_trips['weekday'] = trips
+    return engine.run_simulation(scenarios.get_scenario('Weekday Peak', 40))
+
+def test_matches_the_time_step_loop_on_step_aligned_trips(config, build_engine, scenarios):
+    stepped = _run_on_step_aligned_trips(config, build_engine, scenarios, 'time_step')
+    event = _run_on_step_aligned_trips(config, build_engine, scenarios, 'event')
+
+    # Power flow solutions agree to the solver tolerance, agent decisions exactly
+    pd.testing.assert_frame_equal(event['timeseries'], stepped['timeseries'], check_exact=False, rtol=1e-4)
+    assert np.allclose(event['agent_trajectories']['soc'], stepped['agent_trajectories']['soc'], equal_nan=True)
+    for key in ('bdwpt_energy_charged_kwh', 'bdwpt_energy_discharged_kwh'):
+        assert event['summary'][key] == pytest.approx(stepped['summary'][key])
+    assert stepped['summary']['bdwpt_energy_discharged_kwh'] > 0
+    assert event['summary']['grid_solves'] < stepped['summary']['grid_solves']
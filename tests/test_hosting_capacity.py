@@ -0,0 +1,71 @@
+# tests/test_hosting_capacity.py - Hosting-capacity bisection
+
+import pandas as pd
+import pytest
+
+from cosimulation.hosting_capacity import HostingCapacitySolver
+
+@pytest.fixture
+def solver_factory(config, build_engine):
+    def make(thresholds=None, **params):
+        config.hosting_capacity_params.update(params)
+        engine = build_engine(seed=0)
+        solver = HostingCapacitySolver(config, engine.traffic_model, engine.power_grid)
+        if thresholds is not None:
+            # Analytic grid: a constraint is violated from its threshold upwards; the
+            # probe stops at the monitored constraint with the lowest threshold
+            def evaluate(base_name, penetration, constraints):
+                violated = [c for c in constraints if c in thresholds and penetration >= thresholds[c]]
+                return min(violated, key=thresholds.get) if violated else None
+            solver._evaluate = evaluate
+        return solver
+    return make
+
+def test_unknown_constraint_is_rejected(solver_factory):
+    with pytest.raises(ValueError, match="Unknown hosting-capacity constraints"):
+        solver_factory(constraints=['frequency'])
+
+def test_bisection_brackets_every_constraint(solver_factory):
+    solver = solver_factory({'voltage_low': 37.3, 'thermal': 62.0}, tolerance_pct=1.0)
+    result = solver.search('Weekday Peak')
+
+    assert result['limiting_constraint'] == 'voltage_low'
+    assert result['hosting_capacity_pct'] == result['constraints']['voltage_low']['hosting_capacity_pct']
+    for constraint, threshold in (('voltage_low', 37.3), ('thermal', 62.0)):
+        values = result['constraints'][constraint]
+        assert values['hosting_capacity_pct'] < threshold <= values['first_violation_pct']
+        assert values['first_violation_pct'] - values['hosting_capacity_pct'] <= 1.0
+    assert result['constraints']['voltage_high'] == {'hosting_capacity_pct': 100.0, 'first_violation_pct': None}
+    # Two end-point probes plus about log2(100) bisection steps per constraint
+    assert result['runs'] <= 2 + 2 * 7 + 1
+
+def test_capacity_is_the_maximum_when_nothing_is_violated(solver_factory):
+    result = solver_factory({}).search('Weekday Peak')
+    assert result['limiting_constraint'] is None
+    assert result['hosting_capacity_pct'] == 100.0
+    assert result['runs'] == 1
+
+def test_capacity_is_zero_when_violated_without_bdwpt(solver_factory):
+    result = solver_factory({'thermal': 0.0}, constraints=['thermal']).search('Weekday Peak')
+    assert result['hosting_capacity_pct'] == 0.0
+    assert result['constraints']['thermal']['first_violation_pct'] == 0.0
+    assert result['runs'] == 2
+
+def test_probes_are_reproducible(solver_factory):
+    solver = solver_factory()
+    first = solver._evaluate('Weekday Peak', 40.0, ['voltage_low', 'voltage_high', 'thermal'])
+    assert solver._evaluate('Weekday Peak', 40.0, ['voltage_low', 'voltage_high', 'thermal']) == first
+    assert first in (None, 'voltage_low', 'voltage_high', 'thermal')
+
+def test_save_marks_the_limiting_constraint(solver_factory, tmp_path):
+    solver = solver_factory({'voltage_low': 37.3})
+    path = solver.save(solver.run(['Weekday Peak']), str(tmp_path / 'hc.csv'))
+    saved = pd.read_csv(path).set_index('constraint')
+    assert saved['limiting'].to_dict() == {'voltage_low': True, 'voltage_high': False, 'thermal': False}
+
+def test_probe_stops_at_the_first_violation(config, solver_factory):
+    config.grid_params['voltage_tolerance'] = 0.0
+    solver = solver_factory()
+    violated = solver._evaluate('Weekday Peak', 0.0, ['voltage_low', 'voltage_high'])
+    assert violated in ('voltage_low', 'voltage_high')
+    assert solver.engine.violation == {'constraint': violated, 'step': 0}
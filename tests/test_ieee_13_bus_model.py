@@ -0,0 +1,87 @@
+# tests/test_ieee_13_bus_model.py - IEEE 13-bus feeder: circuit cache and per-line flows
+
+import os
+import glob
+
+import numpy as np
+import pytest
+
+from power_grid_model import ieee_13_bus_model
+from power_grid_model.ieee_13_bus_model import IEEE13BusSystem
+
+pytestmark = pytest.mark.skipif(not ieee_13_bus_model.USE_OPENDSS, reason="requires OpenDSS")
+
+def _solve(config, bdwpt_kw=80):
+    grid = IEEE13BusSystem(config)
+    grid.build_network()
+    grid.update_bdwpt_load(675, bdwpt_kw)
+    return grid, grid.solve_power_flow()
+
+def test_restored_snapshot_matches_fresh_compile(config, monkeypatch):
+    restored = []
+    original = IEEE13BusSystem._restore_circuit_snapshot
+    def spy(self, snapshot_dir):
+        restored.append(original(self, snapshot_dir))
+        return restored[-1]
+    monkeypatch.setattr(IEEE13BusSystem, '_restore_circuit_snapshot', spy)
+
+    compiled, compiled_results = _solve(config)
+    assert restored == [False]
+    assert len(glob.glob(os.path.join(config.cache_dir, 'circuit_*', 'index.json'))) == 1
+
+    cached, cached_results = _solve(config)
+    assert restored == [False, True]
+    assert cached.buses == compiled.buses
+    assert cached.loads == compiled.loads
+    assert cached.bdwpt_elements == compiled.bdwpt_elements
+    # Same operating point after a restore as after a fresh compile, so cached runs are reproducible
+    assert cached_results['voltages'] == compiled_results['voltages']
+
+def test_changed_feeder_gets_its_own_snapshot(config):
+    _solve(config)
+    config.grid_params['bdwpt_nodes'] = [632, 675]
+    _solve(config)
+    assert len(glob.glob(os.path.join(config.cache_dir, 'circuit_*'))) == 2
+
+def test_cache_can_be_disabled(config):
+    config.grid_params['use_circuit_cache'] = False
+    _solve(config)
+    assert not glob.glob(os.path.join(config.cache_dir, 'circuit_*'))
+
+def test_line_flows_match_opendss_elements(config):
+    grid, results = _solve(config)
+    lines = results['lines']
+    assert len(grid.line_names) == len(lines['current_a']) > 0
+    for i, name in enumerate(grid.line_names):
+        grid.dss.circuit.set_active_element(f"Line.{name}")
+        element = grid.dss.cktelement
+        conductors = element.num_conductors
+        magnitudes = np.asarray(element.currents_mag_ang)[0::2]
+        active_powers = np.asarray(element.powers)[0::2]
+        assert lines['current_a'][i] == pytest.approx(magnitudes[:conductors].max(), abs=1e-6)
+        assert lines['power_kw'][i] == pytest.approx(active_powers[:conductors].sum(), abs=1e-6)
+        assert lines['losses_kw'][i] == pytest.approx(element.losses[0] / 1000, abs=1e-6)
+
+def test_line_loading_is_current_over_rating(config):
+    grid, results = _solve(config)
+    lines = results['lines']
+    rated = grid.line_ratings_amps > 0
+    np.testing.assert_allclose(lines['loading_pct'][rated],
+                               lines['current_a'][rated] / grid.line_ratings_amps[rated] * 100)
+
+def test_line_flows_follow_a_new_injection(config):
+    grid, before = _solve(config, bdwpt_kw=0)
+    grid.update_bdwpt_load(675, 150)
+    after = grid.solve_power_flow()
+    head = grid.line_names.index('650632')
+    assert after['lines']['power_kw'][head] > before['lines']['power_kw'][head]
+
+def test_rebuilding_drops_the_cached_network_index(config):
+    grid, _ = _solve(config)
+    assert grid._network_index is not None
+    grid.build_network()  # Restored from the snapshot the first build saved
+    assert grid._network_index is None
+    config.grid_params['use_circuit_cache'] = False
+    grid.solve_power_flow()
+    grid.build_network()
+    assert grid._network_index is None
@@ -0,0 +1,62 @@
+# tests/test_instrumentation.py - Per-stage timing, counters and memory
+
+import os
+import json
+import time
+
+import numpy as np
+import pytest
+
+from cosimulation.instrumentation import StageProfiler, HISTOGRAM_EDGES, _NULL_STAGE
+
+def test_disabled_profiler_records_nothing():
+    profiler = StageProfiler(enabled=False)
+    assert profiler.stage('solve') is _NULL_STAGE
+    with profiler.stage('solve'):
+        pass
+    profiler.count('solves')
+    report = profiler.report()
+    assert report['stages'] == {} and report['counters'] == {}
+
+def test_stage_timings_and_histogram():
+    profiler = StageProfiler(enabled=True)
+    for _ in range(3):
+        with profiler.stage('sleep'):
+            time.sleep(0.01)
+    profiler.count('solves', 2)
+    profiler.count('solves')
+
+    report = profiler.report()
+    stage = report['stages']['sleep']
+    assert stage['calls'] == 3
+    assert 0.03 <= stage['total_s'] <= report['wall_time_s']
+    assert stage['min_s'] <= stage['mean_s'] <= stage['max_s']
+    assert sum(stage['histogram']) == 3
+    assert len(stage['histogram']) == len(HISTOGRAM_EDGES) + 1
+    assert report['counters'] == {'solves': 3}
+
+@pytest.mark.skipif(not os.path.exists('/proc/self/statm'), reason="requires procfs")
+def test_rss_is_attributed_to_the_allocating_stage():
+    profiler = StageProfiler(enabled=True)
+    kept = []
+    for _ in range(2):
+        with profiler.stage('allocate'):
+            kept.append(np.ones(8_000_000))  # 64 MB, touched
+        with profiler.stage('idle'):
+            pass
+    stages = profiler.report()['stages']
+    assert stages['allocate']['max_rss_growth_kb'] > 50_000
+    assert stages['allocate']['rss_growth_kb'] > 100_000
+    assert abs(stages['idle']['rss_growth_kb']) < 5_000
+
+def test_engine_writes_a_performance_report(config, build_engine, scenarios):
+    config.instrumentation_params['enabled'] = True
+    build_engine(seed=0).run_simulation(scenarios.get_scenario('Weekday Peak', 40))
+
+    path = os.path.join(config.get_scenario_results_dir('Weekday Peak_40%'), 'performance_report.json')
+    with open(path) as f:
+        report = json.load(f)
+    assert report['scenario'] == 'Weekday Peak_40%'
+    assert report['total_steps'] == len(config.get_time_steps())
+    assert report['stages']['power_flow']['calls'] == len(config.get_time_steps())
+    assert report['peak_rss_kb'] > 0
@@ -0,0 +1,79 @@
+# tests/test_load_profiles.py - Base-load profile matrices
+
+import os
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from power_grid_model.load_profiles import LoadProfileProvider
+
+BUSES = [632, 671, 675]
+
+def test_synthetic_matrix_matches_scalar_profile(config, tmp_path):
+    config.data_paths['load_profiles'] = str(tmp_path / 'missing.csv')
+    provider = LoadProfileProvider(config, BUSES)
+    matrix = provider.get_matrix('weekday')
+
+    time_steps = config.get_time_steps()
+    assert matrix.shape == (len(time_steps), len(BUSES))
+    for step, ts in enumerate(time_steps):
+        minutes = config.get_time_step_minutes(ts)
+        expected = [config.get_load_profile(bus, minutes, 'weekday') for bus in BUSES]
+        np.testing.assert_allclose(matrix[step], expected)
+        np.testing.assert_allclose(provider.get_step_loads('weekday', step), expected)
+
+def test_daily_csv_is_held_stepwise_per_day_type(config, tmp_path):
+    path = tmp_path / 'profiles.csv'
+    rows = []
+    for day_type, offset in (('weekday', 0), ('weekend', 1000)):
+        for minute in (0, 420, 600):
+            rows.append({'minute': minute, 'day_type': day_type,
+                         **{str(bus): offset + minute + bus for bus in BUSES}})
+    pd.DataFrame(rows).to_csv(path, index=False)
+    config.data_paths['load_profiles'] = str(path)
+
+    provider = LoadProfileProvider(config, BUSES)
+    for day_type, offset in (('weekday', 0), ('weekend', 1000)):
+        matrix = provider.get_matrix(day_type)
+        for step, ts in enumerate(config.get_time_steps()):
+            minutes = config.get_time_step_minutes(ts)
+            held = max(m for m in (0, 420, 600) if m <= minutes)
+            np.testing.assert_array_equal(matrix[step], [offset + held + bus for bus in BUSES])
+
+def test_daily_csv_missing_bus_raises(config, tmp_path):
+    path = tmp_path / 'profiles.csv'
+    pd.DataFrame({'minute': [0], '632': [1.0]}).to_csv(path, index=False)
+    config.data_paths['load_profiles'] = str(path)
+    with pytest.raises(ValueError, match='missing bus columns'):
+        LoadProfileProvider(config, BUSES).get_matrix('weekday')
+
+def _write_measured(tmp_path, start, periods, buses):
+    csv_path = tmp_path / 'measured.csv'
+    timestamps = pd.date_range(start, periods=periods, freq='min')
+    values = np.arange(periods * len(buses), dtype=np.float32).reshape(periods, len(buses))
+    frame = pd.DataFrame(values, columns=[str(bus) for bus in buses])
+    frame.insert(0, 'timestamp', timestamps)
+    frame.to_csv(csv_path, index=False)
+    npy_path = LoadProfileProvider.convert_measured_csv(str(csv_path), str(tmp_path / 'measured.npy'),
+                                                       buses, chunksize=100)
+    return frame, npy_path
+
+def test_measured_series_is_aligned_and_reordered(config, tmp_path):
+    source_buses = [675, 632, 671]
+    frame, npy_path = _write_measured(tmp_path, '2024-01-01 00:00', 24 * 60, source_buses)
+    config.data_paths['load_profiles'] = str(tmp_path / 'measured.csv')
+    assert os.path.exists(npy_path)
+
+    matrix = LoadProfileProvider(config, BUSES).get_matrix('weekday')
+    indexed = frame.set_index('timestamp')
+    expected = indexed.loc[config.get_time_steps(), [str(bus) for bus in BUSES]].to_numpy()
+    np.testing.assert_array_equal(matrix, expected)
+
+def test_measured_series_must_cover_the_horizon(config, tmp_path):
+    _write_measured(tmp_path, '2024-01-01 00:00', 6 * 60, BUSES)
+    config.data_paths['load_profiles'] = str(tmp_path / 'measured.csv')
+    config.simulation_params['start_time'] = datetime(2024, 1, 1, 6, 0)
+    with pytest.raises(ValueError, match='not covered'):
+        LoadProfileProvider(config, BUSES).get_matrix('weekday')
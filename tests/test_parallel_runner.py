@@ -0,0 +1,67 @@
+# tests/test_parallel_runner.py - Shared-memory inputs and parallel scenario runs
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from cosimulation.parallel_runner import ParallelScenarioRunner, SharedFrame, run_scenario_worker
+from traffic_model.data_loader import TrafficDataLoader
+from traffic_model.main_traffic import TrafficModel
+
+def test_shared_frame_round_trip():
+    df = pd.DataFrame({
+        'speed': np.arange(5, dtype=float),
+        'count': np.arange(5, dtype=np.int64),
+        'type': ['EV', 'ICE', 'EV', 'EV', 'ICE'],
+    })
+    frame = SharedFrame(df)
+    try:
+        attached = SharedFrame.attach(frame.handle)
+        pd.testing.assert_frame_equal(attached, df, check_dtype=False)
+        assert not attached['speed'].to_numpy().flags.writeable
+    finally:
+        frame.close()
+
+def test_worker_count_is_bounded_by_tasks(config):
+    config.parallel_params['max_workers'] = 8
+    assert ParallelScenarioRunner(config).get_max_workers(2) == 2
+
+def test_parallel_results_equal_serial_ones(config, scenarios):
+    config.parallel_params['max_workers'] = 2
+    np.random.seed(0)
+    traffic_model = TrafficModel(config, TrafficDataLoader(config.data_dir, config.get_data_cache_dir()))
+    selected = [scenarios.get_scenario('Weekday Peak', 0), scenarios.get_scenario('Weekday Peak', 40)]
+    seeds = {scenario['name']: i for i, scenario in enumerate(selected)}
+    runner = ParallelScenarioRunner(config)
+
+    completed = []
+    parallel = runner.run(selected, traffic_model, on_result=lambda s, r: completed.append(s['name']), seeds=seeds)
+    assert list(parallel) == [scenario['name'] for scenario in selected]
+    assert sorted(completed) == sorted(parallel)
+
+    shared = runner.publish_inputs(traffic_model, {'weekday'})
+    try:
+        handles = {key: frame.handle for key, frame in shared.items()}
+        for scenario in selected:
+            serial = run_scenario_worker(config, scenario, handles, seeds[scenario['name']])
+            pd.testing.assert_frame_equal(parallel[scenario['name']]['timeseries'], serial['timeseries'])
+            for key, value in serial['summary'].items():
+                # The serial pass reuses the baselines the parallel pass stored
+                if key not in ('runtime_s', 'reused_baseline'):
+                    assert parallel[scenario['name']]['summary'][key] == pytest.approx(value, nan_ok=True), key
+    finally:
+        for frame in shared.values():
+            frame.close()
+
+def test_a_failing_scenario_does_not_abort_the_others(config, scenarios):
+    config.parallel_params['max_workers'] = 2
+    np.random.seed(0)
+    traffic_model = TrafficModel(config, TrafficDataLoader(config.data_dir, config.get_data_cache_dir()))
+    broken = dict(scenarios.get_scenario('Weekday Peak', 40), name='Broken', bdwpt_penetration=None)
+    selected = [broken, scenarios.get_scenario('Weekday Peak', 15)]
+
+    completed = []
+    results = ParallelScenarioRunner(config).run(selected, traffic_model,
+                                                  on_result=lambda s, r: completed.append(s['name']))
+    assert list(results) == ['Weekday Peak_15%']
+    assert completed == ['Weekday Peak_15%']
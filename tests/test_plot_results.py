@@ -0,0 +1,83 @@
+# tests/test_plot_results.py - Figure rendering and the render manifest
+
+import os
+import json
+
+import pytest
+
+from cosimulation.results_analyzer import ResultsAnalyzer
+from visualizations import plot_results
+from visualizations.plot_results import Visualizer, RENDER_MANIFEST
+
+@pytest.fixture
+def all_results(config, build_engine, scenarios):
+    config.visualization_params['dpi'] = 40
+    return {
+        scenario['name']: build_engine(seed=0).run_simulation(scenario)
+        for scenario in (scenarios.get_scenario('Weekday Peak', penetration) for penetration in (0, 15, 40))
+    }
+
+def _render(config, all_results):
+    return Visualizer(config).render_all(all_results, ResultsAnalyzer(config).calculate_kpis(all_results))
+
+def test_every_figure_is_rendered_once(config, all_results):
+    rendered = _render(config, all_results)
+    assert set(rendered) == {
+        'load_curves_comparison.png', 'voltage_profiles.png', 'kpi_comparison.png', 'bdwpt_power_heatmap.png',
+        'soc_density_heatmap.png', 'agent_soc_profiles.png', 'agent_power_exchange.png',
+    }
+    for file_name in rendered:
+        assert os.path.getsize(os.path.join(config.figures_dir, file_name)) > 0
+    with open(os.path.join(config.figures_dir, RENDER_MANIFEST)) as f:
+        assert set(json.load(f)) == set(rendered)
+
+def test_unchanged_figures_are_skipped_without_building_inputs(config, all_results, monkeypatch):
+    _render(config, all_results)
+    def fail(*args, **kwargs):
+        raise AssertionError("inputs built for an unchanged figure")
+    monkeypatch.setattr(plot_results, 'downsample', fail)
+    monkeypatch.setattr(Visualizer, '_soc_density_inputs', fail)
+    assert _render(config, all_results) == []
+
+def test_changed_or_missing_figures_are_rendered_again(config, all_results):
+    _render(config, all_results)
+    os.remove(os.path.join(config.figures_dir, 'kpi_comparison.png'))
+    all_results['Weekday Peak_0%']['timeseries'].loc[3, 'total_load_kw'] += 1.0
+    # Only the figure that plots the changed column is stale, besides the missing one
+    assert set(_render(config, all_results)) == {'load_curves_comparison.png', 'kpi_comparison.png'}
+
+def test_figures_are_keyed_to_the_plotted_data_not_the_summary(config, all_results):
+    _render(config, all_results)
+    all_results['Weekday Peak_40%']['summary']['num_agents'] = -1
+    all_results['Weekday Peak_40%']['agent_trajectories']['soc_histogram'][0, 0] += 1
+    assert _render(config, all_results) == ['soc_density_heatmap.png']
+
+def test_editing_a_render_function_invalidates_its_figure(config, all_results, monkeypatch):
+    _render(config, all_results)
+    render = plot_results._render_voltage_profiles
+    monkeypatch.setattr(plot_results, '_render_voltage_profiles', lambda inputs, path, dpi: render(inputs, path, dpi))
+    assert _render(config, all_results) == ['voltage_profiles.png']
+
+def test_streamed_runs_are_skipped_when_unchanged(config, build_engine, scenarios, all_results):
+    config.output_params.update(streaming=True, chunk_size_steps=7, format='npz')
+    streamed = dict(all_results)
+    streamed['Weekday Peak_15%'] = build_engine(seed=0).run_simulation(scenarios.get_scenario('Weekday Peak', 15))
+    assert streamed['Weekday Peak_15%']['timeseries'] is None
+    _render(config, streamed)
+
+    # Same data, streamed by another run to another directory
+    streamed['Weekday Peak_15%'] = build_engine(seed=0).run_simulation(scenarios.get_scenario('Weekday Peak', 15))
+    assert _render(config, streamed) == []
+    # The streamed data checksums like the in-memory timeseries
+    assert _render(config, all_results) == []
+
+def test_timing_fields_do_not_invalidate_figures(config, all_results):
+    _render(config, all_results)
+    for results in all_results.values():
+        results['summary'].update(runtime_s=123.0, reused_baseline=True)
+    assert _render(config, all_results) == []
+
+def test_skip_unchanged_can_be_disabled(config, all_results):
+    first = _render(config, all_results)
+    config.visualization_params['skip_unchanged'] = False
+    assert sorted(_render(config, all_results)) == sorted(first)
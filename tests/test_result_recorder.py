@@ -0,0 +1,99 @@
+# tests/test_result_recorder.py - Preallocated columnar step results and running summaries
+
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from cosimulation.result_recorder import ResultRecorder, AGENT_MODES
+from cosimulation.result_writer import ChunkedResultWriter, read_manifest, read_timeseries
+
+BUSES = [632, 671, 675]
+NODES = [632, 675]
+LINES = ['650632', '632671']
+START = datetime(2024, 1, 1)
+
+def _step(rng):
+    """Power-flow results, BDWPT powers and mode counts of one synthetic step."""
+    pf_results = {
+        'converged': True,
+        'powers': {'total_load': rng.uniform(-50, 500), 'total_losses': rng.uniform(0, 10)},
+        'voltages': {bus: rng.uniform(0.93, 1.07) for bus in BUSES},
+        'lines': {key: rng.uniform(0, 120, len(LINES))
+                  for key in ('current_a', 'power_kw', 'losses_kw', 'loading_pct')},
+    }
+    bdwpt_powers = {node: rng.uniform(-60, 60) for node in NODES}
+    mode_counts = {mode: int(rng.integers(0, 10)) for mode in AGENT_MODES}
+    return pf_results, bdwpt_powers, mode_counts
+
+def _record(recorder, steps, seed=0):
+    rng = np.random.default_rng(seed)
+    recorded = []
+    for t in range(steps):
+        step = _step(rng)
+        recorder.record(t, START + timedelta(minutes=15 * t), *step)
+        recorded.append(step)
+    recorder.finish()
+    recorder.line_names = LINES
+    return recorded
+
+def test_dataframe_holds_every_recorded_value():
+    recorder = ResultRecorder(10, BUSES, NODES)
+    recorded = _record(recorder, 10)
+    df = recorder.to_dataframe(LINES)
+
+    assert len(df) == 10
+    assert df['timestamp'].iloc[3] == pd.Timestamp(START + timedelta(minutes=45))
+    for t, (pf_results, bdwpt_powers, mode_counts) in enumerate(recorded):
+        row = df.iloc[t]
+        assert row['total_load_kw'] == pf_results['powers']['total_load']
+        assert row['total_bdwpt_kw'] == pytest.approx(sum(bdwpt_powers.values()))
+        assert row['bdwpt_charging_kw'] == pytest.approx(sum(p for p in bdwpt_powers.values() if p > 0))
+        assert row['bdwpt_discharging_kw'] == pytest.approx(-sum(p for p in bdwpt_powers.values() if p < 0))
+        for bus in BUSES:
+            assert row[f'voltage_bus_{bus}'] == pf_results['voltages'][bus]
+        for mode in AGENT_MODES:
+            assert row[f'vehicles_{mode}'] == mode_counts[mode]
+        for j, name in enumerate(LINES):
+            assert row[f'loading_line_{name}_pct'] == pf_results['lines']['loading_pct'][j]
+
+def test_matrix_columns_are_contiguous_views():
+    recorder = ResultRecorder(10, BUSES, NODES)
+    _record(recorder, 10)
+    assert recorder.voltages[:, 1].flags['C_CONTIGUOUS']
+    assert recorder.bdwpt_node_kw[:, 0].flags['C_CONTIGUOUS']
+    assert np.shares_memory(recorder.to_dataframe()['voltage_bus_671'].to_numpy(), recorder.voltages)
+
+def test_summary_matches_the_recorded_frame():
+    recorder = ResultRecorder(24, BUSES, NODES, voltage_limits=(0.95, 1.05), max_loading_percent=80)
+    _record(recorder, 24)
+    df = recorder.to_dataframe(LINES)
+    summary = recorder.summary.result(hours_per_step=0.25)
+
+    voltages = df[[f'voltage_bus_{bus}' for bus in BUSES]].to_numpy()
+    loading = recorder.line_flows['loading_pct']
+    assert summary['peak_load'] == df['total_load_kw'].max()
+    assert summary['min_load'] == df['total_load_kw'].min()
+    assert summary['avg_load'] == pytest.approx(df['total_load_kw'].mean())
+    assert summary['total_losses_kwh'] == pytest.approx(df['total_losses_kw'].sum() * 0.25)
+    assert summary['bdwpt_energy_charged_kwh'] == pytest.approx(df['bdwpt_charging_kw'].sum() * 0.25)
+    assert summary['min_voltage'] == voltages.min()
+    assert summary['voltage_violations'] == int(((voltages < 0.95) | (voltages > 1.05)).sum())
+    assert summary['reverse_flow_events'] == int((df['net_load'] < 0).sum())
+    assert summary['max_line_loading_pct'] == loading.max()
+    assert summary['thermal_violations'] == int((loading > 80).sum())
+
+def test_streamed_chunks_match_the_in_memory_run(tmp_path):
+    in_memory = ResultRecorder(23, BUSES, NODES)
+    _record(in_memory, 23)
+
+    writer = ChunkedResultWriter(str(tmp_path / 'timeseries'), fmt='npz')
+    streamed = ResultRecorder(23, BUSES, NODES, writer=writer, chunk_size=5)
+    streamed.line_names = LINES
+    _record(streamed, 23)
+
+    assert [part['rows'] for part in read_manifest(writer.output_dir)['parts']] == [5, 5, 5, 5, 3]
+    pd.testing.assert_frame_equal(read_timeseries(writer.output_dir), in_memory.to_dataframe(LINES),
+                                  check_dtype=False)
+    assert streamed.summary.result(0.25) == pytest.approx(in_memory.summary.result(0.25))
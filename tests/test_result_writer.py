@@ -0,0 +1,49 @@
+# tests/test_result_writer.py - Chunked on-disk timeseries
+
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from cosimulation.result_writer import ChunkedResultWriter, read_manifest, read_timeseries, iter_timeseries_chunks
+
+def _chunk(start, rows):
+    return pd.DataFrame({'step': np.arange(start, start + rows), 'load_kw': np.arange(start, start + rows) * 1.5})
+
+def test_parts_are_read_back_in_order(tmp_path):
+    writer = ChunkedResultWriter(str(tmp_path), fmt='npz')
+    for start in (0, 4, 8):
+        writer.write_chunk(_chunk(start, 4))
+    writer.close()
+
+    manifest = read_manifest(str(tmp_path))
+    assert manifest['rows_written'] == 12
+    assert [part['file'] for part in manifest['parts']] == ['part-00000.npz', 'part-00001.npz', 'part-00002.npz']
+    pd.testing.assert_frame_equal(read_timeseries(str(tmp_path)), _chunk(0, 12))
+    assert [len(df.columns) for df in iter_timeseries_chunks(str(tmp_path), columns=['load_kw'])] == [1, 1, 1]
+
+def test_a_new_writer_removes_old_parts(tmp_path):
+    writer = ChunkedResultWriter(str(tmp_path), fmt='npz')
+    writer.write_chunk(_chunk(0, 4))
+    writer.write_chunk(_chunk(4, 4))
+
+    ChunkedResultWriter(str(tmp_path), fmt='npz')
+    assert not [name for name in os.listdir(tmp_path) if name.startswith('part-')]
+    assert read_timeseries(str(tmp_path)).empty
+
+def test_resume_keeps_checkpointed_parts_only(tmp_path):
+    writer = ChunkedResultWriter(str(tmp_path), fmt='npz')
+    writer.write_chunk(_chunk(0, 4))
+    checkpointed = list(writer.parts)
+    writer.write_chunk(_chunk(4, 4))  # Written after the checkpoint, lost on resume
+
+    resumed = ChunkedResultWriter(str(tmp_path), fmt='npz', resume_parts=checkpointed)
+    resumed.write_chunk(_chunk(4, 2))
+    assert sorted(name for name in os.listdir(tmp_path) if name.startswith('part-')) == \
+        ['part-00000.npz', 'part-00001.npz']
+    pd.testing.assert_frame_equal(read_timeseries(str(tmp_path)), _chunk(0, 6))
+
+def test_unknown_format_is_rejected(tmp_path):
+    with pytest.raises(ValueError, match='Unsupported result format'):
+        ChunkedResultWriter(str(tmp_path), fmt='csv')
@@ -0,0 +1,85 @@
+# tests/test_results_analyzer.py - Timeseries KPIs and baseline matching
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from cosimulation.result_writer import ChunkedResultWriter
+from cosimulation.results_analyzer import ResultsAnalyzer, _longest_run
+
+def _brute_force_longest(flags):
+    longest = current = 0
+    for flag in flags:
+        current = current + 1 if flag else 0
+        longest = max(longest, current)
+    return longest
+
+def test_longest_run_is_carried_across_chunks():
+    rng = np.random.default_rng(0)
+    for _ in range(200):
+        flags = rng.random(rng.integers(1, 60)) < rng.random()
+        cuts = np.sort(rng.choice(np.arange(1, len(flags)), size=min(3, len(flags) - 1), replace=False))
+        longest = current = 0
+        for chunk in np.split(flags, cuts):
+            longest, current = _longest_run(chunk, longest, current)
+        assert longest == _brute_force_longest(flags)
+
+def _timeseries():
+    # 8 steps of 15 minutes: bus 1 is low at steps 1-3 and 6, line 1 is overloaded at steps 2 and 7
+    return pd.DataFrame({
+        'total_load_kw': [100.0, 110.0, 120.0, 130.0, 140.0, 150.0, 160.0, 170.0],
+        'converged': [True, True, True, False, True, True, False, True],
+        'voltage_bus_1': [1.0, 0.94, 0.93, 0.94, 1.0, 1.0, 0.9, 1.0],
+        'voltage_bus_2': [1.0, 1.0, 1.0, 1.0, 1.0, 1.0, 1.0, 1.0],
+        'loading_line_1': [50.0, 60.0, 90.0, 70.0, 50.0, 50.0, 50.0, 85.0],
+        'bdwpt_kw_bus_1': np.zeros(8),
+    })
+
+def test_timeseries_kpis(config):
+    kpis = ResultsAnalyzer(config).calculate_timeseries_kpis({'timeseries': _timeseries()})
+    assert kpis == pytest.approx({
+        'voltage_violation_hours': 4 * 0.25,
+        'longest_violation_hours': 3 * 0.25,
+        'thermal_overload_hours': 2 * 0.25,
+        'energy_not_served_kwh': (130.0 + 160.0) * 0.25,
+    })
+
+def test_streamed_timeseries_gives_the_same_kpis(config, tmp_path):
+    df = _timeseries()
+    writer = ChunkedResultWriter(str(tmp_path), fmt='npz')
+    for start in (0, 3, 6):
+        writer.write_chunk(df.iloc[start:start + 3].reset_index(drop=True))
+    writer.close()
+
+    analyzer = ResultsAnalyzer(config)
+    streamed = analyzer.calculate_timeseries_kpis({'timeseries': None, 'timeseries_path': str(tmp_path)})
+    assert streamed == pytest.approx(analyzer.calculate_timeseries_kpis({'timeseries': df}))
+
+def test_results_without_timeseries_have_no_timeseries_kpis(config):
+    assert ResultsAnalyzer(config).calculate_timeseries_kpis({'summary': {}}) == {}
+
+def _summary(base_name, penetration, peak_load):
+    return {
+        'base_name': base_name,
+        'bdwpt_penetration': penetration,
+        'peak_load': peak_load,
+        'voltage_violations': 10 - penetration // 10,
+        'total_losses_kwh': 50.0 - penetration / 10,
+        'reverse_flow_events': 0,
+        'bdwpt_energy_discharged_kwh': 0.0,
+        'bdwpt_energy_charged_kwh': 0.0,
+    }
+
+def test_baselines_are_matched_by_base_name(config):
+    # Names that do not follow the '<base>_<n>%' pattern still find their baseline
+    results = {
+        'custom baseline': {'summary': _summary('Weekday Peak', 0, 200.0)},
+        'custom 40': {'summary': _summary('Weekday Peak', 40, 150.0)},
+        'other 40': {'summary': _summary('Weekend Peak', 40, 150.0)},
+    }
+    kpis = ResultsAnalyzer(config).calculate_kpis(results)
+    assert set(kpis) == {'custom baseline', 'custom 40'}
+    assert kpis['custom 40']['peak_reduction_kw'] == 50.0
+    assert kpis['custom 40']['peak_reduction_pct'] == 25.0
+    assert kpis['custom 40']['voltage_improvement'] == 4
+    assert kpis['custom baseline']['reused_baseline'] is False
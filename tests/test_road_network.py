@@ -0,0 +1,89 @@
+# tests/test_road_network.py - CSR road network, its directory format and converters
+
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from traffic_model.data_loader import TrafficDataLoader
+from traffic_model.road_network import RoadNetwork, convert_road_network
+
+def _random_network(seed=0, num_segments=200):
+    rng = np.random.default_rng(seed)
+    from_nodes = rng.integers(0, 60, num_segments) * 10
+    to_nodes = rng.integers(0, 60, num_segments) * 10
+    types = rng.choice(['local', 'collector', 'arterial'], num_segments)
+    network = RoadNetwork.from_segments(from_nodes, to_nodes, rng.random(num_segments), np.full(num_segments, np.nan),
+                                        types, [f's{i}' for i in range(num_segments)], bdwpt_coverage=[10, 20])
+    return network, from_nodes, to_nodes, types
+
+def test_csr_adjacency_matches_the_segment_list():
+    network, from_nodes, to_nodes, types = _random_network()
+    for node in network.node_ids:
+        expected = sorted(np.concatenate([to_nodes[from_nodes == node], from_nodes[to_nodes == node]]).tolist())
+        assert sorted(network.neighbors(node).tolist()) == expected
+        segments = network.outgoing_segments(node)
+        assert sorted(network.node_ids[np.where(network.from_index[segments] == network.node_index(node),
+                                                network.to_index[segments], network.from_index[segments])].tolist()) \
+            == expected
+    assert network.num_segments == 200
+    assert (np.diff(network.node_ids) > 0).all()
+    assert [network.type_names[code] for code in network.type_codes] == types.tolist()
+
+def test_unknown_nodes_have_no_links():
+    network = _random_network()[0]
+    assert network.node_index(5) == -1
+    assert network.node_index(10**6) == -1
+    assert len(network.neighbors(5)) == 0 and len(network.outgoing_segments(5)) == 0
+
+def test_saved_network_is_memory_mapped(tmp_path):
+    network = _random_network()[0]
+    directory = str(tmp_path / 'network.csr')
+    network.save(directory)
+    network.save(directory)  # Replaces the existing directory
+    loaded = RoadNetwork.load(directory)
+
+    assert isinstance(loaded.indices, np.memmap)
+    assert loaded.type_names == network.type_names
+    for name in RoadNetwork.ARRAYS:
+        np.testing.assert_array_equal(getattr(loaded, name), getattr(network, name))
+    assert not isinstance(RoadNetwork.load(directory, mmap_mode=None).indices, np.memmap)
+    assert sorted(p.name for p in tmp_path.iterdir()) == ['network.csr']
+
+def test_edge_list_is_read_as_directed_links(tmp_path):
+    path = tmp_path / 'edges.csv'
+    pd.DataFrame({
+        'u': [1, 2, 2, 3],
+        'v': [2, 1, 3, 1],
+        'key': [0, 0, 0, 1],
+        'osmid': [11, 11, 12, 13],
+        'length': [1500.0, 1500.0, 250.0, 800.0],
+        'highway': ['primary', 'primary', "['residential', 'tertiary']", 'motorway_link'],
+    }).to_csv(path, index=False)
+
+    network = RoadNetwork.from_edge_list(str(path), bdwpt_coverage=[2], chunksize=3)
+    assert network.neighbors(1).tolist() == [2]
+    assert sorted(network.neighbors(2).tolist()) == [1, 3]
+    assert network.neighbors(3).tolist() == [1]
+    np.testing.assert_allclose(network.length_km, [1.5, 1.5, 0.25, 0.8])
+    assert [network.type_names[c] for c in network.type_codes] == ['arterial', 'arterial', 'local', 'local']
+    assert network.segment_ids.tolist() == ['1_2_0', '2_1_0', '2_3_0', '3_1_1']
+    assert network.bdwpt_coverage.tolist() == [2]
+
+def test_json_conversion_and_loader_directory(tmp_path):
+    source = tmp_path / 'roads.json'
+    source.write_text(json.dumps({
+        'segments': [{'id': 'a', 'from_node': 1, 'to_node': 2, 'length_km': 1.0, 'type': 'local',
+                      'capacity_veh_per_hour': 900}],
+        'nodes': [1, 2, 7],
+        'bdwpt_coverage': [2],
+    }))
+    convert_road_network(str(source), str(tmp_path / 'roads.csr'))
+
+    network = TrafficDataLoader(str(tmp_path)).load_road_network('roads.csr')
+    assert isinstance(network.node_ids, np.memmap)
+    assert network.node_ids.tolist() == [1, 2, 7]
+    assert network.destination_nodes.tolist() == [1, 2, 7]
+    assert network.neighbors(2).tolist() == [1]
+    assert network.capacity_veh_per_hour.tolist() == [900.0]
@@ -0,0 +1,66 @@
+# tests/test_run_catalog.py - Run index and per-run timeseries directories
+
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from cosimulation.result_writer import read_timeseries
+from cosimulation.run_catalog import RunCatalog, open_catalog
+
+def _record(catalog, scenarios, penetration, min_voltage, **kwargs):
+    summary = {'peak_load': np.float64(200.0), 'min_voltage': min_voltage, 'max_voltage': np.nan,
+               'grid_solves': np.int64(24), 'runtime_s': 1.5, 'reused_baseline': False}
+    return catalog.record(scenarios.get_scenario('Weekday Peak', penetration), summary, **kwargs)
+
+def test_record_and_query(tmp_path, scenarios):
+    catalog = RunCatalog(str(tmp_path / 'catalog.sqlite'))
+    first = _record(catalog, scenarios, 40, 0.94, seed=np.int64(7), config_hash='abc', extra={'design_point': 3})
+    _record(catalog, scenarios, 40, 0.97)
+    _record(catalog, scenarios, 15, 0.93)
+
+    rows = catalog.query("bdwpt_penetration = ? AND day_type = ? AND min_voltage < ?", (40, 'weekday', 0.95))
+    assert rows['run_id'].tolist() == [first]
+    row = rows.iloc[0]
+    assert row['scenario'] == 'Weekday Peak_40%'
+    assert row['seed'] == 7 and row['config_hash'] == 'abc' and row['runtime_s'] == 1.5
+    assert row['grid_solves'] == 24
+    assert pd.isna(row['max_voltage'])
+    assert json.loads(row['extra']) == {'design_point': 3, 'reused_baseline': False}
+    catalog.close()
+
+    reopened = RunCatalog(str(tmp_path / 'catalog.sqlite'))
+    assert len(reopened.query()) == 3
+
+def test_penetration_query_uses_its_index(tmp_path):
+    catalog = RunCatalog(str(tmp_path / 'catalog.sqlite'))
+    plan = catalog.conn.execute(
+        "EXPLAIN QUERY PLAN SELECT * FROM runs WHERE bdwpt_penetration = ? AND day_type = ? AND min_voltage < ?",
+        (40, 'weekday', 0.95)).fetchall()
+    assert any('idx_runs_penetration' in step[-1] for step in plan)
+
+def test_catalog_can_be_disabled(config):
+    config.catalog_params['enabled'] = False
+    assert open_catalog(config) is None
+
+def test_streamed_runs_keep_their_own_timeseries(config, build_engine, scenarios):
+    config.output_params.update(streaming=True, format='npz')
+    scenario = scenarios.get_scenario('Weekday Peak', 40)
+    first = build_engine(seed=0).run_simulation(scenario)
+    second = build_engine(seed=1).run_simulation(scenario)
+
+    assert first['timeseries_path'] != second['timeseries_path']
+    assert read_timeseries(first['timeseries_path'])['total_load_kw'].tolist() != \
+        read_timeseries(second['timeseries_path'])['total_load_kw'].tolist()
+
+def test_config_hash_ignores_operational_settings(config):
+    fingerprint = config.get_fingerprint()
+    config.checkpoint_params.update(enabled=True, interval_steps=5)
+    config.parallel_params['enabled'] = True
+    config.output_params['streaming'] = True
+    config.instrumentation_params['enabled'] = True
+    assert config.get_fingerprint() == fingerprint
+
+    config.bdwpt_params['efficiency'] = 0.5
+    assert config.get_fingerprint() != fingerprint
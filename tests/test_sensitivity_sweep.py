@@ -0,0 +1,90 @@
+# tests/test_sensitivity_sweep.py - Sobol and Morris estimators on analytic functions
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from cosimulation.sensitivity_sweep import SensitivitySweep
+
+PARAMETERS = {
+    'control_params.soc_min_v2g': (0.2, 0.5),
+    'bdwpt_params.charging_power_kw': (20.0, 50.0),
+    'bdwpt_params.efficiency': (0.8, 0.95),
+}
+
+@pytest.fixture
+def sweep_config(config):
+    config.sensitivity_params.update(parameters=dict(PARAMETERS), seed=1)
+    return config
+
+def _linear(points):
+    # Variance shares of the three inputs: 16/20, 4/20 and 0
+    return 4 * points[:, 0] + 2 * points[:, 1] + 0 * points[:, 2]
+
+def test_unknown_parameter_is_rejected(config):
+    config.sensitivity_params['parameters'] = {'traffic_params.total_vehicles': (100, 200)}
+    with pytest.raises(ValueError, match="Cannot sweep"):
+        SensitivitySweep(config)
+
+@pytest.mark.parametrize('sampler', ['sobol', 'lhs'])
+def test_sobol_indices_of_a_linear_function(sweep_config, sampler):
+    sweep_config.sensitivity_params.update(method='sobol', sampler=sampler, num_samples=4096)
+    sweep = SensitivitySweep(sweep_config)
+    points = sweep.generate_design()
+    assert points.shape == (4096 * 5, 3)
+
+    indices = sweep.compute_indices(points, pd.DataFrame({'y': _linear(points)})).set_index('parameter')
+    expected = [0.8, 0.2, 0.0]
+    np.testing.assert_allclose(indices['S1'], expected, atol=0.05)
+    np.testing.assert_allclose(indices['ST'], expected, atol=0.05)
+
+def test_sobol_total_index_captures_interactions(sweep_config):
+    sweep_config.sensitivity_params.update(method='sobol', num_samples=4096)
+    sweep = SensitivitySweep(sweep_config)
+    points = sweep.generate_design()
+    # A pure interaction: no first-order effect, all variance in the total indices
+    y = (points[:, 0] - 0.5) * (points[:, 1] - 0.5)
+    indices = sweep.compute_indices(points, pd.DataFrame({'y': y})).set_index('parameter')
+    np.testing.assert_allclose(indices['S1'], [0, 0, 0], atol=0.05)
+    np.testing.assert_allclose(indices['ST'], [1, 1, 0], atol=0.1)
+
+def test_morris_effects_of_a_linear_function(sweep_config):
+    sweep_config.sensitivity_params.update(method='morris', num_samples=10, morris_levels=4)
+    sweep = SensitivitySweep(sweep_config)
+    points = sweep.generate_design()
+    assert points.shape == (10 * 4, 3)
+    assert ((points >= 0) & (points <= 1)).all()
+
+    indices = sweep.compute_indices(points, pd.DataFrame({'y': _linear(points)})).set_index('parameter')
+    np.testing.assert_allclose(indices['mu'], [4, 2, 0], atol=1e-9)
+    np.testing.assert_allclose(indices['mu_star'], [4, 2, 0], atol=1e-9)
+    np.testing.assert_allclose(indices['sigma'], [0, 0, 0], atol=1e-9)
+
+def test_scale_maps_onto_parameter_ranges(sweep_config):
+    sweep = SensitivitySweep(sweep_config)
+    scaled = sweep.scale(np.array([[0.0, 0.5, 1.0]]))
+    np.testing.assert_allclose(scaled, [[0.2, 35.0, 0.95]])
+
+def test_task_config_applies_one_design_point(sweep_config):
+    sweep = SensitivitySweep(sweep_config)
+    task_config = sweep._task_config(np.array([0.3, 40.0, 0.9]))
+    assert task_config.control_params['soc_min_v2g'] == 0.3
+    assert task_config.bdwpt_params['charging_power_kw'] == 40.0
+    assert sweep_config.bdwpt_params['charging_power_kw'] != 40.0
+    assert task_config.get_fingerprint() != sweep_config.get_fingerprint()
+
+def test_run_returns_design_kpis_and_indices(config):
+    from traffic_model.data_loader import TrafficDataLoader
+    from traffic_model.main_traffic import TrafficModel
+
+    config.sensitivity_params.update(parameters={'bdwpt_params.efficiency': (0.8, 0.95)},
+                                     method='morris', num_samples=1, scenarios=[('Weekday Peak', 40)])
+    config.parallel_params['max_workers'] = 2
+    np.random.seed(0)
+    traffic_model = TrafficModel(config, TrafficDataLoader(config.data_dir, config.get_data_cache_dir()))
+    design, indices = SensitivitySweep(config).run(traffic_model)
+
+    assert len(design) == 2
+    assert 'Weekday Peak_40%:peak_reduction_kw' in design.columns
+    assert set(indices['parameter']) == {'bdwpt_params.efficiency'}
+    assert set(indices['kpi']) == set(design.columns[1:])
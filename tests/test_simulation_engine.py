@@ -0,0 +1,36 @@
+# tests/test_simulation_engine.py - Co-simulation engine scheduling and run modes
+
+import numpy as np
+import pytest
+
+def _run(build_engine, scenarios, penetration=40):
+    return build_engine(seed=0).run_simulation(scenarios.get_scenario('Weekday Peak', penetration))
+
+def test_lockstep_solves_the_grid_every_step(config, build_engine, scenarios):
+    results = _run(build_engine, scenarios)
+    assert results['summary']['grid_solves'] == len(config.get_time_steps())
+
+def test_grid_results_are_held_between_clock_driven_solves(config, build_engine, scenarios):
+    config.multirate_params.update(grid_solve_interval_steps=4, injection_threshold_kw=None)
+    results = _run(build_engine, scenarios)
+    steps = len(config.get_time_steps())
+    assert results['summary']['grid_solves'] == -(-steps // 4)
+
+    load = results['timeseries']['total_load_kw'].to_numpy()
+    for start in range(0, steps, 4):
+        np.testing.assert_array_equal(load[start:start + 4], load[start])
+
+def test_injection_changes_trigger_extra_solves(config, build_engine, scenarios):
+    threshold = 5.0
+    config.multirate_params.update(grid_solve_interval_steps=1000, injection_threshold_kw=threshold)
+    results = _run(build_engine, scenarios)
+
+    # Replay the trigger on the recorded injections
+    nodes = config.grid_params['bdwpt_nodes']
+    injections = results['timeseries'][[f'bdwpt_node_{node}_kw' for node in nodes]].to_numpy()
+    expected, solved = 1, injections[0]
+    for powers in injections[1:]:
+        if np.abs(powers - solved).sum() > threshold:
+            expected, solved = expected + 1, powers
+    assert results['summary']['grid_solves'] == expected
+    assert 1 < expected < len(injections)
@@ -0,0 +1,56 @@
+# tests/test_soc_density.py - Fleet SoC histogram and the density plot
+
+import os
+from datetime import datetime, timedelta
+
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.dates as mdates
+import matplotlib.pyplot as plt
+import numpy as np
+
+from cosimulation.trajectory_recorder import TrajectoryRecorder
+from visualizations import plot_results
+
+def test_histogram_counts_every_agent_once():
+    recorder = TrajectoryRecorder(3, range(6), sample_size=2, soc_bins=4)
+    start = datetime(2024, 1, 1)
+    recorder.record(0, start, np.array([0.0, 0.24, 0.25, 0.5, 0.99, 1.0]), np.zeros(6))
+    recorder.record(1, start + timedelta(minutes=15), np.array([-0.1, 1.2, 0.3, 0.3, 0.3, 0.3]), np.zeros(6))
+
+    result = recorder.result()
+    np.testing.assert_allclose(result['soc_bin_edges'], [0, 0.25, 0.5, 0.75, 1.0])
+    # Values at 1.0 (and clipped ones outside [0, 1]) fall into the end bins
+    assert result['soc_histogram'].tolist() == [[2, 1, 1, 2], [1, 4, 0, 1]]
+    assert (result['soc_histogram'].sum(axis=1) == 6).all()
+
+def _inputs(days):
+    steps = days * 96
+    timestamps = np.datetime64('2024-01-01T00:00') + np.arange(steps) * np.timedelta64(15, 'm')
+    histogram = np.zeros((steps, 10), dtype=np.int32)
+    histogram[:, 5] = 20
+    return {'scenario': 'Weekday Peak_40%', 'fleet_size': 20, 'timestamps': timestamps,
+            'bin_edges': np.linspace(0, 1, 11), 'histogram': histogram}
+
+def test_time_axis_switches_to_dates_beyond_a_day():
+    fig, (day, week) = plt.subplots(2)
+    for ax, days in ((day, 1), (week, 7)):
+        ax.set_xlim(mdates.date2num(datetime(2024, 1, 1)), mdates.date2num(datetime(2024, 1, 1) + timedelta(days=days)))
+        plot_results._format_time_axis(ax, hour_interval=3)
+    assert isinstance(day.xaxis.get_major_formatter(), mdates.DateFormatter)
+    assert isinstance(week.xaxis.get_major_formatter(), mdates.ConciseDateFormatter)
+    plt.close(fig)
+
+def test_density_plot_formats_multi_day_axes(tmp_path, monkeypatch):
+    formatters = []
+    format_time_axis = plot_results._format_time_axis
+    def spy(ax, hour_interval):
+        format_time_axis(ax, hour_interval)
+        formatters.append(type(ax.xaxis.get_major_formatter()))
+    monkeypatch.setattr(plot_results, '_format_time_axis', spy)
+
+    for days in (1, 3):
+        path = str(tmp_path / f'density_{days}.png')
+        plot_results._render_soc_density(_inputs(days), path, dpi=30)
+        assert os.path.getsize(path) > 0
+    assert formatters == [mdates.DateFormatter, mdates.ConciseDateFormatter]
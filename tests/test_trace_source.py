@@ -0,0 +1,112 @@
+# tests/test_trace_source.py - Chunked replay of recorded trips
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from traffic_model.road_network import RoadNetwork
+from traffic_model.trace_source import TraceTripSource, TRIP_COLUMNS
+
+@pytest.fixture
+def road_network():
+    return RoadNetwork.from_segments([632, 671], [671, 675], [1.0, 1.0], [np.nan, np.nan],
+                                     ['local', 'local'], ['a', 'b'])
+
+def _trace(num_trips=400, seed=0):
+    rng = np.random.default_rng(seed)
+    departures = np.sort(rng.uniform(0, 300, num_trips)).round(2)
+    return pd.DataFrame({
+        'vehicle_id': rng.integers(1000, 1100, num_trips),
+        'departure_time': departures,
+        'arrival_time': departures + rng.uniform(5, 40, num_trips).round(2),
+        'origin': rng.choice([632, 671, 675, 9999], num_trips),
+        'destination': rng.choice([632, 671, 675, 9999], num_trips),
+    })
+
+@pytest.fixture
+def trace_config(config, tmp_path):
+    def make(trace, **params):
+        path = tmp_path / 'trace.csv'
+        trace.to_csv(path, index=False)
+        config.trace_params.update(enabled=True, path=str(path), chunk_rows=25, **params)
+        return config
+    return make
+
+def test_window_holds_trips_in_progress(trace_config, road_network):
+    trace = _trace()
+    source = TraceTripSource(trace_config(trace), road_network)
+    largest = 0
+    for minute in range(0, 360, 15):
+        window = source.window(minute)
+        largest = max(largest, len(window))
+        assert list(window.columns) == list(TRIP_COLUMNS)
+        in_progress = trace[(trace['departure_time'] <= minute) & (trace['arrival_time'] >= minute)]
+        assert set(in_progress['departure_time']) <= set(window['departure_time'])
+        assert (window['arrival_time'] >= minute).all()
+    # Bounded by the trips in progress plus one chunk, not the file
+    assert largest < len(trace) / 4
+    assert source.trips_read == len(trace)
+
+def test_vehicles_are_assigned_in_order_of_appearance(trace_config, road_network):
+    trace = pd.DataFrame({
+        'vehicle_id': ['c', 'a', 'c', 'b', 'd'],
+        'departure_time': [0.0, 1.0, 2.0, 3.0, 4.0],
+        'arrival_time': [100.0] * 5,
+        'origin': [632] * 5,
+        'destination': [671] * 5,
+    })
+    config = trace_config(trace)
+    config.traffic_params['total_vehicles'] = 3
+    window = TraceTripSource(config, road_network).window(10)
+    assert window['vehicle_id'].tolist() == [0, 1, 0, 2]
+    assert window['vehicle_id'].dtype == np.int64
+
+def test_locations_are_mapped_to_grid_nodes(trace_config, road_network, tmp_path):
+    trace = _trace(20)
+    window = TraceTripSource(trace_config(trace), road_network).window(0)
+    expected = trace['destination'].where(trace['destination'] != 9999, 'home')
+    assert window['destination'].tolist() == expected.tolist()
+
+    node_map = tmp_path / 'node_map.csv'
+    pd.DataFrame({'node': [9999], 'grid_node': [684]}).to_csv(node_map, index=False)
+    window = TraceTripSource(trace_config(trace, node_map_path=str(node_map)), road_network).window(0)
+    assert set(window['destination']) == ({684, 'home'} if (trace['destination'] != 9999).any() else {684})
+
+def test_unsorted_trace_raises(trace_config, road_network):
+    trace = _trace(60)
+    trace.loc[40, 'departure_time'] = 0.0  # Out of order in a later chunk
+    source = TraceTripSource(trace_config(trace), road_network)
+    with pytest.raises(ValueError, match="sorted by departure time"):
+        source.window(1000)
+
+def test_times_in_seconds_and_datetimes(trace_config, road_network, config):
+    trace = _trace(10)
+    seconds = trace.assign(departure_time=trace['departure_time'] * 60, arrival_time=trace['arrival_time'] * 60)
+    by_seconds = TraceTripSource(trace_config(seconds, time_unit='seconds'), road_network).window(0)
+
+    start = pd.Timestamp(config.simulation_params['start_time'])
+    stamps = trace.assign(departure_time=start + pd.to_timedelta(trace['departure_time'], unit='min'),
+                          arrival_time=start + pd.to_timedelta(trace['arrival_time'], unit='min'))
+    by_datetime = TraceTripSource(trace_config(stamps, time_unit='minutes'), road_network).window(0)
+    np.testing.assert_allclose(by_seconds['departure_time'], by_datetime['departure_time'], atol=1e-6)
+
+def test_restart_rewinds_the_trace(trace_config, road_network):
+    source = TraceTripSource(trace_config(_trace()), road_network)
+    first = source.window(60).copy()
+    source.window(300)
+    source.restart()
+    pd.testing.assert_frame_equal(source.window(60), first)
+
+def test_engine_replays_the_trace(trace_config, build_engine, scenarios):
+    trace_config(_trace(2000).assign(destination=lambda df: df['destination'].replace(9999, 671)))
+    engine = build_engine(seed=0)
+    results = engine.run_simulation(scenarios.get_scenario('Weekday Peak', 40))
+    assert len(results['timeseries']) == 24
+    # Every trip departs within the six-hour horizon, so the whole trace was replayed
+    assert engine.traffic_model.trace_source.trips_read == 2000
+
+def test_event_kernel_refuses_traces(trace_config, build_engine, scenarios):
+    config = trace_config(_trace())
+    config.simulation_params['kernel'] = 'event'
+    with pytest.raises(ValueError, match="time_step"):
+        build_engine(seed=0).run_simulation(scenarios.get_scenario('Weekday Peak', 40))
@@ -0,0 +1,67 @@
+# tests/test_trajectory_recorder.py - Sampled agent trajectories and fleet bands
+
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+
+from cosimulation.trajectory_recorder import TrajectoryRecorder, _reservoir_sample
+
+def test_reservoir_sample_of_a_short_stream_keeps_everything():
+    seen, sample = _reservoir_sample(range(5), 20, np.random.default_rng(0))
+    assert seen == 5
+    assert sample.tolist() == [0, 1, 2, 3, 4]
+
+def test_reservoir_sample_is_uniform():
+    counts = np.zeros(50)
+    for seed in range(4000):
+        seen, sample = _reservoir_sample(range(50), 10, np.random.default_rng(seed))
+        assert seen == 50 and len(np.unique(sample)) == 10
+        assert (np.diff(sample) > 0).all()
+        counts[sample] += 1
+    # Every position is kept with probability 10/50
+    np.testing.assert_allclose(counts / 4000, 0.2, atol=0.03)
+
+def test_reservoir_sample_is_reproducible():
+    first = _reservoir_sample(range(100), 7, np.random.default_rng(3))[1]
+    assert first.tolist() == _reservoir_sample(range(100), 7, np.random.default_rng(3))[1].tolist()
+
+def test_record_keeps_sampled_traces_and_fleet_bands():
+    rng = np.random.default_rng(1)
+    vehicle_ids = list(range(100, 140))
+    recorder = TrajectoryRecorder(6, vehicle_ids, sample_size=5, seed=2, percentiles=(5, 50, 95))
+    start = datetime(2024, 1, 1)
+    socs, powers = [], []
+    for step in range(4):  # A run stopped after four of six steps
+        soc, power = rng.random(40), rng.normal(0, 10, 40)
+        recorder.record(step, start + timedelta(minutes=15 * step), soc, power)
+        socs.append(soc)
+        powers.append(power)
+
+    result = recorder.result()
+    index = [vehicle_ids.index(v) for v in result['vehicle_ids']]
+    assert result['fleet_size'] == 40 and len(index) == 5
+    assert len(result['timestamps']) == 4
+    np.testing.assert_allclose(result['soc'], np.array(socs)[:, index], rtol=1e-6)
+    np.testing.assert_allclose(result['power_kw'], np.array(powers)[:, index], rtol=1e-6)
+    np.testing.assert_allclose(result['soc_bands'], np.percentile(socs, (5, 50, 95), axis=1).T, rtol=1e-6)
+    np.testing.assert_allclose(result['power_bands'], np.percentile(powers, (5, 50, 95), axis=1).T,
+                               rtol=1e-5, atol=1e-5)
+
+def test_engine_records_trajectories_of_its_agents(config, build_engine, scenarios):
+    config.trajectory_params.update(enabled=True, sample_size=8)
+    engine = build_engine(seed=0)
+    results = engine.run_simulation(scenarios.get_scenario('Weekday Peak', 40))
+    trajectories = results['agent_trajectories']
+
+    assert trajectories['fleet_size'] == len(engine.bdwpt_agents)
+    assert set(trajectories['vehicle_ids']) <= set(engine.bdwpt_agents)
+    assert trajectories['soc'].shape == (config.get_time_series()['total_steps'], 8)
+    assert np.all((trajectories['soc'] >= 0) & (trajectories['soc'] <= 1))
+    final = [engine.bdwpt_agents[v].soc for v in trajectories['vehicle_ids']]
+    np.testing.assert_allclose(trajectories['soc'][-1], final, rtol=1e-6)
+
+def test_trajectories_can_be_disabled(config, build_engine, scenarios):
+    config.trajectory_params['enabled'] = False
+    results = build_engine(seed=0).run_simulation(scenarios.get_scenario('Weekday Peak', 40))
+    assert results['agent_trajectories'] is None
@@ -0,0 +1,163 @@
+# traffic_model/data_cache.py - Checksummed binary cache of parsed traffic input files
+
+import os
+import json
+import pickle
+import zipfile
+import hashlib
+import logging
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Parsed sources of this process, keyed by (path, size, mtime); shared by every loader instance
+_MEMORY = {}
+
+# Errors of a truncated or corrupted cache file; the entry is parsed again from its source
+_UNREADABLE = (OSError, ValueError, KeyError, EOFError, pickle.UnpicklingError, zipfile.BadZipFile)
+
+class DataCache:
+    """
+    Parses each source file once. The parsed form is stored in ``cache_dir``
+    under the source's BLAKE2b checksum: DataFrames as typed column arrays
+    (.npz), other data (JSON documents) pickled. An index of (size, mtime,
+    checksum) per source avoids re-hashing unchanged files. Types with their own
+    directory format (``directory_type``, e.g. RoadNetwork) are stored with
+    their ``save`` and reopened with their ``load``, so a warm start
+    only stats the source and loads the binary form. A cache file that cannot
+    be read back is rebuilt from its source. Within a process every
+    consumer gets the same in-memory object, which must be treated as read-only.
+    """
+
+    INDEX_FILE = 'index.json'
+
+    def __init__(self, cache_dir=None):
+        """
+        Args:
+            cache_dir (str, optional): Directory of the binary cache; None keeps
+                only the in-process cache.
+        """
+        self.cache_dir = cache_dir
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    def load(self, filepath, parse, directory_type=None):
+        """
+        Parsed content of ``filepath``.
+
+        Args:
+            filepath (str): Source file.
+            parse (callable): ``parse(filepath)`` returning a DataFrame or a
+                JSON-like object; called only on a cache miss.
+            directory_type (type, optional): Class of the parsed object whose
+                ``save(directory)`` / ``load(directory)`` form the binary format.
+        """
+        filepath = os.path.abspath(filepath)
+        stat = os.stat(filepath)
+        memory_key = (filepath, stat.st_size, stat.st_mtime_ns)
+        if memory_key in _MEMORY:
+            return _MEMORY[memory_key]
+
+        data = None
+        if self.cache_dir:
+            index = self._read_index()
+            entry = index.get(filepath)
+            if entry and entry['size'] == stat.st_size and entry['mtime_ns'] == stat.st_mtime_ns:
+                checksum = entry['checksum']
+            else:
+                checksum = file_checksum(filepath)
+                index[filepath] = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'checksum': checksum}
+                self._write_index(index)
+            stem = f"{os.path.splitext(os.path.basename(filepath))[0]}-{checksum[:16]}"
+            try:
+                data = self._read_binary(stem, directory_type)
+            except _UNREADABLE as e:
+                logger.warning(f"Rebuilding unreadable cache entry {stem}: {e}")
+                data = None
+            if data is None:
+                data = parse(filepath)
+                self._write_binary(stem, data, directory_type)
+                logger.info(f"Cached parsed {os.path.basename(filepath)} as {stem}")
+        else:
+            data = parse(filepath)
+
+        _MEMORY[memory_key] = data
+        return data
+
+    def _read_index(self):
+        path = os.path.join(self.cache_dir, self.INDEX_FILE)
+        if not os.path.exists(path):
+            return {}
+        try:
+            with open(path) as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable cache index {path}: {e}")
+            return {}
+
+    def _write_index(self, index):
+        path = os.path.join(self.cache_dir, self.INDEX_FILE)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(index, f, indent=2)
+        os.replace(tmp_path, path)
+
+    def _read_binary(self, stem, directory_type=None):
+        if directory_type is not None:
+            path = os.path.join(self.cache_dir, f"{stem}.{directory_type.SUFFIX}")
+            return directory_type.load(path) if os.path.isdir(path) else None
+        frame_path = os.path.join(self.cache_dir, f"{stem}.npz")
+        if os.path.exists(frame_path):
+            with np.load(frame_path, allow_pickle=False) as arrays:
+                columns = arrays['__columns__'].tolist()
+                return pd.DataFrame({column: _from_column_array(arrays[f"c{i}"]) for i, column in enumerate(columns)})
+        object_path = os.path.join(self.cache_dir, f"{stem}.pkl")
+        if os.path.exists(object_path):
+            with open(object_path, 'rb') as f:
+                return pickle.load(f)
+        return None
+
+    def _write_binary(self, stem, data, directory_type=None):
+        if directory_type is not None:
+            data.save(os.path.join(self.cache_dir, f"{stem}.{directory_type.SUFFIX}"))
+            return
+        # Only typed and pure-text columns survive fixed-width arrays; other frames are pickled
+        if isinstance(data, pd.DataFrame) and all(_has_columnar_form(data[column]) for column in data.columns):
+            path = os.path.join(self.cache_dir, f"{stem}.npz")
+            arrays = {f"c{i}": _column_array(data[column]) for i, column in enumerate(data.columns)}
+            tmp_path = f"{path}.{os.getpid()}.tmp.npz"
+            np.savez(tmp_path, __columns__=np.array([str(c) for c in data.columns]), **arrays)
+        else:
+            path = os.path.join(self.cache_dir, f"{stem}.pkl")
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'wb') as f:
+                pickle.dump(data, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+
+def _has_columnar_form(column):
+    """Whether a column is typed or holds only strings (no missing values or mixed types)."""
+    values = column.to_numpy()
+    return values.dtype != object or all(isinstance(value, str) for value in values)
+
+def _column_array(column):
+    """Typed array of a DataFrame column; text columns become fixed-width unicode."""
+    values = column.to_numpy()
+    if values.dtype == object:
+        return values.astype(str)
+    return values
+
+def _from_column_array(values):
+    """Inverse of ``_column_array``: text columns come back as object columns, as from read_csv."""
+    if values.dtype.kind == 'U':
+        return values.astype(object)
+    return values
+
+def file_checksum(filepath, block_size=1 << 20):
+    """BLAKE2b digest of a file's bytes, read in blocks."""
+    digest = hashlib.blake2b(digest_size=32)
+    with open(filepath, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
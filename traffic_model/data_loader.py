@@ -6,13 +6,23 @@ import pandas as pd
 import json
 import logging
 
+from traffic_model.data_cache import DataCache
+from traffic_model.road_network import RoadNetwork
+
 logger = logging.getLogger(__name__)
 
 class TrafficDataLoader:
-    """Load and preprocess traffic data for simulation"""
+    """
+    Load and preprocess traffic data for simulation.
+
+    Source files are parsed through a ``DataCache``: once per process, and once
+    per file content when a binary ``cache_dir`` is given. Loaded data is
+    shared with every consumer and must not be modified in place.
+    """
     
-    def __init__(self, data_dir="data"):
+    def __init__(self, data_dir="data", cache_dir=None):
         self.data_dir = data_dir
+        self.cache = DataCache(cache_dir)
         self.traffic_data = None
         self.census_data = None
         self.road_network = None
@@ -23,12 +33,10 @@ class TrafficDataLoader:
         
         # If file doesn't exist, create synthetic data
         if not os.path.exists(filepath):
-            logger.info("Traffic pattern file not found, generating synthetic data...")
-            self.traffic_data = self._generate_synthetic_traffic_patterns()
+            logger.warning(f"Traffic pattern file {filepath} not found; writing random synthetic data there")
             # Save for future use
-            self.traffic_data.to_csv(filepath, index=False)
-        else:
-            self.traffic_data = pd.read_csv(filepath)
+            self._generate_synthetic_traffic_patterns().to_csv(filepath, index=False)
+        self.traffic_data = self.cache.load(filepath, pd.read_csv)
             
         logger.info(f"Loaded traffic patterns: {self.traffic_data.shape}")
         return self.traffic_data
@@ -38,36 +46,46 @@ class TrafficDataLoader:
         filepath = os.path.join(self.data_dir, filename)
         
         if not os.path.exists(filepath):
-            logger.info("Census data not found, generating synthetic data...")
-            self.census_data = self._generate_synthetic_census_data()
-            self.census_data.to_csv(filepath, index=False)
-        else:
-            self.census_data = pd.read_csv(filepath)
+            logger.warning(f"Census data {filepath} not found; writing random synthetic data there")
+            self._generate_synthetic_census_data().to_csv(filepath, index=False)
+        self.census_data = self.cache.load(filepath, pd.read_csv)
             
         logger.info(f"Loaded census data: {self.census_data.shape}")
         return self.census_data
         
     def load_road_network(self, filename="wellington_roads.json"):
-        """Load road network topology"""
+        """
+        Load road network topology as a RoadNetwork.
+
+        ``filename`` may be a JSON network, an OSM-derived edge list (.csv) or
+        a directory saved by ``RoadNetwork.save``, which is memory-mapped.
+        JSON and CSV sources are converted once and cached in that format.
+        """
         filepath = os.path.join(self.data_dir, filename)
         
-        if not os.path.exists(filepath):
-            logger.info("Road network not found, generating synthetic network...")
-            self.road_network = self._generate_synthetic_road_network()
-            with open(filepath, 'w') as f:
-                json.dump(self.road_network, f, indent=2)
+        if os.path.isdir(filepath):
+            self.road_network = RoadNetwork.load(filepath)
+        elif filepath.endswith('.csv'):
+            self.road_network = self.cache.load(filepath, RoadNetwork.from_edge_list, RoadNetwork)
         else:
-            with open(filepath, 'r') as f:
-                self.road_network = json.load(f)
+            self.road_network = self._load_json_road_network(filepath)
                 
-        logger.info(f"Loaded road network with {len(self.road_network['segments'])} segments")
+        logger.info(f"Loaded road network with {self.road_network.num_segments} segments")
         return self.road_network
         
+    def _load_json_road_network(self, filepath):
+        if not os.path.exists(filepath):
+            logger.warning(f"Road network {filepath} not found; writing a random synthetic network there")
+            with open(filepath, 'w') as f:
+                json.dump(self._generate_synthetic_road_network(), f, indent=2)
+        return self.cache.load(filepath, RoadNetwork.from_json, RoadNetwork)
+        
     def load_ev_registration_data(self, filename="ev_registrations.csv"):
         """Load EV registration statistics"""
         filepath = os.path.join(self.data_dir, filename)
         
         if not os.path.exists(filepath):
+            logger.warning(f"EV registration data {filepath} not found; writing default NZ statistics there")
             # Create synthetic EV data based on NZ statistics
             ev_data = pd.DataFrame({
                 'vehicle_type': ['Nissan Leaf', 'Tesla Model 3', 'MG ZS EV', 'Hyundai Kona', 'Other'],
@@ -76,9 +94,7 @@ class TrafficDataLoader:
                 'typical_range_km': [270, 500, 320, 450, 400]
             })
             ev_data.to_csv(filepath, index=False)
-            return ev_data
-        else:
-            return pd.read_csv(filepath)
+        return self.cache.load(filepath, pd.read_csv)
             
     def _generate_synthetic_traffic_patterns(self):
         """Generate synthetic hourly traffic patterns for Wellington"""
@@ -212,4 +228,4 @@ class TrafficDataLoader:
         else:
             np.save(filepath, data)
             
-        logger.info(f"Saved processed data to {filepath}")
\ No newline at end of file
+        logger.info(f"Saved processed data to {filepath}")
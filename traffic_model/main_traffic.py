@@ -1,9 +1,13 @@
 # /1_traffic_model/main_traffic.py
 
-import numpy as np
+import copy
+import zlib
 import logging
+import contextlib
+import numpy as np
 from .trip_generator import TripGenerator
 from .vehicle_movement import VehicleMovement
+from .trace_source import TraceTripSource
 
 logger = logging.getLogger(__name__)
 
@@ -13,18 +17,48 @@ class TrafficModel:
     This class orchestrates trip generation and vehicle movement.
     """
     
-    def __init__(self, config, data_loader):
+    def __init__(self, config, data_loader, vehicles=None, daily_trips=None):
+        """
+        Args:
+            config (SimulationConfig): The main configuration object.
+            data_loader (TrafficDataLoader): Source of network and fleet data.
+            vehicles (list, optional): Prebuilt fleet (e.g. shared by a parallel runner);
+                generated from the registration data when omitted.
+            daily_trips (dict, optional): Prebuilt trip tables by day type.
+        """
         self.config = config
         self.data_loader = data_loader
         self.vehicles = []
         self.road_network = self.data_loader.load_road_network()
         
         self.trip_generator = TripGenerator(self.config, self.data_loader)
-        self.vehicle_movement = VehicleMovement(self.road_network['segments'], self.config)
+        self.vehicle_movement = VehicleMovement(self.road_network, self.config)
+        # Recorded trips replayed from a file instead of synthetic trip chains
+        self.trace_source = TraceTripSource(config, self.road_network) if config.trace_params['enabled'] else None
         
-        self.daily_trips = {} # Cache for daily trip patterns
+        self.daily_trips = dict(daily_trips or {}) # Cache for daily trip patterns
         
-        self._initialize_vehicles()
+        # Common random numbers: the fleet, trips and equipment ranks come from dedicated
+        # streams of one seed, so every penetration level sees the same draws
+        self.crn_seed = None
+        if self.config.crn_params['enabled']:
+            seed = self.config.crn_params['seed']
+            self.crn_seed = int(np.random.randint(2**31)) if seed is None else seed
+        
+        if vehicles is None:
+            self._initialize_vehicles()
+        else:
+            self.vehicles = vehicles
+        self.initial_vehicles = copy.deepcopy(self.vehicles) if self.crn_seed is not None else None
+
+    def _random_stream(self, name):
+        """
+        Context in which the global numpy RNG draws from the named CRN stream;
+        the previous global state is restored on exit. A no-op without CRN.
+        """
+        if self.crn_seed is None:
+            return contextlib.nullcontext()
+        return _seeded_global_rng([self.crn_seed, zlib.crc32(name.encode())])
 
     def _initialize_vehicles(self):
         """Initialize the vehicle population with EVs."""
@@ -34,6 +68,19 @@ class TrafficModel:
         self.vehicles = []
         ev_types = self.data_loader.load_ev_registration_data()
         
+        with self._random_stream('fleet'):
+            self._generate_vehicles(total_vehicles, ev_count, ev_types)
+        
+        if self.crn_seed is not None:
+            # Fixed per-vehicle ranks: the lowest-ranked EVs are equipped first
+            with self._random_stream('penetration'):
+                for vehicle, rank in zip(self.vehicles, np.random.random(total_vehicles)):
+                    vehicle['crn_rank'] = rank
+        
+        logger.info(f"Initialized {total_vehicles} vehicles ({ev_count} EVs).")
+
+    def _generate_vehicles(self, total_vehicles, ev_count, ev_types):
+        """Create the vehicles with their EV types and initial SoC."""
         for i in range(total_vehicles):
             is_ev = i < ev_count
             vehicle = {
@@ -57,8 +104,11 @@ class TrafficModel:
                     ), 0.1, 1.0)
             
             self.vehicles.append(vehicle)
-        
-        logger.info(f"Initialized {total_vehicles} vehicles ({ev_count} EVs).")
+
+    def reset_vehicles(self):
+        """Restore the fleet to its initial state (CRN mode only)."""
+        if self.initial_vehicles is not None:
+            self.vehicles = copy.deepcopy(self.initial_vehicles)
 
     def set_bdwpt_penetration(self, penetration_percent):
         """Set BDWPT equipment penetration for the EV fleet."""
@@ -69,9 +119,12 @@ class TrafficModel:
         for v in self.vehicles:
             v['is_bdwpt_equipped'] = False
 
-        # Randomly select EVs to equip
+        # Randomly select EVs to equip; with CRN the sets are nested across penetration levels
         if num_bdwpt > 0 and len(ev_indices) > 0:
-            equipped_indices = np.random.choice(ev_indices, num_bdwpt, replace=False)
+            if self.crn_seed is not None:
+                equipped_indices = sorted(ev_indices, key=lambda i: self.vehicles[i]['crn_rank'])[:num_bdwpt]
+            else:
+                equipped_indices = np.random.choice(ev_indices, num_bdwpt, replace=False)
             for i in equipped_indices:
                 self.vehicles[i]['is_bdwpt_equipped'] = True
         
@@ -81,13 +134,29 @@ class TrafficModel:
         """Generate or retrieve from cache the trip patterns for a given day type."""
         if day_type not in self.daily_trips:
             logger.info(f"Generating new trip patterns for {day_type}...")
-            self.daily_trips[day_type] = self.trip_generator.generate_daily_trips(
-                len(self.vehicles), day_type
-            )
+            with self._random_stream(f'trips:{day_type}'):
+                self.daily_trips[day_type] = self.trip_generator.generate_daily_trips(
+                    len(self.vehicles), day_type
+                )
         return self.daily_trips[day_type]
 
-    def update_vehicle_positions(self, current_time_minutes, day_type):
-        """Update vehicle positions for the current time step."""
+    def restart_trips(self):
+        """Rewind the trip trace for a new run (no-op for synthetic trips)."""
+        if self.trace_source is not None:
+            self.trace_source.restart()
+
+    def update_vehicle_positions(self, current_time_minutes, day_type, timestamp=None):
+        """
+        Update vehicle positions for the current time step.
+        
+        Args:
+            current_time_minutes (int): Minute of the day (synthetic trips).
+            day_type (str): Day type of the synthetic trip pattern.
+            timestamp (datetime, optional): Simulation time; required when replaying a trace.
+        """
+        if self.trace_source is not None:
+            minutes = self.trace_source.minutes_since_start(timestamp)
+            return self.vehicle_movement.update_positions(self.vehicles, self.trace_source.window(minutes), minutes)
         trips_df = self.get_daily_trip_pattern(day_type)
         return self.vehicle_movement.update_positions(self.vehicles, trips_df, current_time_minutes)
     
@@ -95,6 +164,8 @@ class TrafficModel:
         """Generate trip patterns for the given hour and day type."""
         # This method is called by the simulation engine
         # For now, we'll just return the cached daily patterns
+        if self.trace_source is not None:
+            return None  # Trips are streamed from the trace instead
         return self.get_daily_trip_pattern(day_type)
 
     def get_bdwpt_vehicles_by_node(self, power_node):
@@ -103,4 +174,13 @@ class TrafficModel:
             v for v in self.vehicles
             if v.get('is_bdwpt_equipped') and v.get('location') == power_node
         ]
-        return vehicles_at_node
\ No newline at end of file
+        return vehicles_at_node
+
+@contextlib.contextmanager
+def _seeded_global_rng(entropy):
+    state = np.random.get_state()
+    np.random.seed(np.random.SeedSequence(entropy).generate_state(1)[0])
+    try:
+        yield
+    finally:
+        np.random.set_state(state)
@@ -0,0 +1,210 @@
+# traffic_model/road_network.py - Compact CSR road network stored as memory-mappable arrays
+
+import os
+import json
+import shutil
+import logging
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# OSM highway classes by road type of the synthetic network
+OSM_ROAD_TYPES = {
+    'motorway': 'arterial', 'trunk': 'arterial', 'primary': 'arterial',
+    'secondary': 'collector', 'tertiary': 'collector',
+}
+
+class RoadNetwork:
+    """
+    Road network as flat typed arrays instead of a list of segment dicts.
+
+    Nodes are identified by integer ids; ``node_ids`` is sorted, so an id maps
+    to its index with ``np.searchsorted``. Outgoing links of node index ``i``
+    are ``indices[indptr[i]:indptr[i + 1]]`` (CSR adjacency), with the segment
+    of each link in ``link_segments``. Segment attributes are one array each.
+    ``destination_nodes`` are the nodes trips may end at.
+
+    A network is saved as a directory of ``.npy`` files plus ``meta.json`` and
+    loaded memory-mapped, so opening a network with millions of links reads
+    no array data until it is used.
+    """
+
+    ARRAYS = (
+        'node_ids', 'destination_nodes', 'bdwpt_coverage', 'indptr', 'indices', 'link_segments',
+        'segment_ids', 'from_index', 'to_index', 'length_km', 'capacity_veh_per_hour', 'type_codes',
+    )
+    SUFFIX = 'csr'
+
+    def __init__(self, arrays, type_names):
+        """
+        Args:
+            arrays (dict): One array per name in ``ARRAYS``.
+            type_names (list): Road type of each value of ``type_codes``.
+        """
+        for name in self.ARRAYS:
+            setattr(self, name, arrays[name])
+        self.type_names = list(type_names)
+
+    @property
+    def num_nodes(self):
+        return len(self.node_ids)
+
+    @property
+    def num_segments(self):
+        return len(self.segment_ids)
+
+    def node_index(self, node_id):
+        """Index of ``node_id`` in ``node_ids``, or -1 when it is not a network node."""
+        position = int(np.searchsorted(self.node_ids, node_id))
+        if position < len(self.node_ids) and self.node_ids[position] == node_id:
+            return position
+        return -1
+
+    def neighbors(self, node_id):
+        """Ids of the nodes reachable from ``node_id`` over one link."""
+        index = self.node_index(node_id)
+        if index < 0:
+            return self.node_ids[:0]
+        return self.node_ids[self.indices[self.indptr[index]:self.indptr[index + 1]]]
+
+    def outgoing_segments(self, node_id):
+        """Segment indices of the links leaving ``node_id``."""
+        index = self.node_index(node_id)
+        if index < 0:
+            return self.link_segments[:0]
+        return self.link_segments[self.indptr[index]:self.indptr[index + 1]]
+
+    @classmethod
+    def from_segments(cls, from_nodes, to_nodes, length_km, capacity, types, segment_ids,
+                      destination_nodes=None, bdwpt_coverage=(), bidirectional=True):
+        """
+        Build the network from per-segment columns.
+
+        Args:
+            from_nodes, to_nodes (array-like): Integer end node ids of each segment.
+            length_km, capacity (array-like): Segment length and capacity (NaN if unknown).
+            types (array-like): Road type name of each segment.
+            segment_ids (array-like): Segment identifiers.
+            destination_nodes (array-like, optional): Trip destinations; all nodes when omitted.
+            bdwpt_coverage (array-like): Nodes with BDWPT infrastructure.
+            bidirectional (bool): Add a reverse link for every segment.
+        """
+        from_nodes = np.asarray(from_nodes, dtype=np.int64)
+        to_nodes = np.asarray(to_nodes, dtype=np.int64)
+        declared = np.asarray(destination_nodes if destination_nodes is not None else [], dtype=np.int64)
+        node_ids = np.unique(np.concatenate([from_nodes, to_nodes, declared]))
+        from_index = np.searchsorted(node_ids, from_nodes)
+        to_index = np.searchsorted(node_ids, to_nodes)
+
+        segments = np.arange(len(from_nodes), dtype=np.int64)
+        sources, targets = from_index, to_index
+        if bidirectional:
+            sources = np.concatenate([from_index, to_index])
+            targets = np.concatenate([to_index, from_index])
+            segments = np.concatenate([segments, segments])
+        order = np.argsort(sources, kind='stable')
+        indptr = np.zeros(len(node_ids) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(sources, minlength=len(node_ids)), out=indptr[1:])
+
+        type_names, type_codes = np.unique(np.asarray(types, dtype=str), return_inverse=True)
+        arrays = {
+            'node_ids': node_ids,
+            'destination_nodes': declared if destination_nodes is not None else node_ids,
+            'bdwpt_coverage': np.asarray(bdwpt_coverage, dtype=np.int64),
+            'indptr': indptr,
+            'indices': targets[order],
+            'link_segments': segments[order],
+            'segment_ids': np.asarray(segment_ids, dtype=str),
+            'from_index': from_index,
+            'to_index': to_index,
+            'length_km': np.asarray(length_km, dtype=np.float64),
+            'capacity_veh_per_hour': np.asarray(capacity, dtype=np.float64),
+            'type_codes': type_codes.astype(np.int16),
+        }
+        return cls(arrays, type_names.tolist())
+
+    @classmethod
+    def from_json(cls, path_or_document):
+        """
+        Convert the JSON network format (``{'segments': [...], 'nodes': [...],
+        'bdwpt_coverage': [...]}``). Segments are two-way roads.
+        """
+        document = path_or_document
+        if isinstance(path_or_document, str):
+            with open(path_or_document, 'r') as f:
+                document = json.load(f)
+        segments = pd.DataFrame(document['segments'])
+        capacity = segments.get('capacity_veh_per_hour', pd.Series(np.nan, index=segments.index))
+        return cls.from_segments(
+            segments['from_node'], segments['to_node'], segments['length_km'], capacity,
+            segments['type'], segments['id'],
+            destination_nodes=document.get('nodes'),
+            bdwpt_coverage=document.get('bdwpt_coverage', ()),
+        )
+
+    @classmethod
+    def from_edge_list(cls, path, bdwpt_coverage=(), chunksize=1_000_000):
+        """
+        Convert an OSM-derived edge list CSV, as exported by OSMnx
+        (``u, v, key, length`` in metres, ``highway``, optional ``capacity``).
+        Each row is one directed link; two-way streets appear once per direction.
+        The file is read in chunks and only the needed columns are kept.
+        """
+        columns = {'u', 'v', 'key', 'length', 'highway', 'capacity'}
+        parts = []
+        for chunk in pd.read_csv(path, usecols=lambda c: c in columns, chunksize=chunksize):
+            highway = chunk['highway'].astype(str).str.strip("[]'\" ").str.split("'").str[0]
+            parts.append(pd.DataFrame({
+                'u': chunk['u'].to_numpy(dtype=np.int64),
+                'v': chunk['v'].to_numpy(dtype=np.int64),
+                'key': chunk['key'].to_numpy(dtype=np.int64) if 'key' in chunk else 0,
+                'length_km': chunk['length'].to_numpy(dtype=np.float64) / 1000,
+                'capacity': chunk['capacity'].to_numpy(dtype=np.float64) if 'capacity' in chunk else np.nan,
+                'type': highway.map(lambda h: OSM_ROAD_TYPES.get(h, 'local')),
+            }))
+        edges = pd.concat(parts, ignore_index=True)
+        segment_ids = edges['u'].astype(str) + '_' + edges['v'].astype(str) + '_' + edges['key'].astype(str)
+        return cls.from_segments(
+            edges['u'], edges['v'], edges['length_km'], edges['capacity'], edges['type'], segment_ids,
+            bdwpt_coverage=bdwpt_coverage, bidirectional=False,
+        )
+
+    def save(self, directory):
+        """Write the network as ``.npy`` arrays and ``meta.json`` (atomically replaces ``directory``)."""
+        tmp_dir = f"{directory.rstrip(os.sep)}.{os.getpid()}.tmp"
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        os.makedirs(tmp_dir)
+        for name in self.ARRAYS:
+            np.save(os.path.join(tmp_dir, f"{name}.npy"), np.asarray(getattr(self, name)))
+        with open(os.path.join(tmp_dir, 'meta.json'), 'w') as f:
+            json.dump({'type_names': self.type_names, 'num_nodes': self.num_nodes,
+                       'num_segments': self.num_segments}, f, indent=2)
+        shutil.rmtree(directory, ignore_errors=True)
+        os.replace(tmp_dir, directory)
+        logger.info(f"Saved road network ({self.num_nodes} nodes, {self.num_segments} segments) to {directory}")
+
+    @classmethod
+    def load(cls, directory, mmap_mode='r'):
+        """Open a saved network; arrays are memory-mapped unless ``mmap_mode`` is None."""
+        with open(os.path.join(directory, 'meta.json')) as f:
+            meta = json.load(f)
+        arrays = {name: np.load(os.path.join(directory, f"{name}.npy"), mmap_mode=mmap_mode)
+                  for name in cls.ARRAYS}
+        return cls(arrays, meta['type_names'])
+
+def convert_road_network(source, directory, bdwpt_coverage=()):
+    """
+    Convert a JSON network or an OSM-derived edge list (``.csv``) to the
+    memory-mappable directory format.
+
+    Returns:
+        RoadNetwork: The converted network.
+    """
+    if source.endswith('.csv'):
+        network = RoadNetwork.from_edge_list(source, bdwpt_coverage=bdwpt_coverage)
+    else:
+        network = RoadNetwork.from_json(source)
+    network.save(directory)
+    return network
@@ -0,0 +1,139 @@
+# traffic_model/trace_source.py - Trip replay from large recorded trip files
+
+import os
+import logging
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Trip columns used by VehicleMovement, in the names the rest of the traffic model uses
+TRIP_COLUMNS = ('vehicle_id', 'departure_time', 'arrival_time', 'origin', 'destination')
+
+class TraceTripSource:
+    """
+    Replays recorded trips (fleet telematics, travel-survey logs) instead of
+    synthetic ones. The file must be sorted by departure time; it is read in
+    chunks of ``chunk_rows`` as the simulation clock reaches them, and trips
+    are dropped once they have arrived. Memory is bounded by the trips still
+    in progress plus one chunk, not by the file size.
+
+    Trip times become minutes since the simulation start. Trace vehicle ids
+    are assigned to fleet vehicles in order of first appearance; trips of
+    vehicles beyond the fleet size are skipped. Origins and destinations are
+    mapped to grid nodes with ``node_map_path`` (columns ``node, grid_node``)
+    or, without a map, kept when they are road network nodes; everything
+    else becomes 'home' (off the BDWPT network).
+    """
+
+    def __init__(self, config, road_network):
+        """
+        Args:
+            config (SimulationConfig): Configuration with ``trace_params``.
+            road_network (RoadNetwork): Network whose nodes are valid locations without a node map.
+        """
+        self.params = config.trace_params
+        self.path = self.params['path']
+        self.start_time = pd.Timestamp(config.simulation_params['start_time'])
+        self.num_vehicles = config.traffic_params['total_vehicles']
+        self.columns = {self.params['columns'][name]: name for name in TRIP_COLUMNS}
+        self.node_map = self._load_node_map(road_network)
+        self.restart()
+
+    def restart(self):
+        """Rewind to the start of the file, e.g. for the next scenario."""
+        self._chunks = self._read_chunks()
+        self._buffer = pd.DataFrame(columns=list(TRIP_COLUMNS))
+        self._exhausted = False
+        self._last_departure = -np.inf
+        self._vehicle_index = {}
+        self.trips_read = 0
+        self.trips_skipped = 0
+
+    def minutes_since_start(self, timestamp):
+        return (pd.Timestamp(timestamp) - self.start_time) / pd.Timedelta(minutes=1)
+
+    def window(self, current_minute):
+        """
+        Trips that have departed by ``current_minute`` and not yet arrived, plus
+        the read-ahead up to the first later departure.
+
+        Returns:
+            pd.DataFrame: Trips with ``TRIP_COLUMNS``, times in minutes since the simulation start.
+        """
+        while not self._exhausted and (self._buffer.empty
+                                       or self._buffer['departure_time'].iat[-1] <= current_minute):
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                self._exhausted = True
+                logger.info(f"Trace {os.path.basename(self.path)} exhausted after {self.trips_read} trips "
+                            f"({self.trips_skipped} skipped)")
+                break
+            chunk = self._normalize(chunk)
+            self._buffer = chunk if self._buffer.empty else pd.concat([self._buffer, chunk], ignore_index=True)
+        self._buffer = self._buffer[self._buffer['arrival_time'] >= current_minute].reset_index(drop=True)
+        return self._buffer
+
+    def _read_chunks(self):
+        """Raw chunks of the needed columns."""
+        fmt = self.params['format']
+        if fmt == 'auto':
+            fmt = 'parquet' if self.path.endswith(('.parquet', '.pq')) else 'csv'
+        if fmt == 'parquet':
+            try:
+                import pyarrow.parquet as pq
+            except ImportError as e:
+                raise ImportError("Replaying Parquet trip traces requires pyarrow; convert the trace to CSV "
+                                  "or install pyarrow") from e
+            batches = pq.ParquetFile(self.path).iter_batches(batch_size=self.params['chunk_rows'],
+                                                             columns=list(self.columns))
+            return (batch.to_pandas() for batch in batches)
+        return iter(pd.read_csv(self.path, usecols=list(self.columns), chunksize=self.params['chunk_rows']))
+
+    def _normalize(self, chunk):
+        """Rename columns, convert times to minutes and map vehicles and nodes."""
+        chunk = chunk.rename(columns=self.columns)
+        for column in ('departure_time', 'arrival_time'):
+            chunk[column] = self._to_minutes(chunk[column])
+        departures = chunk['departure_time'].to_numpy()
+        if len(departures) and (departures[0] < self._last_departure or np.any(np.diff(departures) < 0)):
+            raise ValueError(f"Trip trace {self.path} must be sorted by departure time")
+        if len(departures):
+            self._last_departure = departures[-1]
+
+        # Fleet index per trace vehicle, assigned in order of first appearance
+        for vehicle in pd.unique(chunk['vehicle_id']):
+            if vehicle not in self._vehicle_index and len(self._vehicle_index) < self.num_vehicles:
+                self._vehicle_index[vehicle] = len(self._vehicle_index)
+        chunk['vehicle_id'] = chunk['vehicle_id'].map(self._vehicle_index)
+        known = chunk['vehicle_id'].notna()
+        self.trips_read += len(chunk)
+        self.trips_skipped += int((~known).sum())
+        chunk = chunk[known].astype({'vehicle_id': np.int64})
+
+        for column in ('origin', 'destination'):
+            chunk[column] = self._to_grid_nodes(chunk[column])
+        return chunk[list(TRIP_COLUMNS)].reset_index(drop=True)
+
+    def _to_minutes(self, values):
+        if pd.api.types.is_numeric_dtype(values):
+            return values.astype(np.float64) / (60.0 if self.params['time_unit'] == 'seconds' else 1.0)
+        return (pd.to_datetime(values) - self.start_time) / pd.Timedelta(minutes=1)
+
+    def _to_grid_nodes(self, values):
+        """Grid node of each location; 'home' for locations off the BDWPT network."""
+        mapped = pd.to_numeric(values, errors='coerce').map(self.node_map)
+        on_network = mapped.notna().to_numpy()
+        nodes = np.full(len(values), 'home', dtype=object)
+        nodes[on_network] = mapped.to_numpy()[on_network].astype(np.int64)
+        return pd.Series(nodes, index=values.index)
+
+    def _load_node_map(self, road_network):
+        """Series mapping trace location ids to grid nodes."""
+        path = self.params['node_map_path']
+        if path:
+            node_map = pd.read_csv(path)
+            return pd.Series(node_map['grid_node'].to_numpy(), index=node_map['node'].to_numpy())
+        node_ids = np.asarray(road_network.node_ids)
+        return pd.Series(node_ids, index=node_ids)
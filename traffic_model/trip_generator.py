@@ -14,7 +14,7 @@ class TripGenerator:
         self.config = config
         self.data_loader = data_loader
         self.road_network = self.data_loader.load_road_network()
-        self.nodes = self.road_network['nodes']
+        self.nodes = self.road_network.destination_nodes
         
         # Trip purpose distribution (based on NZ Household Travel Survey)
         self.trip_purposes = {
@@ -181,11 +181,17 @@ class TripGenerator:
         if purpose == 'home':
             return 'home'
 
-        # Select a random node from the network, excluding the current location
-        possible_destinations = [n for n in self.nodes if n != current_location]
-        if not possible_destinations:
+        # Select a random node from the network, excluding the current location; drawn by
+        # position so no list of candidate nodes is built
+        excluded = [] if isinstance(current_location, str) else np.flatnonzero(self.nodes == current_location)
+        count = len(self.nodes) - len(excluded)
+        if count == 0:
              return current_location
-        return np.random.choice(possible_destinations)
+        position = np.random.randint(0, count)
+        for index in excluded:
+            if position >= index:
+                position += 1
+        return self.nodes[position]
             
     def _generate_departure_time(self, purpose, earliest_time, day_type):
         """Generate realistic departure time based on purpose"""
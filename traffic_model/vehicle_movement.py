@@ -13,7 +13,7 @@ class VehicleMovement:
         Initializes the VehicleMovement simulator.
 
         Args:
-            road_network (list): A list of road segment dictionaries.
+            road_network (RoadNetwork): The road network.
             config (SimulationConfig): The main configuration object.
         """
         self.road_network = road_network
@@ -0,0 +1,94 @@
+# visualizations/downsampling.py - Shape-preserving downsampling of long time series for plotting
+
+import numpy as np
+import logging
+
+logger = logging.getLogger(__name__)
+
+def downsample(times, values, max_points, method='minmax'):
+    """
+    Reduce a series to at most about ``max_points`` points before plotting.
+
+    Args:
+        times (np.ndarray): Sample times (datetime64 or numeric), ascending.
+        values (np.ndarray): Sample values; NaN marks missing samples.
+        max_points (int): Target number of points, roughly the plot's pixel width.
+        method (str): 'minmax' keeps the minimum and maximum of each bucket, so
+            every peak and limit violation stays visible; 'lttb' keeps the
+            point of each bucket that best preserves the visual shape.
+
+    Returns:
+        tuple: (times, values) of the kept samples, in time order.
+    """
+    if method == 'minmax':
+        return minmax_envelope(times, values, max(max_points // 2, 1))
+    if method == 'lttb':
+        return lttb(times, values, max_points)
+    raise ValueError(f"Unknown downsampling method '{method}'; expected 'minmax' or 'lttb'")
+
+def minmax_envelope(times, values, num_buckets):
+    """
+    Minimum and maximum sample of each of ``num_buckets`` equal-count buckets,
+    kept in time order. Vectorized, O(len(values)).
+    """
+    values = np.asarray(values, dtype=np.float64)
+    n = len(values)
+    if n <= 2 * num_buckets:
+        return times, values
+    edges = np.linspace(0, n, num_buckets + 1).astype(np.int64)
+    starts = edges[:-1]
+    bucket = np.repeat(np.arange(num_buckets), np.diff(edges))
+    # fmin/fmax skip NaN unless the whole bucket is missing
+    first_min = _first_match(values, np.fmin.reduceat(values, starts), bucket, starts)
+    first_max = _first_match(values, np.fmax.reduceat(values, starts), bucket, starts)
+    index = np.unique(np.concatenate([first_min, first_max]))
+    return times[index], values[index]
+
+def _first_match(values, bucket_values, bucket, starts):
+    """Position of the first sample of each bucket equal to the bucket's value (bucket start if none)."""
+    hits = np.flatnonzero(values == bucket_values[bucket])
+    positions = starts.copy()
+    found, first = np.unique(bucket[hits], return_index=True)
+    positions[found] = hits[first]
+    return positions
+
+def lttb(times, values, num_points):
+    """
+    Largest-Triangle-Three-Buckets (Steinarsson 2013): the first and last
+    samples plus, for each of ``num_points - 2`` buckets, the sample forming the
+    largest triangle with the previously kept sample and the next bucket's mean.
+    The buckets holding the global minimum and maximum keep those samples
+    instead, so the plotted range (and any limit violation) is never lost.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    n = len(values)
+    if n <= num_points or num_points < 3:
+        return times, values
+    x = np.asarray(times)
+    if np.issubdtype(x.dtype, np.datetime64):
+        x = x.astype('datetime64[ns]').astype(np.int64)
+    x = x.astype(np.float64) - x[0]
+    y = np.where(np.isnan(values), np.nanmean(values), values)
+    finite = np.flatnonzero(~np.isnan(values))
+    extremes = np.unique(finite[[np.argmin(values[finite]), np.argmax(values[finite])]]) if len(finite) else finite
+
+    every = (n - 2) / (num_points - 2)
+    kept = np.empty(num_points, dtype=np.int64)
+    kept[0], kept[-1] = 0, n - 1
+    a = 0
+    for i in range(num_points - 2):
+        start = int(i * every) + 1
+        end = int((i + 1) * every) + 1
+        next_end = min(int((i + 2) * every) + 1, n)
+        avg_x = x[end:next_end].mean()
+        avg_y = y[end:next_end].mean()
+        forced = extremes[(extremes >= start) & (extremes < end)]
+        if len(forced):
+            a = int(forced[0])
+        else:
+            area = np.abs((x[a] - avg_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (avg_y - y[a]))
+            a = start + int(np.argmax(area))
+        kept[i + 1] = a
+    # Both extremes in one bucket: keep the second one as an extra point
+    kept = np.union1d(kept, extremes)
+    return times[kept], values[kept]
@@ -1,5 +1,6 @@
 ﻿# visualizations/plot_results.py - Visualization functions for results
 
+import matplotlib
 import matplotlib.pyplot as plt
 import matplotlib.dates as mdates
 import seaborn as sns
@@ -7,162 +8,499 @@ import pandas as pd
 import numpy as np
 from datetime import datetime
 import os
+import json
+import pickle
+import hashlib
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
 import logging # FIX: Import the logging library
 
+from cosimulation.result_writer import read_timeseries, read_manifest, iter_timeseries_chunks
+from visualizations.downsampling import downsample
+
 logger = logging.getLogger(__name__) # FIX: Get the logger instance
 
+RENDER_MANIFEST = 'render_manifest.json'
+RENDER_VERSION = 1  # Bump when a helper shared by the render functions changes how figures look
+
 class Visualizer:
-    """Create visualizations for BDWPT simulation results"""
+    """
+    Create visualizations for BDWPT simulation results.
+
+    Timeseries are aggregated once per scenario and the aggregates are shared by
+    all figures. Line plots get each series downsampled to about
+    ``max_points`` points with a shape-preserving method, so rendering cost
+    does not grow with the horizon and short excursions stay visible. ``render_all`` turns each figure into a job (a module-level
+    render function plus a builder of its small input data). A job is hashed
+    from checksums of the data it plots (the timeseries columns or trajectory
+    arrays it reads, streamed timeseries chunk by chunk) and from its render
+    function's code, so unchanged figures are skipped before any aggregation;
+    the rest are rendered in this process or, with ``parallel``, in a process
+    pool with the non-interactive Agg backend.
+    """
     
     def __init__(self, config):
         self.config = config
+        self.params = config.visualization_params
         self.output_dir = config.figures_dir
         os.makedirs(self.output_dir, exist_ok=True)
+        self._aggregates = {}
+        self._checksums = {}
+        
+    def _get_timeseries(self, results):
+        """Timeseries of one scenario, loaded from disk if the run was streamed"""
+        if results['timeseries'] is None and results.get('timeseries_path'):
+            return read_timeseries(results['timeseries_path'])
+        return results['timeseries']
+        
+    def _get_aggregates(self, key, results):
+        """Downsampled line series and hourly means of one scenario's plotted columns, computed once"""
+        cache_key = (key, id(results))
+        if cache_key not in self._aggregates:
+            df = self._get_timeseries(results)
+            columns = [col for col in df.columns
+                       if col == 'total_load_kw' or col.startswith(('voltage_bus_', 'bdwpt_node_'))]
+            indexed = df.set_index('timestamp')[columns]
+            times = indexed.index.to_numpy()
+            series = {}
+            for col in columns:
+                if not col.startswith('bdwpt_node_'):
+                    kept_times, kept_values = downsample(times, indexed[col].to_numpy(), self.params['max_points'],
+                                                         self.params['downsample_method'])
+                    series[col] = pd.Series(kept_values, index=pd.DatetimeIndex(kept_times), name=col)
+            self._aggregates[cache_key] = {
+                'series': series,
+                'h': indexed.resample('h').mean(),
+            }
+        return self._aggregates[cache_key]
+        
+    def render_all(self, all_results, kpis):
+        """
+        Render every figure, skipping those whose inputs are unchanged since the last render.
+
+        Returns:
+            list: File names of the figures rendered in this call.
+        """
+        jobs = self._figure_jobs(all_results, kpis)
+        manifest_path = os.path.join(self.output_dir, RENDER_MANIFEST)
+        manifest = {}
+        if os.path.exists(manifest_path):
+            with open(manifest_path) as f:
+                manifest = json.load(f)
+        
+        render_settings = tuple(self.params[name] for name in ('dpi', 'max_points', 'downsample_method'))
+        stale = []
+        for file_name, render, sources, build in jobs:
+            digest = hashlib.sha256(pickle.dumps((_render_fingerprint(render), sources, render_settings))).hexdigest()
+            path = os.path.join(self.output_dir, file_name)
+            if self.params['skip_unchanged'] and manifest.get(file_name) == digest and os.path.exists(path):
+                logger.info(f"Skipping {file_name}: inputs unchanged since the last render")
+                continue
+            # Inputs (downsampling, resampling) are only built for figures that are rendered
+            inputs = build()
+            if inputs is not None:
+                stale.append((file_name, render, inputs, digest))
+        
+        if self.params['parallel'] and len(stale) > 1:
+            max_workers = min(self.params['max_workers'] or os.cpu_count() or 1, len(stale))
+            context = multiprocessing.get_context('spawn')
+            with ProcessPoolExecutor(max_workers=max_workers, mp_context=context,
+                                     initializer=_init_render_worker) as executor:
+                futures = [executor.submit(render, inputs, os.path.join(self.output_dir, file_name),
+                                           self.params['dpi'])
+                           for file_name, render, inputs, _ in stale]
+                for future in futures:
+                    future.result()
+        else:
+            for file_name, render, inputs, _ in stale:
+                render(inputs, os.path.join(self.output_dir, file_name), self.params['dpi'])
+        
+        manifest.update({file_name: digest for file_name, _, _, digest in stale})
+        with open(manifest_path, 'w') as f:
+            json.dump(manifest, f, indent=2)
+        logger.info(f"Rendered {len(stale)} of {len(jobs)} figures")
+        return [file_name for file_name, _, _, _ in stale]
+        
+    def _figure_jobs(self, all_results, kpis):
+        """(file name, render function, checksum of the plotted data, inputs builder) for every figure"""
+        def columns(keys, names):
+            return {key: self._column_checksums(key, all_results[key], names) for key in keys if key in all_results}
+        
+        def trajectories(key, names):
+            results = all_results.get(key)
+            return {key: _trajectory_checksums(results.get('agent_trajectories'), names)} if results else {}
+        
+        weekday = [f'Weekday Peak_{penetration}%' for penetration in (0, 15, 40)]
+        weekend = [f'Weekend Peak_{penetration}%' for penetration in (0, 15, 40)]
+        agents = 'Weekday Peak_40%'
+        bdwpt_columns = [f'bdwpt_node_{node}_kw' for node in self.config.grid_params['bdwpt_nodes']]
+        agent_fields = ('fleet_size', 'timestamps', 'vehicle_ids', 'percentiles')
+        jobs = [
+            ('load_curves_comparison.png', _render_load_curves,
+             columns(weekday + weekend, ['timestamp', 'total_load_kw']),
+             lambda: self._load_curve_inputs(all_results)),
+            ('voltage_profiles.png', _render_voltage_profiles,
+             columns(weekday, ['timestamp'] + [f'voltage_bus_{bus}' for bus in VOLTAGE_PLOT_BUSES]),
+             lambda: self._voltage_profile_inputs(all_results)),
+            ('kpi_comparison.png', _render_kpi_comparison, _kpi_fingerprint(kpis),
+             lambda: self._kpi_comparison_inputs(kpis)),
+            ('bdwpt_power_heatmap.png', _render_bdwpt_heatmap, columns([agents], ['timestamp'] + bdwpt_columns),
+             lambda: self._bdwpt_heatmap_inputs(all_results)),
+        ]
+        if self.config.trajectory_params['enabled']:
+            jobs += [
+                ('soc_density_heatmap.png', _render_soc_density,
+                 trajectories(agents, ('fleet_size', 'timestamps', 'soc_bin_edges', 'soc_histogram')),
+                 lambda: self._soc_density_inputs(all_results, agents)),
+                ('agent_soc_profiles.png', _render_agent_soc_profiles,
+                 trajectories(agents, agent_fields + ('soc', 'soc_bands')),
+                 lambda: self._agent_trajectory_inputs(all_results, 5, agents, 'soc')),
+                ('agent_power_exchange.png', _render_agent_power_exchange,
+                 trajectories(agents, agent_fields + ('power_kw', 'power_bands')),
+                 lambda: self._agent_trajectory_inputs(all_results, 5, agents, 'power')),
+            ]
+        return jobs
+        
+    def _column_checksums(self, key, results, names):
+        """
+        Content checksum of each of ``names`` present in one scenario's
+        timeseries, computed once per column; streamed runs are read chunk by chunk.
+        """
+        cache_key = (key, id(results))
+        cached = self._checksums.setdefault(cache_key, {})
+        missing = [name for name in names if name not in cached]
+        if missing:
+            timeseries = results.get('timeseries')
+            if timeseries is not None:
+                missing = [name for name in missing if name in timeseries.columns]
+                chunks = [timeseries[missing]]
+            else:
+                path = results['timeseries_path']
+                missing = [name for name in missing if name in read_manifest(path)['columns']]
+                chunks = iter_timeseries_chunks(path, missing)
+            hashers = {name: hashlib.sha256() for name in missing}
+            for chunk in chunks:
+                for name in missing:
+                    values = chunk[name]
+                    if values.dtype.kind == 'M':
+                        values = values.astype('datetime64[ns]')
+                    hashers[name].update(pd.util.hash_pandas_object(values, index=False).to_numpy().tobytes())
+            cached.update({name: hasher.hexdigest() for name, hasher in hashers.items()})
+        return {name: cached[name] for name in names if name in cached}
+        
+    def _render(self, render, inputs, file_name):
+        """Render one figure in this process"""
+        if inputs is not None:
+            render(inputs, os.path.join(self.output_dir, file_name), self.params['dpi'])
         
     def plot_load_curves(self, all_results):
         """Plot 24-hour load curves comparison"""
-        fig, axes = plt.subplots(2, 1, figsize=(12, 10), sharex=True)
+        self._render(_render_load_curves, self._load_curve_inputs(all_results), 'load_curves_comparison.png')
         
-        scenarios = ['Weekday Peak', 'Weekend Peak']
-        
-        for idx, scenario_base in enumerate(scenarios):
-            ax = axes[idx]
-            
+    def _load_curve_inputs(self, all_results):
+        inputs = {}
+        for scenario_base in ['Weekday Peak', 'Weekend Peak']:
+            curves = []
             for penetration in [0, 15, 40]:
                 key = f"{scenario_base}_{penetration}%"
                 if key in all_results:
-                    df = all_results[key]['timeseries']
-                    df_resampled = df.set_index('timestamp').resample('15min').mean()
+                    series = self._get_aggregates(key, all_results[key])['series']
                     label = f"{penetration}% BDWPT" if penetration > 0 else "Baseline"
-                    ax.plot(df_resampled.index, df_resampled['total_load_kw'], label=label, linewidth=2)
-                    
-            ax.set_title(f'{scenario_base} - Total Load Comparison', fontsize=14)
-            ax.set_ylabel('Total Load (kW)', fontsize=12)
-            ax.legend(loc='upper right')
-            ax.grid(True, alpha=0.3)
-            
-        axes[-1].set_xlabel('Time of Day', fontsize=12)
-        ax.xaxis.set_major_formatter(mdates.DateFormatter('%H:%M'))
-        ax.xaxis.set_major_locator(mdates.HourLocator(interval=3))
-            
-        plt.tight_layout()
-        plt.savefig(os.path.join(self.output_dir, 'load_curves_comparison.png'), dpi=300, bbox_inches='tight')
-        plt.close()
+                    curves.append((label, series['total_load_kw']))
+            inputs[scenario_base] = curves
+        return inputs
         
     def plot_voltage_profiles(self, all_results):
         """Plot voltage profiles at critical buses"""
-        critical_buses = [671, 675, 652, 611]
-        
-        fig, axes = plt.subplots(2, 2, figsize=(14, 10), sharex=True)
-        axes = axes.flatten()
+        self._render(_render_voltage_profiles, self._voltage_profile_inputs(all_results), 'voltage_profiles.png')
         
-        for idx, bus in enumerate(critical_buses):
-            ax = axes[idx]
-            
+    def _voltage_profile_inputs(self, all_results):
+        inputs = {}
+        for bus in VOLTAGE_PLOT_BUSES:
+            curves = []
             for key in ['Weekday Peak_0%', 'Weekday Peak_15%', 'Weekday Peak_40%']:
                 if key in all_results:
-                    df = all_results[key]['timeseries']
+                    series = self._get_aggregates(key, all_results[key])['series']
                     voltage_col = f'voltage_bus_{bus}'
                     
-                    if voltage_col in df.columns:
-                        df_resampled = df.set_index('timestamp').resample('15min').mean()
+                    if voltage_col in series:
                         penetration = key.split('_')[1]
                         label = f"{penetration} BDWPT" if penetration != "0%" else "Baseline"
-                        ax.plot(df_resampled.index, df_resampled[voltage_col], label=label, linewidth=2)
-                        
-            ax.axhline(y=1.05, color='r', linestyle='--', alpha=0.5, label='Upper Limit')
-            ax.axhline(y=0.95, color='r', linestyle='--', alpha=0.5, label='Lower Limit')
-            
-            ax.set_title(f'Bus {bus} Voltage Profile', fontsize=12)
-            ax.set_ylabel('Voltage (p.u.)', fontsize=10)
-            ax.set_ylim(0.94, 1.06)
-            ax.legend(loc='best', fontsize=8)
-            ax.grid(True, alpha=0.3)
-            
-        for ax in axes:
-            ax.xaxis.set_major_formatter(mdates.DateFormatter('%H:%M'))
-            ax.xaxis.set_major_locator(mdates.HourLocator(interval=6))
-            ax.set_xlabel('Time of Day', fontsize=10)
-            
-        plt.tight_layout()
-        plt.savefig(os.path.join(self.output_dir, 'voltage_profiles.png'), dpi=300, bbox_inches='tight')
-        plt.close()
+                        curves.append((label, series[voltage_col]))
+            inputs[bus] = curves
+        return inputs
         
     def plot_kpi_comparison(self, kpis):
         """Plot KPI comparison bar charts"""
+        self._render(_render_kpi_comparison, self._kpi_comparison_inputs(kpis), 'kpi_comparison.png')
+        
+    def _kpi_comparison_inputs(self, kpis):
         kpi_df = pd.DataFrame.from_dict(kpis, orient='index')
         if kpi_df.empty:
             logger.warning("KPI DataFrame is empty, skipping KPI plot.")
-            return
-
-        fig, axes = plt.subplots(2, 2, figsize=(14, 12))
-        axes = axes.flatten()
-
-        plot_defs = [
-            {'key': 'peak_reduction_kw', 'title': 'Peak Load Reduction', 'ylabel': 'Reduction (kW)', 'color': 'steelblue'},
-            {'key': 'voltage_improvement', 'title': 'Voltage Violation Improvement', 'ylabel': 'Violations Reduced', 'color': 'darkgreen'},
-            {'key': 'loss_reduction_kwh', 'title': 'Energy Loss Reduction', 'ylabel': 'Reduction (kWh)', 'color': 'darkorange'},
-            {'key': 'energy_from_v2g_kwh', 'title': 'V2G Energy Contribution', 'ylabel': 'Energy (kWh)', 'color': 'darkred'}
-        ]
+            return None
 
         # Filter out baseline scenarios for plotting meaningful comparisons
         plot_df = kpi_df[kpi_df.index.str.contains("0%") == False].copy()
         if plot_df.empty:
             logger.warning("No non-baseline scenarios found for KPI plotting.")
-            plt.close()
-            return
+            return None
             
         plot_df['scenario_label'] = plot_df.index.str.replace('_', '\n')
-        
-        for i, pdef in enumerate(plot_defs):
-            ax = axes[i]
-            bars = ax.bar(plot_df['scenario_label'], plot_df[pdef['key']], color=pdef['color'])
-            ax.set_title(pdef['title'], fontsize=14)
-            ax.set_ylabel(pdef['ylabel'], fontsize=12)
-            ax.tick_params(axis='x', rotation=45, labelsize=10)
-            ax.grid(True, axis='y', linestyle='--', alpha=0.6)
-            
-            for bar in bars:
-                height = bar.get_height()
-                ax.text(bar.get_x() + bar.get_width()/2., height, f'{height:.1f}', ha='center', va='bottom', fontsize=9)
-        
-        plt.tight_layout(pad=3.0)
-        plt.savefig(os.path.join(self.output_dir, 'kpi_comparison.png'), dpi=300, bbox_inches='tight')
-        plt.close()
+        return plot_df[['scenario_label'] + [pdef['key'] for pdef in KPI_PLOT_DEFS]]
 
     def plot_bdwpt_heatmap(self, all_results):
         """Plot heatmap of BDWPT power exchange by node and time"""
+        self._render(_render_bdwpt_heatmap, self._bdwpt_heatmap_inputs(all_results), 'bdwpt_power_heatmap.png')
+        
+    def _bdwpt_heatmap_inputs(self, all_results):
         key = 'Weekday Peak_40%'
-        if key not in all_results: return
+        if key not in all_results: return None
             
-        df = all_results[key]['timeseries']
-        bdwpt_cols = [col for col in df.columns if 'bdwpt_node' in col]
-        if not bdwpt_cols: return
+        df_hourly = self._get_aggregates(key, all_results[key])['h']
+        bdwpt_cols = [col for col in df_hourly.columns if 'bdwpt_node' in col]
+        if not bdwpt_cols: return None
             
         nodes = sorted([int(col.split('_')[2]) for col in bdwpt_cols])
-        df_hourly = df.set_index('timestamp').resample('h').mean()
         
         power_matrix = pd.DataFrame(index=df_hourly.index.hour, columns=nodes)
         for node in nodes:
             col = f'bdwpt_node_{node}_kw'
             if col in df_hourly.columns:
                 power_matrix[node] = df_hourly[col].values
+        return power_matrix
+
+    def plot_soc_density(self, all_results, scenario='Weekday Peak_40%'):
+        """Plot the fleet's SoC distribution over time as a density heatmap"""
+        self._render(_render_soc_density, self._soc_density_inputs(all_results, scenario), 'soc_density_heatmap.png')
         
-        plt.figure(figsize=(12, 8))
-        sns.heatmap(power_matrix.T, cmap='RdBu_r', center=0, cbar_kws={'label': 'Power (kW)\n V2G <— 0 —> G2V'})
+    def _soc_density_inputs(self, all_results, scenario):
+        trajectories = all_results.get(scenario, {}).get('agent_trajectories')
+        if not trajectories or not trajectories['fleet_size']:
+            logger.warning(f"No fleet SoC histogram for {scenario}; enable trajectory_params to plot SoC density.")
+            return None
+        return {
+            'scenario': scenario,
+            'fleet_size': trajectories['fleet_size'],
+            'timestamps': trajectories['timestamps'],
+            'bin_edges': trajectories['soc_bin_edges'],
+            'histogram': trajectories['soc_histogram'],
+        }
+
+    def plot_agent_soc_profiles(self, all_results, num_agents=5, scenario='Weekday Peak_40%'):
+        """Plot SoC profiles for a sample of agents over the fleet's SoC percentile bands"""
+        self._render(_render_agent_soc_profiles, self._agent_trajectory_inputs(all_results, num_agents, scenario, 'soc'),
+                     'agent_soc_profiles.png')
+
+    def plot_agent_power_exchange(self, all_results, num_agents=5, scenario='Weekday Peak_40%'):
+        """Plot power exchange for a sample of agents over the fleet's power percentile bands"""
+        self._render(_render_agent_power_exchange,
+                     self._agent_trajectory_inputs(all_results, num_agents, scenario, 'power'),
+                     'agent_power_exchange.png')
+
+    def _agent_trajectory_inputs(self, all_results, num_agents, scenario, quantity):
+        """Sampled traces and fleet bands of one quantity ('soc' or 'power') from the run's trajectories"""
+        trajectories = all_results.get(scenario, {}).get('agent_trajectories')
+        if not trajectories or not trajectories['vehicle_ids']:
+            logger.warning(f"No sampled agent trajectories for {scenario}; enable trajectory_params to plot agents.")
+            return None
+        traces = trajectories['soc'] if quantity == 'soc' else trajectories['power_kw']
+        bands = trajectories['soc_bands'] if quantity == 'soc' else trajectories['power_bands']
+        return {
+            'scenario': scenario,
+            'fleet_size': trajectories['fleet_size'],
+            'timestamps': trajectories['timestamps'],
+            'vehicle_ids': trajectories['vehicle_ids'][:num_agents],
+            'traces': traces[:, :num_agents],
+            'percentiles': trajectories['percentiles'],
+            'bands': bands,
+        }
+
+VOLTAGE_PLOT_BUSES = [671, 675, 652, 611]
+
+KPI_PLOT_DEFS = [
+    {'key': 'peak_reduction_kw', 'title': 'Peak Load Reduction', 'ylabel': 'Reduction (kW)', 'color': 'steelblue'},
+    {'key': 'voltage_improvement', 'title': 'Voltage Violation Improvement', 'ylabel': 'Violations Reduced', 'color': 'darkgreen'},
+    {'key': 'loss_reduction_kwh', 'title': 'Energy Loss Reduction', 'ylabel': 'Reduction (kWh)', 'color': 'darkorange'},
+    {'key': 'energy_from_v2g_kwh', 'title': 'V2G Energy Contribution', 'ylabel': 'Energy (kWh)', 'color': 'darkred'}
+]
+
+def _trajectory_checksums(trajectories, names):
+    """Content checksum of each of ``names`` in a run's sampled trajectories (None when not recorded)."""
+    if not trajectories:
+        return None
+    return {name: hashlib.sha256(np.ascontiguousarray(trajectories[name]).tobytes()
+                                 if isinstance(trajectories[name], np.ndarray)
+                                 else pickle.dumps(trajectories[name])).hexdigest()
+            for name in names}
+
+def _kpi_fingerprint(kpis):
+    """The plotted KPIs for the render manifest."""
+    return {name: {pdef['key']: kpi.get(pdef['key']) for pdef in KPI_PLOT_DEFS} for name, kpi in kpis.items()}
+
+def _render_fingerprint(render):
+    """Identity of a render function's code, so editing it invalidates its figure."""
+    code = render.__code__
+    constants = [constant for constant in code.co_consts if not hasattr(constant, 'co_code')]
+    return RENDER_VERSION, code.co_code, repr(constants), code.co_names
+
+# Render functions run in worker processes: module level, inputs already aggregated
+
+def _init_render_worker():
+    matplotlib.use('Agg', force=True)
+
+def _format_time_axis(ax, hour_interval):
+    """Clock-time ticks every ``hour_interval`` hours for up to a day, automatic date ticks beyond"""
+    start, end = ax.get_xlim()
+    if end - start <= 1:
+        ax.xaxis.set_major_formatter(mdates.DateFormatter('%H:%M'))
+        ax.xaxis.set_major_locator(mdates.HourLocator(interval=hour_interval))
+    else:
+        locator = mdates.AutoDateLocator()
+        ax.xaxis.set_major_locator(locator)
+        ax.xaxis.set_major_formatter(mdates.ConciseDateFormatter(locator))
+
+def _render_load_curves(inputs, path, dpi):
+    fig, axes = plt.subplots(2, 1, figsize=(12, 10), sharex=True)
+    
+    for idx, (scenario_base, curves) in enumerate(inputs.items()):
+        ax = axes[idx]
+        
+        for label, series in curves:
+            ax.plot(series.index, series.values, label=label, linewidth=2)
+                
+        ax.set_title(f'{scenario_base} - Total Load Comparison', fontsize=14)
+        ax.set_ylabel('Total Load (kW)', fontsize=12)
+        ax.legend(loc='upper right')
+        ax.grid(True, alpha=0.3)
+        
+    axes[-1].set_xlabel('Time', fontsize=12)
+    _format_time_axis(ax, hour_interval=3)
+        
+    plt.tight_layout()
+    plt.savefig(path, dpi=dpi, bbox_inches='tight')
+    plt.close()
+
+def _render_voltage_profiles(inputs, path, dpi):
+    fig, axes = plt.subplots(2, 2, figsize=(14, 10), sharex=True)
+    axes = axes.flatten()
+    
+    for idx, (bus, curves) in enumerate(inputs.items()):
+        ax = axes[idx]
+        
+        for label, series in curves:
+            ax.plot(series.index, series.values, label=label, linewidth=2)
+                    
+        ax.axhline(y=1.05, color='r', linestyle='--', alpha=0.5, label='Upper Limit')
+        ax.axhline(y=0.95, color='r', linestyle='--', alpha=0.5, label='Lower Limit')
         
-        plt.title('BDWPT Power Exchange Heatmap (40% Penetration, Weekday)', fontsize=14)
-        plt.xlabel('Hour of Day', fontsize=12)
-        plt.ylabel('Node Number', fontsize=12)
+        ax.set_title(f'Bus {bus} Voltage Profile', fontsize=12)
+        ax.set_ylabel('Voltage (p.u.)', fontsize=10)
+        ax.set_ylim(0.94, 1.06)
+        ax.legend(loc='best', fontsize=8)
+        ax.grid(True, alpha=0.3)
         
-        plt.tight_layout()
-        plt.savefig(os.path.join(self.output_dir, 'bdwpt_power_heatmap.png'), dpi=300, bbox_inches='tight')
-        plt.close()
+    for ax in axes:
+        _format_time_axis(ax, hour_interval=6)
+        ax.set_xlabel('Time', fontsize=10)
+        
+    plt.tight_layout()
+    plt.savefig(path, dpi=dpi, bbox_inches='tight')
+    plt.close()
+
+def _render_kpi_comparison(plot_df, path, dpi):
+    fig, axes = plt.subplots(2, 2, figsize=(14, 12))
+    axes = axes.flatten()
+    
+    for i, pdef in enumerate(KPI_PLOT_DEFS):
+        ax = axes[i]
+        bars = ax.bar(plot_df['scenario_label'], plot_df[pdef['key']], color=pdef['color'])
+        ax.set_title(pdef['title'], fontsize=14)
+        ax.set_ylabel(pdef['ylabel'], fontsize=12)
+        ax.tick_params(axis='x', rotation=45, labelsize=10)
+        ax.grid(True, axis='y', linestyle='--', alpha=0.6)
+        
+        for bar in bars:
+            height = bar.get_height()
+            ax.text(bar.get_x() + bar.get_width()/2., height, f'{height:.1f}', ha='center', va='bottom', fontsize=9)
+    
+    plt.tight_layout(pad=3.0)
+    plt.savefig(path, dpi=dpi, bbox_inches='tight')
+    plt.close()
+
+def _render_bdwpt_heatmap(power_matrix, path, dpi):
+    plt.figure(figsize=(12, 8))
+    sns.heatmap(power_matrix.T, cmap='RdBu_r', center=0, cbar_kws={'label': 'Power (kW)\n V2G <— 0 —> G2V'})
+    
+    plt.title('BDWPT Power Exchange Heatmap (40% Penetration, Weekday)', fontsize=14)
+    plt.xlabel('Hour of Day', fontsize=12)
+    plt.ylabel('Node Number', fontsize=12)
+    
+    plt.tight_layout()
+    plt.savefig(path, dpi=dpi, bbox_inches='tight')
+    plt.close()
 
-    def plot_agent_soc_profiles(self, all_results, num_agents=5):
-        """Plot SoC profiles for a sample of agents"""
-        logger.warning("Plotting agent SOC profiles requires detailed agent history, which is not yet fully implemented.")
+def _render_soc_density(inputs, path, dpi):
+    # One raster image of (steps x bins), so the cost does not depend on the fleet size
+    times = mdates.date2num(pd.to_datetime(inputs['timestamps']))
+    step = times[1] - times[0] if len(times) > 1 else 1 / 96
+    edges = inputs['bin_edges']
+    share = inputs['histogram'].T / inputs['fleet_size'] * 100
+    
+    fig, ax = plt.subplots(figsize=(12, 8))
+    image = ax.imshow(share, aspect='auto', origin='lower', cmap='viridis', interpolation='nearest',
+                      extent=[times[0], times[-1] + step, edges[0], edges[-1]])
+    fig.colorbar(image, ax=ax, label='Share of Fleet (%)')
+    ax.xaxis_date()
+    _format_time_axis(ax, hour_interval=3)
+    
+    ax.set_title(f"Fleet SoC Density ({inputs['scenario']}, {inputs['fleet_size']} agents)", fontsize=14)
+    ax.set_xlabel('Time', fontsize=12)
+    ax.set_ylabel('State of Charge', fontsize=12)
+    
+    plt.tight_layout()
+    plt.savefig(path, dpi=dpi, bbox_inches='tight')
+    plt.close()
 
-    def plot_agent_power_exchange(self, all_results, num_agents=5):
-        """Plot power exchange for a sample of agents"""
-        logger.warning("Plotting agent power exchange requires detailed agent history, which is not yet fully implemented.")
\ No newline at end of file
+def _plot_trajectories(ax, inputs):
+    """Fleet percentile bands (outer pair, inner pair, median) with the sampled agents on top"""
+    times = inputs['timestamps']
+    bands = inputs['bands']
+    percentiles = inputs['percentiles']
+    count = len(percentiles)
+    for low in range(count // 2):
+        high = count - 1 - low
+        ax.fill_between(times, bands[:, low], bands[:, high], color='grey', alpha=0.15 + 0.15 * low,
+                        label=f'Fleet P{percentiles[low]:g}-P{percentiles[high]:g}')
+    if count % 2:
+        ax.plot(times, bands[:, count // 2], color='black', linewidth=1.5, label=f'Fleet P{percentiles[count // 2]:g}')
+    for vehicle_id, trace in zip(inputs['vehicle_ids'], inputs['traces'].T):
+        ax.plot(times, trace, linewidth=1, alpha=0.8, label=f'Vehicle {vehicle_id}')
+    _format_time_axis(ax, hour_interval=3)
+    ax.set_xlabel('Time', fontsize=12)
+    ax.legend(loc='upper left', bbox_to_anchor=(1.01, 1), fontsize=8)
+    ax.grid(True, alpha=0.3)
+
+def _render_agent_soc_profiles(inputs, path, dpi):
+    fig, ax = plt.subplots(figsize=(14, 6))
+    _plot_trajectories(ax, inputs)
+    ax.set_ylim(0, 1)
+    ax.set_ylabel('State of Charge', fontsize=12)
+    ax.set_title(f"Agent SoC Profiles ({inputs['scenario']}, {len(inputs['vehicle_ids'])} of "
+                 f"{inputs['fleet_size']} agents)", fontsize=14)
+    
+    plt.tight_layout()
+    plt.savefig(path, dpi=dpi, bbox_inches='tight')
+    plt.close()
+
+def _render_agent_power_exchange(inputs, path, dpi):
+    fig, ax = plt.subplots(figsize=(14, 6))
+    _plot_trajectories(ax, inputs)
+    ax.axhline(y=0, color='k', linewidth=0.8)
+    ax.set_ylabel('Power (kW)\n V2G <— 0 —> G2V', fontsize=12)
+    ax.set_title(f"Agent Power Exchange ({inputs['scenario']}, {len(inputs['vehicle_ids'])} of "
+                 f"{inputs['fleet_size']} agents)", fontsize=14)
+    
+    plt.tight_layout()
+    plt.savefig(path, dpi=dpi, bbox_inches='tight')
+    plt.close()